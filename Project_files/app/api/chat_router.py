@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.granite_llm import ask_city_question, get_sustainability_tips
+from app.services.granite_llm import ask_city_question_async, ask_city_question_stream, get_sustainability_tips_async
+import json
 
 router = APIRouter(
     prefix="/chat",
@@ -19,13 +21,39 @@ async def ask(request: ChatRequest):
     Accepts a user's prompt and returns a response from the AI chat assistant.
     Enhanced for comprehensive city-related questions.
     """
-    response = ask_city_question(prompt=request.prompt)
+    response = await ask_city_question_async(prompt=request.prompt)
     return {"response": response}
 
+@router.post("/ask-stream")
+async def ask_stream(request: ChatRequest):
+    """
+    Same as /chat/ask, but streams the answer as server-sent events while
+    Granite generates it: one "data: {"delta": ...}" event per piece of
+    text, then "event: done" (or "event: error" with a detail message).
+    """
+    return StreamingResponse(
+        _sse_events(request.prompt),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _sse_events(prompt: str):
+    stream = ask_city_question_stream(prompt)
+    try:
+        async for delta in stream:
+            yield f"data: {json.dumps({'delta': delta})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        print(f"[EXCEPTION] Error streaming chat response: {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': f'Error contacting Watsonx: {e}'})}\n\n"
+    finally:
+        await stream.aclose()
+
 @router.post("/tips")
 async def get_tips(request: TipsRequest):
     """
     Get sustainability tips for specific categories.
     """
-    response = get_sustainability_tips(category=request.category)
+    response = await get_sustainability_tips_async(category=request.category)
     return {"response": response} 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.services.granite_llm import generate_eco_tip
+from app.services.granite_llm import generate_eco_tip_async
 
 router = APIRouter(
     prefix="/eco-tips",
@@ -11,5 +11,5 @@ async def get_eco_tips(topic: str):
     """
     Provides an eco-friendly tip on a specified topic.
     """
-    tip = generate_eco_tip(topic)
+    tip = await generate_eco_tip_async(topic)
     return {"topic": topic, "tip": tip} 
\ No newline at end of file
@@ -0,0 +1,51 @@
+from fastapi import APIRouter
+from app.services.document_embedder import cache_stats, vector_store_stats
+from app.services.granite_llm import gateway_stats, llm_requests, semantic_cache_stats, token_manager, watsonx_client
+from app.services.summarizer import summary_stats
+from app.services.summary_precompute import summary_queue
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+@router.get("/search-cache")
+async def get_search_cache_metrics():
+    """
+    Returns hit/miss counters for the query-embedding and search-result caches.
+    """
+    return cache_stats()
+
+@router.get("/vector-store")
+async def get_vector_store_metrics():
+    """
+    Returns upsert counts and batch latency percentiles of the vector store.
+    """
+    return vector_store_stats()
+
+@router.get("/llm")
+async def get_llm_metrics():
+    """
+    Returns IAM token requests, the state of the cached Watsonx token, the
+    Watsonx client's request counters and concurrency, the gateway's queue
+    depth, rejections and circuit breaker state, coalesced identical
+    prompts, semantic response cache hit rates, summary caching and
+    ingest-time summary precomputation.
+    """
+    return {
+        "iam_token": token_manager.stats(),
+        "watsonx": watsonx_client.stats(),
+        "gateway": gateway_stats(),
+        "coalescing": llm_requests.stats(),
+        "semantic_cache": semantic_cache_stats(),
+        "summaries": summary_stats(),
+        "summary_precompute": summary_queue.stats(),
+    }
+
+@router.get("/llm-gateway")
+async def get_llm_gateway_metrics():
+    """
+    Returns the Watsonx gateway's queue depth, in-flight calls, rejections
+    by reason and circuit breaker state.
+    """
+    return gateway_stats()
@@ -1,7 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from app.services.granite_llm import generate_summary
-from app.services.document_embedder import search_documents
+from app.services.granite_llm import generate_summary_async
+from app.services.document_embedder import search_documents_async, parse_filter, SEARCH_MODES
+from app.services.summarizer import get_summary, summarize_results
+from typing import Optional
 
 
 router = APIRouter(
@@ -17,30 +19,42 @@ async def summarize_policy(policy_text: PolicyText):
     """
     Accepts a block of text and returns an AI-generated summary.
     """
-    summary = generate_summary(policy_text.text)
+    summary = await generate_summary_async(policy_text.text)
     return {"original_text": policy_text.text, "summary": summary}
 
 
 @router.get("/search-docs")
-async def search_policies(query: str, top_k: int = 5):
+async def search_policies(query: str, top_k: int = 5, mode: str = "vector", filter: Optional[str] = None):
     """
     Searches for relevant policy documents based on a query and returns summaries for each result.
+    mode="hybrid" also ranks by exact-term (BM25) matches, e.g. for "PM2.5" or ordinance numbers;
+    it needs the local store, so with Pinecone configured it is a plain vector search.
+    filter restricts the search by metadata, e.g. "domain:water" or "doc_id:<id>";
+    comma-separate conditions, and repeat a field to allow several values.
+    Summaries not generated within the deadline come back with
+    summary_status "pending"; poll /policy/summaries/{summary_id} for them.
     """
-    results = search_documents(query=query, top_k=top_k)
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(SEARCH_MODES)}")
+    try:
+        filters = parse_filter(filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = await search_documents_async(query=query, top_k=top_k, mode=mode, filters=filters)
     # Add summary for each result using Granite LLM
-    for result in results:
-        doc_text = result.get("metadata", {}).get("text", "")
-        print(f"[DEBUG] Document text to summarize (id={result.get('id')}):\n{doc_text}\n---")
-        if doc_text:
-            summary = generate_summary(doc_text)
-            print(f"[DEBUG] Summary generated (id={result.get('id')}):\n{summary}\n---")
-            if not summary or not summary.strip():
-                summary = "[ERROR] Granite LLM returned an empty summary."
-            result["summary"] = summary
-        else:
-            result["summary"] = "No text available to summarize."
+    await summarize_results(results)
     return {"query": query, "results": results}
 
+@router.get("/summaries/{summary_id}")
+async def get_result_summary(summary_id: str):
+    """
+    Returns a search-result summary that /policy/search-docs reported as pending.
+    """
+    summary = await get_summary(summary_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Unknown summary_id.")
+    return summary
+
 
 # Endpoints for policy search will be added here.
 # For example: GET /search-docs 
\ No newline at end of file
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-from app.services.granite_llm import generate_city_report
+from app.services.granite_llm import generate_city_report_async
 
 router = APIRouter(
     prefix="/report",
@@ -16,5 +16,5 @@ async def generate_report(kpi_data: KpiData):
     """
     Generates a city sustainability report based on provided KPI data.
     """
-    report = generate_city_report(kpi_data.data)
+    report = await generate_city_report_async(kpi_data.data)
     return {"report": report} 
\ No newline at end of file
@@ -1,5 +1,12 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.document_embedder import embed_and_store
+from app.config import settings
+from app.services.document_embedder import embed_and_store, delete_document, replace_document
+from app.services.ingestion import create_job, get_job, list_jobs, ingestion_queue
+from typing import Any, Dict, Optional
+import asyncio
+import os
+import re
+import tempfile
 import uuid
 
 router = APIRouter(
@@ -7,14 +14,32 @@ router = APIRouter(
     tags=["Vector Search"]
 )
 
+def _document_metadata(filename: Optional[str], domain: Optional[str]) -> Dict[str, Any]:
+    """
+    Searchable metadata of an upload. The policy domain defaults to the
+    first word of the file name, e.g. "water" for water_conservation_policy.txt.
+    """
+    stem = os.path.splitext(os.path.basename(filename or ""))[0]
+    if not domain:
+        domain = re.split(r"[_\-\s]+", stem.lower())[0]
+    return {"domain": domain.strip().lower(), "source": filename or ""}
+
 @router.post("/upload-doc")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(file: UploadFile = File(...), stream: bool = True, domain: Optional[str] = None):
     """
     Accepts a text document upload, embeds its content, and stores it in Pinecone.
+    By default the file is queued for background embedding in bounded
+    batches; poll /vectors/jobs/{job_id} for progress. stream=false embeds
+    the file before responding. domain tags the chunks for filtered
+    search and defaults to the first word of the file name.
     """
     if not file.content_type == "text/plain":
         raise HTTPException(status_code=400, detail="Only .txt files are supported.")
 
+    metadata = _document_metadata(file.filename, domain)
+    if stream:
+        return await _start_streaming_upload(file, metadata=metadata)
+
     try:
         contents = await file.read()
         text = contents.decode("utf-8")
@@ -22,13 +47,115 @@ async def upload_document(file: UploadFile = File(...)):
         # Use a unique ID for the document chunk
         doc_id = str(uuid.uuid4())
         
-        # In a real app, you might chunk the text into smaller pieces
-        embed_and_store(doc_id=doc_id, text=text)
+        # Chunking, embedding and upserting block, so they run in a worker thread
+        await asyncio.to_thread(embed_and_store, doc_id=doc_id, text=text, metadata=metadata)
         
         return {
             "filename": file.filename,
             "doc_id": doc_id,
+            "domain": metadata["domain"],
             "status": "embedding_successful"
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to process and embed file: {e}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process and embed file: {e}")
+
+@router.put("/docs/{doc_id}")
+async def replace_uploaded_document(doc_id: str, file: UploadFile = File(...), stream: bool = True,
+                                    domain: Optional[str] = None):
+    """
+    Replaces the content of an uploaded document. Chunks that did not change
+    are reused, and the previous version stays searchable until the new one
+    is stored. Accepts the same options as /vectors/upload-doc.
+    """
+    if not file.content_type == "text/plain":
+        raise HTTPException(status_code=400, detail="Only .txt files are supported.")
+
+    metadata = _document_metadata(file.filename, domain)
+    if stream:
+        return await _start_streaming_upload(file, doc_id=doc_id, replace=True, metadata=metadata)
+
+    try:
+        contents = await file.read()
+        await asyncio.to_thread(replace_document, doc_id=doc_id, text=contents.decode("utf-8"), metadata=metadata)
+        return {
+            "filename": file.filename,
+            "doc_id": doc_id,
+            "status": "replacement_successful"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to process and embed file: {e}")
+
+@router.delete("/docs/{doc_id}")
+async def delete_uploaded_document(doc_id: str):
+    """
+    Removes a document's chunks from the index.
+    """
+    deleted_chunks = await asyncio.to_thread(delete_document, doc_id)
+    if deleted_chunks == 0:
+        raise HTTPException(status_code=404, detail="Unknown document ID.")
+    return {
+        "doc_id": doc_id,
+        "deleted_chunks": deleted_chunks,
+        "status": "deleted"
+    }
+
+def _queue_full_error() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many documents are being processed. Please retry shortly.",
+        headers={"Retry-After": "5"},
+    )
+
+async def _start_streaming_upload(file: UploadFile, doc_id: Optional[str] = None, replace: bool = False,
+                                  metadata: Optional[Dict[str, Any]] = None):
+    if ingestion_queue.is_full():
+        raise _queue_full_error()
+
+    # Copy the upload block by block into a file the background job owns,
+    # since the request's upload file is closed once the response is sent
+    tmp = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".txt", delete=False)
+    total_bytes = 0
+    try:
+        with tmp:
+            while True:
+                block = await file.read(settings.UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                tmp.write(block)
+                total_bytes += len(block)
+    except Exception as e:
+        os.remove(tmp.name)
+        raise HTTPException(status_code=500, detail=f"Failed to receive file: {e}")
+
+    job = create_job(doc_id=doc_id or str(uuid.uuid4()), filename=file.filename,
+                     total_bytes=total_bytes, replace=replace, metadata=metadata)
+    if not ingestion_queue.submit(job, tmp.name):
+        os.remove(tmp.name)
+        raise _queue_full_error()
+    return {
+        "filename": file.filename,
+        "doc_id": job.doc_id,
+        "domain": job.metadata.get("domain"),
+        "job_id": job.id,
+        "status": job.status
+    }
+
+@router.get("/jobs")
+async def list_ingestion_jobs():
+    """
+    Lists recent ingestion jobs together with the queue's current load.
+    """
+    return {
+        "queue": ingestion_queue.stats(),
+        "jobs": [job.to_dict() for job in list_jobs()]
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """
+    Returns the progress of a queued upload.
+    """
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job ID.")
+    return job.to_dict()
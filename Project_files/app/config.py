@@ -7,9 +7,144 @@ class Settings(BaseSettings):
     WATSONX_PROJECT_ID: str = "dummy_project"
     WATSONX_URL: str = "https://dummy.com"
     WATSONX_MODEL_ID: str = "dummy_model"
+    # IBM Cloud IAM token endpoint (e.g. http://127.0.0.1:8101/identity/token for tools/iam_stub.py).
+    # Tokens are treated as expired IAM_TOKEN_EXPIRY_MARGIN_SECONDS early and refreshed in
+    # the background once less than IAM_TOKEN_REFRESH_AHEAD_SECONDS of their lifetime is left
+    IAM_URL: str = "https://iam.cloud.ibm.com/identity/token"
+    IAM_TOKEN_EXPIRY_MARGIN_SECONDS: float = 60
+    IAM_TOKEN_REFRESH_AHEAD_SECONDS: float = 300
+    # Shared keep-alive connection pool for Watsonx calls; requests beyond
+    # WATSONX_MAX_CONCURRENT_REQUESTS wait (without blocking the event loop)
+    WATSONX_MAX_CONNECTIONS: int = 100
+    WATSONX_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    WATSONX_MAX_CONCURRENT_REQUESTS: int = 32
+    WATSONX_TIMEOUT_SECONDS: float = 30
+    # Search-result summaries: generated at most SUMMARY_CONCURRENCY at a time per search,
+    # returned as pending when not ready within SUMMARY_DEADLINE_SECONDS, and cached
+    # in SQLite by chunk content hash (empty SUMMARY_CACHE_PATH disables the cache)
+    SUMMARY_CONCURRENCY: int = 5
+    SUMMARY_DEADLINE_SECONDS: float = 8
+    SUMMARY_CACHE_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "summary_cache.sqlite")
+    SUMMARY_RECENT_SIZE: int = 4096
+    SUMMARY_RECENT_TTL_SECONDS: float = 3600
+    # Watsonx gateway: calls beyond WATSONX_MAX_CONCURRENT_REQUESTS wait (at most
+    # LLM_MAX_QUEUED_REQUESTS of them, each for up to LLM_QUEUE_TIMEOUT_SECONDS) and are
+    # rate limited to LLM_RATE_LIMIT_PER_SECOND with bursts of LLM_RATE_LIMIT_BURST (0 disables)
+    LLM_MAX_QUEUED_REQUESTS: int = 256
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 10
+    LLM_RATE_LIMIT_PER_SECOND: float = 20
+    LLM_RATE_LIMIT_BURST: float = 40
+    # Circuit breaker: opens when at least LLM_BREAKER_FAILURE_RATE of the last LLM_BREAKER_WINDOW
+    # calls (once LLM_BREAKER_MIN_CALLS were made) failed or took LLM_BREAKER_SLOW_CALL_SECONDS
+    # or more (0 disables), then rejects calls for LLM_BREAKER_OPEN_SECONDS before probing again
+    LLM_BREAKER_FAILURE_RATE: float = 0.5
+    LLM_BREAKER_MIN_CALLS: int = 10
+    LLM_BREAKER_WINDOW: int = 50
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = 20
+    LLM_BREAKER_OPEN_SECONDS: float = 30
+    # Last successful answer per prompt, served when the gateway rejects the prompt
+    LLM_FALLBACK_CACHE_SIZE: int = 2048
+    LLM_FALLBACK_CACHE_TTL_SECONDS: float = 24 * 3600
+    # Concurrent calls with the same (whitespace/case-normalised) prompt share one Watsonx request
+    COALESCE_LLM_REQUESTS: bool = True
+    # Semantic response cache: comma-separated granite_llm functions (generate_eco_tip,
+    # ask_city_question, generate_summary) whose answers are reused for inputs whose MiniLM
+    # embedding has cosine similarity >= SEMANTIC_CACHE_THRESHOLD with a cached input;
+    # SEMANTIC_CACHE_SIZE entries per function, each kept SEMANTIC_CACHE_TTL_SECONDS.
+    # Inputs over SEMANTIC_CACHE_MAX_TOKENS estimated tokens bypass the cache: MiniLM only
+    # embeds their first 256 word pieces, so texts sharing an opening would match
+    SEMANTIC_CACHE_FUNCTIONS: str = "generate_eco_tip,ask_city_question"
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_SIZE: int = 1024
+    SEMANTIC_CACHE_TTL_SECONDS: float = 3600
+    SEMANTIC_CACHE_MAX_TOKENS: int = 200
+    # Summarise chunks in the background as they are ingested and store the summary in
+    # their metadata (opt-in): worker threads, and queued batches of chunks before dropping new ones
+    PRECOMPUTE_SUMMARIES: bool = False
+    SUMMARY_PRECOMPUTE_WORKERS: int = 2
+    SUMMARY_PRECOMPUTE_QUEUE_SIZE: int = 256
+    # Precompute calls go through their own gateway and circuit breaker, limited to
+    # LLM_BACKGROUND_RATE_LIMIT_PER_SECOND, and wait (polling every SUMMARY_PRECOMPUTE_BACKOFF_SECONDS)
+    # while interactive calls are queued or the interactive circuit is not closed
+    LLM_BACKGROUND_RATE_LIMIT_PER_SECOND: float = 2
+    SUMMARY_PRECOMPUTE_BACKOFF_SECONDS: float = 1
     PINECONE_API_KEY: str = "dummy_pinecone_key"
     PINECONE_ENV: str = "dummy_env"
     INDEX_NAME: str = "dummy_index"
+    # Pinecone-compatible index host (e.g. http://127.0.0.1:8100 for tools/pinecone_stub.py);
+    # when set, it is used over REST instead of resolving INDEX_NAME through the client
+    PINECONE_HOST: str = ""
+    PINECONE_UPSERT_BATCH_SIZE: int = 100
+    PINECONE_MAX_IN_FLIGHT: int = 4
+    # Local vector search used when Pinecone is unavailable: "exact" or "ivf"
+    LOCAL_VECTOR_BACKEND: str = "exact"
+    IVF_NLIST: int = 256
+    IVF_NPROBE: int = 8
+    # Chunk budget in estimated tokens; all-MiniLM-L6-v2 truncates input at 256
+    # word pieces, so the default leaves headroom for sub-word splits
+    CHUNK_MAX_TOKENS: int = 200
+    # Each chunk starts with up to this many tokens of the previous chunk's trailing
+    # sentences or lines, also across paragraph breaks
+    CHUNK_OVERLAP_TOKENS: int = 32
+    # Sentence-transformers model used for chunks and queries, and the dimension of its vectors
+    EMBEDDING_MODEL_NAME: str = "all-MiniLM-L6-v2"
+    EMBEDDING_DIM: int = 384
+    # Load the embedding model and connect Pinecone during startup instead of on first use
+    WARM_UP_ON_STARTUP: bool = False
+    # Number of chunks passed to the embedding model per forward pass
+    EMBED_BATCH_SIZE: int = 32
+    # Streaming uploads: bytes read per block and chunks embedded/upserted per batch
+    UPLOAD_BLOCK_SIZE: int = 1024 * 1024
+    STREAM_UPSERT_CHUNKS: int = 256
+    # Background ingestion: worker threads, queued uploads before rejecting, finished jobs kept
+    INGEST_WORKERS: int = 2
+    INGEST_QUEUE_SIZE: int = 16
+    INGEST_JOB_HISTORY: int = 1000
+    # Query micro-batching: up to QUERY_BATCH_SIZE queries per encode, waiting at most QUERY_BATCH_WAIT_MS
+    QUERY_BATCH_SIZE: int = 32
+    QUERY_BATCH_WAIT_MS: float = 5.0
+    # Bounded LRU caches for query embeddings and top-k search results
+    QUERY_CACHE_SIZE: int = 1024
+    QUERY_CACHE_TTL_SECONDS: float = 3600
+    SEARCH_RESULT_CACHE_SIZE: int = 1024
+    SEARCH_RESULT_CACHE_TTL_SECONDS: float = 300
+    # Hybrid BM25 + vector search: candidates per ranking, RRF constant, and
+    # whether vector scoring is restricted to the lexical candidates
+    HYBRID_CANDIDATES: int = 100
+    HYBRID_RRF_K: int = 60
+    HYBRID_PREFILTER: bool = False
+    # Storage of local embeddings: "none" (float32) or "int8", optionally
+    # re-ranking the top VECTOR_RESCORE_FACTOR * top_k hits at full precision.
+    # Full precision comes from the memory-mapped store; chunks added since it
+    # was loaded are only re-ranked exactly if VECTOR_RESCORE_KEEP_FLOAT32 keeps
+    # a float32 copy of them in memory (more than the plain float32 index uses)
+    VECTOR_QUANTIZATION: str = "none"
+    VECTOR_RESCORE: bool = True
+    VECTOR_RESCORE_FACTOR: int = 4
+    VECTOR_RESCORE_KEEP_FLOAT32: bool = False
+    # Directory of the memory-mapped local vector store; empty disables persistence
+    VECTOR_STORE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "vector_store")
+    # SQLite record of the chunks stored in Pinecone (content hashes, near-duplicate
+    # signatures, referencing documents), reloaded when Pinecone is first used; empty disables it
+    REMOTE_CHUNK_REGISTRY_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "remote_chunks.sqlite")
+    # SQLite cache of chunk embeddings keyed by content hash and model; empty disables it
+    EMBEDDING_CACHE_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "embedding_cache.sqlite")
+    # Store each distinct chunk text once, skipping chunks already in the index
+    DEDUPLICATE_CHUNKS: bool = True
+    # MinHash/LSH near-duplicate detection: chunks whose estimated word-shingle Jaccard
+    # similarity reaches NEAR_DUPLICATE_THRESHOLD are linked to one canonical chunk and
+    # shown once per search ("link"), or not stored at all ("collapse"). Searches fetch
+    # NEAR_DUPLICATE_OVERFETCH * top_k hits so collapsing still leaves top_k results.
+    NEAR_DUPLICATE_DETECTION: bool = True
+    NEAR_DUPLICATE_THRESHOLD: float = 0.9
+    NEAR_DUPLICATE_ACTION: str = "link"
+    NEAR_DUPLICATE_OVERFETCH: int = 3
+    MINHASH_PERMUTATIONS: int = 128
+    LSH_BANDS: int = 16
+    # Deleted chunks are tombstoned; the local index is compacted in the background
+    # once they make up COMPACTION_DEAD_RATIO of it (and number at least COMPACTION_MIN_DEAD_ROWS)
+    COMPACTION_DEAD_RATIO: float = 0.2
+    COMPACTION_MIN_DEAD_ROWS: int = 256
 
     class Config:
         # Look for .env file in the project root (parent of app directory)
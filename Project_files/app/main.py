@@ -1,5 +1,7 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
+import asyncio
+from app.config import settings
 from app.api import (
     chat_router,
     policy_router,
@@ -9,17 +11,33 @@ from app.api import (
     vector_router,
     kpi_upload_router,
     dashboard_router,
+    metrics_router,
 )
-from app.services.document_embedder import create_pinecone_index_if_not_exists
+from app.services.document_embedder import (
+    load_persistent_store,
+    query_batcher,
+    warm_up,
+)
+from app.services.ingestion import ingestion_queue
+from app.services.summary_precompute import summary_queue
+from app.services.granite_llm import watsonx_client
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # On startup
     print("Application startup...")
-    create_pinecone_index_if_not_exists()
+    load_persistent_store()
+    # The embedding model and Pinecone (with the bookkeeping of its chunks) are
+    # otherwise loaded by the first request that needs them
+    if settings.WARM_UP_ON_STARTUP:
+        await asyncio.to_thread(warm_up)
     yield
     # On shutdown
     print("Application shutdown...")
+    query_batcher.stop()
+    ingestion_queue.shutdown()
+    summary_queue.shutdown()
+    await watsonx_client.aclose()
 
 app = FastAPI(
     title="Smart City Dashboard API",
@@ -36,6 +54,7 @@ app.include_router(report_router.router)
 app.include_router(vector_router.router)
 app.include_router(kpi_upload_router.router)
 app.include_router(dashboard_router.router)
+app.include_router(metrics_router.router)
 
 @app.get("/", tags=["Root"])
 async def root():
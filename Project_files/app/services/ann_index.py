@@ -0,0 +1,146 @@
+import threading
+import numpy as np
+from typing import List, Optional, Tuple
+from app.services.vector_index import normalize_query, normalize_rows
+
+class ExactSearch:
+    """
+    Brute-force backend: scores every row of the index.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def add(self, rows: np.ndarray):
+        pass
+
+    def reset(self):
+        pass
+
+    def search(self, query_embedding, top_k: int, exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        return self.index.search(query_embedding, top_k, exclude=exclude)
+
+class IVFFlatIndex:
+    """
+    Inverted-file (IVF-flat) approximate search over a VectorIndex or Int8VectorIndex.
+
+    Rows are bucketed by their nearest k-means centroid. A query scores only
+    the rows in its nprobe closest buckets, so nprobe trades recall for
+    latency: nprobe == nlist is equivalent to exact search. Until the index
+    holds min_train_size rows it falls back to exact search, and it retrains
+    its centroids whenever the corpus has doubled since the last training.
+
+    Searches run without the writers' lock: training builds the centroids
+    and inverted lists aside and publishes them in one assignment, and
+    appends to a list and its cached row array happen under the index's
+    own lock, so a search always sees complete buckets.
+    """
+
+    def __init__(self, index, nlist: int = 256, nprobe: int = 8,
+                 min_train_size: Optional[int] = None, train_iterations: int = 10, seed: int = 0):
+        self.index = index
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size if min_train_size is not None else nlist * 39
+        self.train_iterations = train_iterations
+        self._rng = np.random.default_rng(seed)
+        # (centroids, inverted lists, cached row array per list), replaced as a whole by train()
+        self._layout: Optional[Tuple[np.ndarray, List[List[int]], List[Optional[np.ndarray]]]] = None
+        self._lock = threading.Lock()
+        self._trained_size = 0
+
+    def reset(self):
+        """
+        Forgets the centroids, e.g. after the underlying index was replaced.
+        """
+        self._layout = None
+        self._trained_size = 0
+
+    @property
+    def centroids(self) -> Optional[np.ndarray]:
+        layout = self._layout
+        return layout[0] if layout is not None else None
+
+    @property
+    def is_trained(self) -> bool:
+        return self._layout is not None
+
+    def train(self):
+        """
+        Runs spherical k-means on a sample of the index and rebuilds the inverted lists.
+        """
+        size = len(self.index)
+        nlist = min(self.nlist, size)
+        if nlist == 0:
+            return
+        sample_size = min(size, nlist * 256)
+        sample = self.index.reconstruct(np.sort(self._rng.choice(size, sample_size, replace=False)))
+        centroids = sample[self._rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = np.bincount(assignment, minlength=nlist) == 0
+            # Re-seed empty clusters so every bucket stays useful
+            sums[empty] = sample[self._rng.choice(sample_size, int(empty.sum()), replace=False)]
+            centroids = normalize_rows(sums)
+        layout = (centroids.astype(np.float32), [[] for _ in range(nlist)], [None] * nlist)
+        self._assign(layout, np.arange(size))
+        self._layout = layout
+        self._trained_size = size
+
+    def _assign(self, layout, rows: np.ndarray):
+        centroids, lists, arrays = layout
+        for start in range(0, len(rows), 4096):
+            batch = rows[start:start + 4096]
+            buckets = np.argmax(self.index.reconstruct(batch) @ centroids.T, axis=1)
+            with self._lock:
+                for row, bucket in zip(batch, buckets):
+                    lists[bucket].append(int(row))
+                    arrays[bucket] = None
+
+    def add(self, rows: np.ndarray):
+        """
+        Registers newly appended index rows, training or retraining when due.
+        """
+        size = len(self.index)
+        if not self.is_trained:
+            if size >= self.min_train_size:
+                self.train()
+        elif size >= 2 * self._trained_size:
+            self.train()
+        else:
+            self._assign(self._layout, np.asarray(rows))
+
+    def candidates(self, query_embedding, layout=None) -> np.ndarray:
+        """
+        Returns the rows stored in the nprobe buckets closest to the query.
+        """
+        centroids, lists, arrays = layout or self._layout
+        query = normalize_query(query_embedding, self.index.dim)
+        nprobe = min(self.nprobe, len(centroids))
+        probes = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        buckets = []
+        with self._lock:
+            for bucket in probes:
+                if arrays[bucket] is None:
+                    arrays[bucket] = np.array(lists[bucket], dtype=np.int64)
+                buckets.append(arrays[bucket])
+        return np.concatenate(buckets)
+
+    def search(self, query_embedding, top_k: int, exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        layout = self._layout
+        if layout is None:
+            return self.index.search(query_embedding, top_k, exclude=exclude)
+        return self.index.search(query_embedding, top_k, rows=self.candidates(query_embedding, layout),
+                                 exclude=exclude)
+
+def create_search_backend(name: str, index, nlist: int = 256, nprobe: int = 8):
+    """
+    Builds the local search backend selected in settings ("exact" or "ivf").
+    """
+    if name == "exact":
+        return ExactSearch(index)
+    if name == "ivf":
+        return IVFFlatIndex(index, nlist=nlist, nprobe=nprobe)
+    raise ValueError(f"Unknown local vector backend: {name}")
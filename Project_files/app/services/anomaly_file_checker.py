@@ -1,4 +1,3 @@
-import pandas as pd
 from io import StringIO
 
 def check_anomalies(file_content: str, std_dev_threshold: float = 2.0) -> dict:
@@ -8,6 +7,9 @@ def check_anomalies(file_content: str, std_dev_threshold: float = 2.0) -> dict:
     
     Assumes the CSV has at least a 'value' column.
     """
+    # Imported here so API startup does not pay for pandas
+    import pandas as pd
+
     df = pd.read_csv(StringIO(file_content))
     
     if 'value' not in df.columns:
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+class RemoteChunkRegistry:
+    """
+    Persistent bookkeeping of the chunks stored in the remote vector store.
+
+    Pinecone only holds vectors and their metadata, so the content hash,
+    canonical chunk and MinHash signature of every remote chunk, and the
+    documents referencing it, are kept here. They are loaded when the remote
+    store is first used, so deleting a document or deduplicating a re-upload
+    works after a restart.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id TEXT PRIMARY KEY, hash TEXT, canonical_id TEXT, signature BLOB)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_refs ("
+            "doc_id TEXT, chunk_id TEXT, PRIMARY KEY (doc_id, chunk_id))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def load(self) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]:
+        """
+        Returns the chunks, as {"id", "hash", "canonical_id", "signature"}
+        dicts, and every (doc_id, chunk_id) reference.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id, hash, canonical_id, signature FROM chunks").fetchall()
+            refs = self._conn.execute("SELECT doc_id, chunk_id FROM chunk_refs").fetchall()
+        chunks = [{
+            "id": chunk_id,
+            "hash": key,
+            "canonical_id": canonical_id,
+            "signature": np.frombuffer(signature, dtype=np.int64) if signature is not None else None,
+        } for chunk_id, key, canonical_id, signature in rows]
+        return chunks, refs
+
+    def add_chunks(self, documents: Iterable[Dict[str, Any]], signatures: Iterable[Optional[np.ndarray]]):
+        """
+        Records newly stored chunk documents, each referenced by its own doc_id.
+        """
+        chunks, refs = [], []
+        for doc, signature in zip(documents, signatures):
+            chunks.append((doc["id"], doc["metadata"]["content_hash"], doc["metadata"].get("canonical_id"),
+                           signature.astype(np.int64).tobytes() if signature is not None else None))
+            refs.append((doc["metadata"]["doc_id"], doc["id"]))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", chunks)
+            self._conn.executemany("INSERT OR IGNORE INTO chunk_refs VALUES (?, ?)", refs)
+            self._conn.commit()
+
+    def add_refs(self, refs: Iterable[Tuple[str, str]]):
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO chunk_refs VALUES (?, ?)", list(refs))
+            self._conn.commit()
+
+    def release(self, refs: Iterable[Tuple[str, str]], dead_ids: Iterable[str]):
+        """
+        Drops (doc_id, chunk_id) references and forgets the chunks no document references any more.
+        """
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunk_refs WHERE doc_id = ? AND chunk_id = ?", list(refs))
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id in dead_ids])
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
@@ -1,58 +1,518 @@
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone, ServerlessSpec
 from app.config import settings
+from app.services.vector_index import normalize_rows
+from app.services.quantization import create_vector_index
+from app.services.ann_index import create_search_backend
+from app.services.persistent_store import PersistentVectorStore
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.cache import LRUCache, normalize_query_text
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.services.text_chunker import iter_chunks
+from app.services.vector_store import PineconeRestVectorStore, PineconeVectorStore
+from app.services.embedding_cache import EmbeddingCache, content_hash
+from app.services.tombstones import TombstoneBitmap
+from app.services.metadata_index import MetadataIndex
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.chunk_registry import RemoteChunkRegistry
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Set, Callable
+from contextlib import contextmanager
+import asyncio
+import copy
+import threading
+import time
 import uuid
 
-# Initialize Pinecone with new API - handle dummy credentials gracefully
-try:
-    pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-    pinecone_available = True
-except Exception as e:
-    print(f"Pinecone initialization failed (using dummy credentials): {e}")
-    pc = None
-    pinecone_available = False
-
-# 2. Initialize Sentence Transformer model
-# Using 'all-MiniLM-L6-v2' which produces 384-dimensional vectors
-try:
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-except Exception as e:
-    print(f"Error loading SentenceTransformer model: {e}")
-    # A real app might have better error handling or a fallback.
-    model = None
+# The embedding model, the Pinecone client and the remote store are created
+# on first use (or by warm_up() at startup), so importing this module stays
+# cheap: sentence_transformers pulls in torch, and pinecone its own client stack.
+_model = None
+_model_failed = False
+_model_lock = threading.Lock()
+pc = None
+_pinecone_initialized = False
+remote_store = None
+_remote_store_initialized = False
+_remote_lock = threading.RLock()
 
 INDEX_NAME = settings.INDEX_NAME
 
-# In-memory storage for testing without Pinecone
+# Dimension of EMBEDDING_MODEL_NAME's vectors, needed to open the local
+# index before the model is loaded; checked once the model loads
+EMBEDDING_DIM = settings.EMBEDDING_DIM
+
+def get_model():
+    """
+    Returns the SentenceTransformer model, loading it on first call, or None if it cannot be loaded.
+    """
+    global _model, _model_failed
+    if _model is None and not _model_failed:
+        with _model_lock:
+            if _model is None and not _model_failed:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME)
+                    dim = model.get_sentence_embedding_dimension()
+                    if dim != EMBEDDING_DIM:
+                        raise ValueError(f"{settings.EMBEDDING_MODEL_NAME} produces {dim}-d vectors, "
+                                         f"but EMBEDDING_DIM is {EMBEDDING_DIM}")
+                    _model = model
+                except Exception as e:
+                    print(f"Error loading SentenceTransformer model: {e}")
+                    _model_failed = True
+    return _model
+
+def get_pinecone_client():
+    """
+    Returns the Pinecone client, creating it on first call, or None when Pinecone is unavailable.
+    """
+    global pc, _pinecone_initialized
+    if not _pinecone_initialized:
+        with _remote_lock:
+            if not _pinecone_initialized:
+                # Handle dummy credentials gracefully
+                try:
+                    from pinecone import Pinecone
+                    pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+                except Exception as e:
+                    print(f"Pinecone initialization failed (using dummy credentials): {e}")
+                    pc = None
+                _pinecone_initialized = True
+    return pc
+
+def get_remote_store():
+    """
+    Returns the remote vector store, creating it (and the Pinecone index, if
+    missing) and loading the bookkeeping of its chunks on first call, or None
+    when Pinecone is unavailable.
+    """
+    global remote_store, _remote_store_initialized
+    if not _remote_store_initialized:
+        client = None if settings.PINECONE_HOST else get_pinecone_client()
+        # Writers call this with store_lock held, so it is taken before _remote_lock here too
+        with store_lock, _remote_lock:
+            if not _remote_store_initialized:
+                if client is not None:
+                    create_pinecone_index_if_not_exists()
+                remote_store = create_remote_store()
+                load_remote_chunks()
+                _remote_store_initialized = True
+    return remote_store
+
+def warm_up():
+    """
+    Loads the embedding model (running one encode so lazy kernels are
+    initialised) and connects the remote store ahead of the first request.
+    """
+    start = time.perf_counter()
+    if get_model() is not None:
+        encode_queries(["warm-up"])
+    get_remote_store()
+    print(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+def create_remote_store():
+    """
+    Returns the remote vector store: a Pinecone-compatible REST host when
+    PINECONE_HOST is set (e.g. the local stand-in), otherwise the Pinecone
+    client's index, or None when Pinecone is unavailable.
+    """
+    options = {
+        "batch_size": settings.PINECONE_UPSERT_BATCH_SIZE,
+        "max_in_flight": settings.PINECONE_MAX_IN_FLIGHT,
+    }
+    if settings.PINECONE_HOST:
+        return PineconeRestVectorStore(settings.PINECONE_HOST, settings.PINECONE_API_KEY, **options)
+    client = get_pinecone_client()
+    if client is not None:
+        return PineconeVectorStore(lambda: client.Index(INDEX_NAME), **options)
+    return None
+
+def _new_vector_index():
+    return create_vector_index(
+        EMBEDDING_DIM,
+        quantization=settings.VECTOR_QUANTIZATION,
+        rescore=settings.VECTOR_RESCORE,
+        rescore_factor=settings.VECTOR_RESCORE_FACTOR,
+        keep_float32=settings.VECTOR_RESCORE_KEEP_FLOAT32,
+    )
+
+def _new_search_backend(index):
+    return create_search_backend(
+        settings.LOCAL_VECTOR_BACKEND,
+        index,
+        nlist=settings.IVF_NLIST,
+        nprobe=settings.IVF_NPROBE,
+    )
+
+# In-memory storage for testing without Pinecone.
+# Row i of in_memory_index holds the embedding of in_memory_documents[i].
 in_memory_documents = []
-in_memory_embeddings = []
+in_memory_index = _new_vector_index()
+search_backend = _new_search_backend(in_memory_index)
+
+# Serialises writers (uploads, deletes, background ingestion, reloads); searches read without locking
+store_lock = threading.RLock()
+
+# BM25 inverted index over the same rows, used by the "hybrid" search mode
+lexical_index = BM25Index()
+
+# Metadata fields search results can be filtered on. doc_id rows follow the
+# chunk references (deduplicated chunks belong to several documents); the
+# other fields come from the metadata of the upload that stored the chunk.
+FILTER_FIELDS = ("doc_id", "domain", "source")
+
+def _new_metadata_index() -> MetadataIndex:
+    return MetadataIndex(fields=("domain", "source"), dense_fields=("domain",))
+
+metadata_index = _new_metadata_index()
+
+# Deleted rows, skipped by searches until compact_store() rewrites the index
+tombstones = TombstoneBitmap()
+
+# Compaction replaces the objects above; searches take them together via _local_store()
+_swap_lock = threading.Lock()
+compaction_stats = {"compactions": 0, "removed_rows": 0, "last_duration_seconds": None}
+_compaction_thread = None
+# Builds the BM25 index of the store loaded at startup, see load_persistent_store()
+_lexical_build_thread = None
+
+SEARCH_MODES = ("vector", "hybrid")
+
+# On-disk copy of the in-memory store, opened by load_persistent_store()
+persistent_store = None
+
+# Callables run with the newly stored chunk documents after every store,
+# e.g. to summarise them in the background (see summary_precompute)
+chunk_store_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+# Chunk bookkeeping for both the local and the remote store. A deduplicated
+# chunk is shared by every document containing it, so it is only deleted
+# once no document references it. chunk_records maps a chunk id to its
+# content hash, referencing doc ids and local row (None for remote chunks).
+chunk_ids_by_hash: Dict[str, str] = {}
+chunk_records: Dict[str, Dict[str, Any]] = {}
+document_chunks: Dict[str, Set[str]] = {}
+
+# Content hashes of new chunks being embedded and stored. Uploads of the
+# same text wait on _pending_done until they are stored (and then just
+# reference them) or dropped after a failure (and then store them).
+_pending_hashes: Set[str] = set()
+_pending_done = threading.Condition(store_lock)
+
+# MinHash/LSH index over stored chunk texts. A new chunk that nearly matches
+# a stored one is linked to that chunk's canonical chunk (metadata
+# "canonical_id"), and search results keep one chunk per canonical group;
+# with NEAR_DUPLICATE_ACTION="collapse" it is not stored at all and the
+# document references the matching chunk instead, like an exact duplicate.
+NEAR_DUPLICATE_ACTIONS = ("link", "collapse")
+
+def _new_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    if not settings.NEAR_DUPLICATE_DETECTION:
+        return None
+    return NearDuplicateIndex(settings.NEAR_DUPLICATE_THRESHOLD, settings.MINHASH_PERMUTATIONS, settings.LSH_BANDS)
+
+near_duplicate_index = _new_near_duplicate_index()
+near_duplicate_stats = {"linked": 0, "collapsed": 0}
+
+# Bookkeeping of the remote store's chunks, loaded with the remote store by load_remote_chunks()
+remote_chunk_registry = None
+
+# Chunk embeddings by content hash, opened on first use by get_embedding_cache()
+embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+_embedding_cache_failed = False
 
 MIN_SIMILARITY_THRESHOLD = 0.4 # Only return results above this similarity
 
+# Bumped on every upsert; part of the result-cache key so cached top-k lists never outlive the index they came from
+index_version = 0
+query_embedding_cache = LRUCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL_SECONDS)
+search_result_cache = LRUCache(settings.SEARCH_RESULT_CACHE_SIZE, settings.SEARCH_RESULT_CACHE_TTL_SECONDS)
+
+def _result_cache_key(query: str, top_k: int, mode: str = "vector", filters: Optional[Dict[str, List[str]]] = None):
+    filter_key = tuple(sorted((field, tuple(sorted(values))) for field, values in (filters or {}).items()))
+    return (normalize_query_text(query), top_k, mode, filter_key, index_version)
+
+def parse_filter(expression: Optional[str]) -> Optional[Dict[str, List[str]]]:
+    """
+    Parses a search filter such as "domain:water" or "domain:water,domain:waste,doc_id:abc".
+    Conditions on different fields must all match; repeating a field matches any of its values.
+    """
+    if not expression or not expression.strip():
+        return None
+    filters: Dict[str, List[str]] = {}
+    for condition in expression.split(","):
+        field, separator, value = condition.partition(":")
+        field, value = field.strip(), value.strip()
+        if not separator or not value:
+            raise ValueError(f"Invalid filter condition '{condition.strip()}', expected field:value")
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field '{field}', expected one of: {', '.join(FILTER_FIELDS)}")
+        filters.setdefault(field, []).append(value)
+    return filters
+
+def mark_index_updated():
+    """
+    Invalidates cached search results after the index changes.
+    """
+    global index_version
+    index_version += 1
+    search_result_cache.clear()
+
+def vector_store_stats() -> Dict[str, Any]:
+    """
+    Upsert throughput and latency of the remote store, plus the local store size.
+    """
+    remote = get_remote_store()
+    return {
+        "remote": type(remote).__name__ if remote is not None else None,
+        "remote_stats": remote.stats() if remote is not None else None,
+        "local_chunks": len(in_memory_documents),
+        "local_deleted_chunks": len(tombstones),
+        "documents": len(document_chunks),
+        "lexical_index_ready": lexical_index.ready,
+        "near_duplicates": dict(near_duplicate_stats, indexed=len(near_duplicate_index)) if near_duplicate_index is not None else None,
+        "compaction": dict(compaction_stats, running=_compaction_thread is not None and _compaction_thread.is_alive()),
+    }
+
+def cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters of the query-embedding and search-result caches.
+    """
+    return {
+        "index_version": index_version,
+        "query_embeddings": query_embedding_cache.stats(),
+        "search_results": search_result_cache.stats(),
+        "chunk_embeddings": embedding_cache.stats() if embedding_cache is not None else None,
+    }
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Opens the persistent chunk-embedding cache, or returns None if it is disabled or unavailable.
+    """
+    global embedding_cache, _embedding_cache_failed
+    if embedding_cache is None and settings.EMBEDDING_CACHE_PATH and not _embedding_cache_failed:
+        with _embedding_cache_lock:
+            if embedding_cache is None and not _embedding_cache_failed:
+                try:
+                    embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_MODEL_NAME)
+                except Exception as e:
+                    print(f"Error opening embedding cache: {e}")
+                    _embedding_cache_failed = True
+    return embedding_cache
+
+def load_persistent_store():
+    """
+    Opens the on-disk vector store and memory-maps its embeddings into the
+    in-memory index. Called once from the application's startup hook.
+    """
+    global persistent_store
+    if not settings.VECTOR_STORE_DIR or persistent_store is not None:
+        return
+    try:
+        store = PersistentVectorStore(settings.VECTOR_STORE_DIR, EMBEDDING_DIM)
+        embeddings, documents = store.load()
+    except Exception as e:
+        print(f"Error loading persistent vector store: {e}")
+        return
+    with store_lock:
+        # Vector search is available right away; hybrid search once the BM25 index is built
+        _install_local_store(embeddings, documents, store.tombstoned_rows(), build_lexical=False)
+        _register_local_chunks(documents, tombstones.mask(len(documents)), store.chunk_refs())
+        persistent_store = store
+        _start_lexical_build(documents)
+    print(f"Loaded {len(in_memory_documents)} chunks from {settings.VECTOR_STORE_DIR}")
+
+def _start_lexical_build(documents: List[Dict[str, Any]]):
+    global _lexical_build_thread
+    _lexical_build_thread = threading.Thread(target=_build_lexical_index, args=(documents,),
+                                             name="lexical-index-build", daemon=True)
+    _lexical_build_thread.start()
+
+def _build_lexical_index(documents: List[Dict[str, Any]]):
+    """
+    Builds the BM25 index of the local store loaded with documents, then
+    indexes the chunks stored meanwhile and swaps it in, unless the local
+    store was replaced (e.g. compacted) in the meantime.
+    """
+    global lexical_index
+    start = time.perf_counter()
+    lexical = BM25Index()
+    count = len(documents)
+    for row in range(count):
+        lexical.add(row, documents[row]["text"])
+    with store_lock:
+        if in_memory_documents is not documents:
+            return
+        for row in range(count, len(documents)):
+            lexical.add(row, documents[row]["text"])
+        with _swap_lock:
+            lexical_index = lexical
+        mark_index_updated()
+    print(f"Built BM25 index of {len(lexical)} chunks in {time.perf_counter() - start:.2f}s")
+
+def load_remote_chunks():
+    """
+    Opens the remote chunk registry and registers the remote store's chunks
+    and their references, so documents stored before a restart can be
+    deleted and deduplicated against. Called by get_remote_store() once it
+    created the remote store; does nothing without one.
+    """
+    global remote_chunk_registry
+    if not settings.REMOTE_CHUNK_REGISTRY_PATH or remote_chunk_registry is not None or remote_store is None:
+        return
+    try:
+        registry = RemoteChunkRegistry(settings.REMOTE_CHUNK_REGISTRY_PATH)
+        chunks, refs = registry.load()
+    except Exception as e:
+        print(f"Error loading remote chunk registry: {e}")
+        return
+    with store_lock:
+        for chunk in chunks:
+            if chunk["id"] in chunk_records:
+                continue
+            chunk_records[chunk["id"]] = {"hash": chunk["hash"], "documents": set(), "row": None}
+            chunk_ids_by_hash.setdefault(chunk["hash"], chunk["id"])
+            signature = chunk["signature"]
+            if near_duplicate_index is not None and signature is not None \
+                    and len(signature) == near_duplicate_index.hasher.num_perm:
+                near_duplicate_index.add(chunk["id"], signature, chunk["canonical_id"])
+        for doc_id, chunk_id in refs:
+            record = chunk_records.get(chunk_id)
+            if record is not None and record["row"] is None:
+                _add_reference(doc_id, chunk_id)
+        remote_chunk_registry = registry
+    print(f"Loaded {len(chunks)} remote chunks from {settings.REMOTE_CHUNK_REGISTRY_PATH}")
+
+def _local_store():
+    """
+    Returns (documents, index, search backend, lexical index, metadata index,
+    tombstones) as one consistent set.
+    """
+    with _swap_lock:
+        return in_memory_documents, in_memory_index, search_backend, lexical_index, metadata_index, tombstones
+
+def _install_local_store(embeddings: Optional[np.ndarray], documents: List[Dict[str, Any]],
+                         dead_rows: np.ndarray, index=None, build_lexical: bool = True):
+    """
+    Replaces the local store with documents and their normalised embeddings
+    (or an already built index), rebuilding the search structures. Without
+    build_lexical, the BM25 index is left empty and not ready, for the
+    caller to build it later. Must be called with store_lock held.
+    """
+    global in_memory_documents, in_memory_index, search_backend, lexical_index, metadata_index, tombstones
+    if index is None:
+        index = _new_vector_index()
+        if embeddings is not None:
+            index.attach(embeddings)
+    backend = _new_search_backend(index)
+    backend.add(np.arange(len(documents)))
+    lexical = BM25Index()
+    lexical.ready = build_lexical
+    metadata = _new_metadata_index()
+    for row, doc in enumerate(documents):
+        if build_lexical:
+            lexical.add(row, doc["text"])
+        metadata.add_document(row, doc["metadata"])
+    bitmap = TombstoneBitmap()
+    bitmap.add(dead_rows)
+    with _swap_lock:
+        in_memory_documents, in_memory_index, search_backend, lexical_index, metadata_index, tombstones = \
+            documents, index, backend, lexical, metadata, bitmap
+    mark_index_updated()
+
+def _register_local_chunks(documents: List[Dict[str, Any]], dead: Optional[np.ndarray], refs: List[tuple]):
+    for chunk_id in [chunk_id for chunk_id, record in chunk_records.items() if record["row"] is not None]:
+        _forget_chunk(chunk_id)
+    for row, doc in enumerate(documents):
+        if dead is not None and dead[row]:
+            doc.pop("signature", None)
+            continue
+        key = doc["metadata"].get("content_hash") or content_hash(doc["text"])
+        chunk_records[doc["id"]] = {"hash": key, "documents": set(), "row": row}
+        chunk_ids_by_hash.setdefault(key, doc["id"])
+        _index_near_duplicate(doc)
+    for doc_id, chunk_id in refs:
+        if chunk_id in chunk_records:
+            _add_reference(doc_id, chunk_id)
+    # Stores written before references were recorded fall back to the chunk's own doc_id
+    for row, doc in enumerate(documents):
+        record = chunk_records.get(doc["id"])
+        if record is not None and record["row"] == row and not record["documents"]:
+            _add_reference(doc["metadata"]["doc_id"], doc["id"])
+
+def _register_new_chunks(documents: List[Dict[str, Any]], rows: Optional[np.ndarray] = None):
+    for i, doc in enumerate(documents):
+        key = doc["metadata"].get("content_hash") or content_hash(doc["text"])
+        chunk_records[doc["id"]] = {"hash": key, "documents": set(), "row": int(rows[i]) if rows is not None else None}
+        chunk_ids_by_hash.setdefault(key, doc["id"])
+        _index_near_duplicate(doc)
+        _add_reference(doc["metadata"]["doc_id"], doc["id"])
+
+def _index_near_duplicate(doc: Dict[str, Any]):
+    # The signature computed by _new_chunks (or stored with the chunk) is only needed until the chunk is indexed
+    signature = doc.pop("signature", None)
+    if near_duplicate_index is None:
+        return
+    if signature is None or len(signature) != near_duplicate_index.hasher.num_perm:
+        signature = near_duplicate_index.hasher.signature(doc["text"])
+    near_duplicate_index.add(doc["id"], signature, doc["metadata"].get("canonical_id"))
+
+def _add_reference(doc_id: str, chunk_id: str):
+    record = chunk_records[chunk_id]
+    record["documents"].add(doc_id)
+    document_chunks.setdefault(doc_id, set()).add(chunk_id)
+    if record["row"] is not None:
+        metadata_index.add(record["row"], "doc_id", doc_id)
+
+def _forget_chunk(chunk_id: str):
+    record = chunk_records.pop(chunk_id)
+    if chunk_ids_by_hash.get(record["hash"]) == chunk_id:
+        del chunk_ids_by_hash[record["hash"]]
+    if near_duplicate_index is not None:
+        near_duplicate_index.remove(chunk_id)
+    for doc_id in record["documents"]:
+        chunks = document_chunks.get(doc_id)
+        if chunks is not None:
+            chunks.discard(chunk_id)
+            if not chunks:
+                del document_chunks[doc_id]
+
+def snapshot_store(destination: str):
+    """
+    Copies the persistent vector store into destination.
+    """
+    if persistent_store is None:
+        raise Exception("Persistent vector store is not enabled.")
+    persistent_store.snapshot(destination)
+
+def restore_store(source: str):
+    """
+    Replaces the persistent vector store with a snapshot and reloads it.
+    """
+    global persistent_store
+    if persistent_store is None:
+        raise Exception("Persistent vector store is not enabled.")
+    with store_lock:
+        persistent_store.restore(source)
+        persistent_store = None
+        load_persistent_store()
+
 def create_pinecone_index_if_not_exists():
     """
     Checks if the target Pinecone index exists, and creates it if it doesn't.
     """
-    if not pinecone_available:
+    pc = get_pinecone_client()
+    if pc is None:
         print("Pinecone not available (using dummy credentials). Using in-memory storage.")
         return
         
-    if model is None:
-        print("SentenceTransformer model not loaded. Cannot create index.")
-        return
-        
     try:
-        if pc is None:
-            print("Pinecone client is None. Using in-memory storage.")
-            return
-            
+        from pinecone import ServerlessSpec
         if INDEX_NAME not in pc.list_indexes().names():
             print(f"Index '{INDEX_NAME}' not found. Creating a new one...")
             pc.create_index(
                 name=INDEX_NAME,
-                dimension=model.get_sentence_embedding_dimension(),
+                dimension=EMBEDDING_DIM,
                 metric='cosine',
                 spec=ServerlessSpec(cloud='aws', region='us-east-1')
             )
@@ -62,170 +522,726 @@ def create_pinecone_index_if_not_exists():
     except Exception as e:
         print(f"Error creating Pinecone index (using dummy credentials): {e}")
 
-def embed_and_store(doc_id: str, text: str):
+def embed_and_store(doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
     """
-    Embeds a chunk of text and stores it in the Pinecone index or in-memory storage.
+    Chunks and embeds a document and stores it in the Pinecone index or in-memory storage.
+    metadata (e.g. domain and source file) is attached to every chunk.
     """
-    if model is None:
+    if get_model() is None:
         raise Exception("SentenceTransformer model is not available.")
 
     try:
-        # Create embedding
-        embedding = model.encode(text).tolist()
-        
-        # Store in Pinecone if available
-        if pinecone_available and pc is not None:
-            try:
-                index = pc.Index(INDEX_NAME)
-                index.upsert(vectors=[(doc_id, embedding, {"text": text})])
-                print(f"Successfully embedded and stored document chunk: {doc_id}")
-            except Exception as e:
-                print(f"Error storing in Pinecone: {e}")
-                # Fall back to in-memory storage
-                store_in_memory(doc_id, text, embedding)
-        else:
-            # Use in-memory storage
-            store_in_memory(doc_id, text, embedding)
-            
+        chunks = split_text_into_chunks(text)
+        store_chunks(doc_id, chunks, metadata=metadata)
+        print(f"Successfully embedded and stored document {doc_id} ({len(chunks)} chunks)")
     except Exception as e:
         print(f"Error creating embedding: {e}")
         raise
 
-def store_in_memory(doc_id: str, text: str, embedding: List[float]):
+def encode_chunks(chunks: List[str], hashes: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Encodes all chunks in batched model calls and returns a (len(chunks), dim)
+    float32 matrix. Chunks found in the embedding cache are not re-encoded.
+    """
+    if not chunks:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    cache = get_embedding_cache()
+    if cache is None:
+        return _encode(chunks)
+    if hashes is None:
+        hashes = [content_hash(chunk) for chunk in chunks]
+    cached = cache.get_many(hashes)
+    embeddings = np.empty((len(chunks), EMBEDDING_DIM), dtype=np.float32)
+    missing = [i for i, key in enumerate(hashes) if key not in cached]
+    for i, key in enumerate(hashes):
+        if key in cached:
+            embeddings[i] = cached[key]
+    if missing:
+        encoded = _encode([chunks[i] for i in missing])
+        embeddings[missing] = encoded
+        cache.put_many({hashes[i]: embedding for i, embedding in zip(missing, encoded)})
+    return embeddings
+
+def _encode(chunks: List[str]) -> np.ndarray:
+    return get_model().encode(
+        chunks,
+        batch_size=settings.EMBED_BATCH_SIZE,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    ).astype(np.float32, copy=False)
+
+def _new_chunks(doc_id: str, chunks: List[str], first_chunk_index: int = 0,
+                metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Builds the chunk documents that still need to be stored. With
+    DEDUPLICATE_CHUNKS, a chunk whose text is already stored (or repeated
+    within the batch) is not stored again; doc_id just references it.
+    Near-duplicates of stored chunks are linked or collapsed (see
+    NEAR_DUPLICATE_ACTION). The caller must pass the returned documents to
+    _release_pending() once they are stored or failed to store.
+    """
+    documents = []
+    references = []
+    seen = set()
+    keys = [content_hash(chunk) for chunk in chunks]
+    # Near-duplicates within the batch are linked; only stored chunks can be collapsed into
+    batch_index = _new_near_duplicate_index()
+    with store_lock:
+        # Waiting before reserving anything, so two uploads never wait on each other
+        while settings.DEDUPLICATE_CHUNKS and not _pending_hashes.isdisjoint(keys):
+            _pending_done.wait()
+        for i, chunk in enumerate(chunks):
+            key = keys[i]
+            # The hash suffix keeps ids of a replaced document's new version distinct from the old one
+            chunk_id = f"{doc_id}_chunk_{first_chunk_index + i}_{key[:12]}"
+            existing = chunk_ids_by_hash.get(key) if settings.DEDUPLICATE_CHUNKS else None
+            if existing is None and chunk_id in chunk_records:
+                existing = chunk_id
+            if existing is not None:
+                references.append(existing)
+                continue
+            identity = key if settings.DEDUPLICATE_CHUNKS else chunk_id
+            if identity in seen:
+                continue
+            seen.add(identity)
+            document = {
+                "id": chunk_id,
+                "text": chunk,
+                "metadata": {**(metadata or {}), "text": chunk, "doc_id": doc_id, "content_hash": key}
+            }
+            if near_duplicate_index is not None:
+                signature = document["signature"] = near_duplicate_index.hasher.signature(chunk)
+                match = near_duplicate_index.find(signature, accept=lambda other: _can_link(doc_id, other))
+                if match is not None and settings.NEAR_DUPLICATE_ACTION == "collapse":
+                    references.append(match[0])
+                    near_duplicate_stats["collapsed"] += 1
+                    continue
+                canonical_id = near_duplicate_index.canonical(match[0]) if match is not None else None
+                if canonical_id is None:
+                    batch_match = batch_index.find(signature)
+                    canonical_id = batch_index.canonical(batch_match[0]) if batch_match is not None else None
+                if canonical_id is not None:
+                    document["metadata"]["canonical_id"] = canonical_id
+                    near_duplicate_stats["linked"] += 1
+                batch_index.add(chunk_id, signature, canonical_id)
+            documents.append(document)
+            if settings.DEDUPLICATE_CHUNKS:
+                _pending_hashes.add(key)
+        remote_references = {}
+        if references:
+            for chunk_id in references:
+                _add_reference(doc_id, chunk_id)
+            if persistent_store is not None:
+                persistent_store.add_refs([(doc_id, chunk_id) for chunk_id in references
+                                           if chunk_records[chunk_id]["row"] is not None])
+            if remote_chunk_registry is not None:
+                remote_chunk_registry.add_refs([(doc_id, chunk_id) for chunk_id in references
+                                                if chunk_records[chunk_id]["row"] is None])
+            remote_references = _remote_doc_ids(references)
+    _update_remote_metadata(remote_references)
+    return documents
+
+def _release_pending(documents: List[Dict[str, Any]]):
+    with store_lock:
+        _pending_hashes.difference_update(doc["metadata"]["content_hash"] for doc in documents)
+        _pending_done.notify_all()
+
+def _remote_doc_ids(chunk_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Metadata updates listing, in "doc_ids", every document referencing each
+    remote chunk, so remote doc_id filters find deduplicated chunks too.
+    Must be called with store_lock held.
+    """
+    return {chunk_id: {"doc_ids": sorted(chunk_records[chunk_id]["documents"])} for chunk_id in set(chunk_ids)
+            if chunk_id in chunk_records and chunk_records[chunk_id]["row"] is None}
+
+def _update_remote_metadata(updates: Dict[str, Dict[str, Any]]):
+    remote_store = get_remote_store()
+    if updates and remote_store is not None:
+        try:
+            remote_store.update_metadata(updates)
+        except Exception as e:
+            print(f"Error updating chunk metadata in Pinecone: {e}")
+
+def _can_link(doc_id: str, chunk_id: str) -> bool:
+    """
+    Whether a new chunk of doc_id may be linked to or collapsed into chunk_id.
+    Chunks only the previous version of a document being replaced uses are
+    about to be deleted, so they are skipped.
+    """
+    record = chunk_records.get(chunk_id)
+    if record is None:
+        return False
+    return bool(record["documents"] - {doc_id}) or chunk_id in document_chunks.get(doc_id, ())
+
+def store_in_memory(doc_id: str, text: str):
     """
     Store document in in-memory storage for testing.
     """
-    global in_memory_documents, in_memory_embeddings
-    
-    if model is None:
+    if get_model() is None:
         print("Model not available for embedding")
         return
     
-    # Split text into chunks for better search
-    chunks = split_text_into_chunks(text, max_chunk_size=1000)
-    
-    for i, chunk in enumerate(chunks):
-        chunk_id = f"{doc_id}_chunk_{i}"
-        chunk_embedding = model.encode(chunk).tolist()
-        
-        in_memory_documents.append({
-            "id": chunk_id,
-            "text": chunk,
-            "metadata": {"text": chunk, "doc_id": doc_id}
-        })
-        in_memory_embeddings.append(chunk_embedding)
+    # Split text into chunks for better search, then embed them in one batched call
+    chunks = split_text_into_chunks(text)
+    documents = _new_chunks(doc_id, chunks)
+    if documents:
+        try:
+            embeddings = encode_chunks([doc["text"] for doc in documents],
+                                       [doc["metadata"]["content_hash"] for doc in documents])
+            _store_chunks_in_memory(normalize_rows(embeddings), documents)
+        finally:
+            _release_pending(documents)
+        _notify_stored(documents)
     
     print(f"Stored document {doc_id} in memory with {len(chunks)} chunks")
 
-def split_text_into_chunks(text: str, max_chunk_size: int = 1000) -> List[str]:
+def store_chunks(doc_id: str, chunks: List[str], first_chunk_index: int = 0,
+                 metadata: Optional[Dict[str, Any]] = None) -> int:
     """
-    Split text into smaller chunks for better search results.
+    Embeds a batch of chunks of one document and upserts them to the remote
+    vector store in parallel batches, falling back to the in-memory store
+    (and the persistent store, if enabled). Chunk ids are numbered from
+    first_chunk_index so a document can be stored in batches. Returns the
+    number of chunks stored; already-stored chunk texts are skipped.
     """
-    words = text.split()
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    
-    for word in words:
-        if current_size + len(word) + 1 > max_chunk_size and current_chunk:
-            chunks.append(" ".join(current_chunk))
-            current_chunk = [word]
-            current_size = len(word)
-        else:
-            current_chunk.append(word)
-            current_size += len(word) + 1
+    documents = _new_chunks(doc_id, chunks, first_chunk_index, metadata)
+    if not documents:
+        return 0
+    try:
+        _embed_and_store_documents(documents)
+    finally:
+        _release_pending(documents)
+    _notify_stored(documents)
+    return len(documents)
+
+def _embed_and_store_documents(documents: List[Dict[str, Any]]):
+    embeddings = normalize_rows(encode_chunks(
+        [doc["text"] for doc in documents],
+        [doc["metadata"]["content_hash"] for doc in documents],
+    ))
     
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
+    remote_store = get_remote_store()
+    if remote_store is not None:
+        try:
+            remote_store.upsert([
+                (doc["id"], embedding.tolist(), {**doc["metadata"], "doc_ids": [doc["metadata"]["doc_id"]]})
+                for doc, embedding in zip(documents, embeddings)
+            ])
+            with store_lock:
+                signatures = [doc.get("signature") for doc in documents]
+                _register_new_chunks(documents)
+                if remote_chunk_registry is not None:
+                    remote_chunk_registry.add_chunks(documents, signatures)
+                mark_index_updated()
+            return
+        except Exception as e:
+            print(f"Error storing in Pinecone: {e}")
+            # Fall back to in-memory storage
     
-    return chunks
+    _store_chunks_in_memory(embeddings, documents)
+
+def _notify_stored(documents: List[Dict[str, Any]]):
+    for listener in chunk_store_listeners:
+        try:
+            listener(documents)
+        except Exception as e:
+            print(f"Error notifying chunk store listener: {e}")
+
+def store_chunk_summaries(summaries: Dict[str, str]):
+    """
+    Saves precomputed summaries (by chunk id) in the metadata of stored
+    chunks, locally and in the remote store. Chunks deleted in the meantime
+    are skipped. Summaries do not change rankings, so cached search results
+    are kept; their summaries come from the summary cache instead.
+    """
+    local = {}
+    remote = {}
+    with store_lock:
+        for chunk_id, summary in summaries.items():
+            record = chunk_records.get(chunk_id)
+            if record is None:
+                continue
+            if record["row"] is None:
+                remote[chunk_id] = {"summary": summary}
+            else:
+                in_memory_documents[record["row"]]["metadata"]["summary"] = summary
+                local[chunk_id] = {"summary": summary}
+        if local and persistent_store is not None:
+            persistent_store.update_metadata(local)
+    remote_store = get_remote_store()
+    if remote and remote_store is not None:
+        try:
+            remote_store.update_metadata(remote)
+        except Exception as e:
+            print(f"Error storing summaries in Pinecone: {e}")
+
+def _store_chunks_in_memory(embeddings: np.ndarray, documents: List[Dict[str, Any]]):
+    with store_lock:
+        in_memory_documents.extend(documents)
+        rows = in_memory_index.add(embeddings)
+        search_backend.add(rows)
+        for row, doc in zip(rows, documents):
+            # Until it is ready, the BM25 index is being built and indexes these rows itself
+            if lexical_index.ready:
+                lexical_index.add(int(row), doc["text"])
+            metadata_index.add_document(int(row), doc["metadata"])
+        if persistent_store is not None:
+            for doc, seq in zip(documents, persistent_store.append(embeddings, documents)):
+                doc["seq"] = int(seq)
+        _register_new_chunks(documents, rows)
+        mark_index_updated()
+
+def delete_document(doc_id: str) -> int:
+    """
+    Deletes a document and returns how many chunks it had (0 if doc_id is
+    unknown). Local rows are only tombstoned; chunks shared with other
+    documents are kept until their last reference is deleted.
+    """
+    with store_lock:
+        chunk_ids = set(document_chunks.get(doc_id, ()))
+        if chunk_ids:
+            _release_chunks(doc_id, chunk_ids)
+    maybe_schedule_compaction()
+    return len(chunk_ids)
+
+def replace_document(doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+    """
+    Replaces the content of doc_id with text. Unchanged chunks are reused,
+    and the previous version stays searchable until the new one is stored.
+    """
+    with replacing_document(doc_id):
+        embed_and_store(doc_id, text, metadata)
+
+@contextmanager
+def replacing_document(doc_id: str):
+    """
+    Chunks stored for doc_id inside the block become its new version. When
+    the block completes, chunks only the previous version used are deleted;
+    if it raises, the new chunks are dropped and the previous version kept.
+    """
+    with store_lock:
+        previous = document_chunks.pop(doc_id, set())
+    try:
+        yield
+    except BaseException:
+        with store_lock:
+            _release_chunks(doc_id, set(document_chunks.get(doc_id, ())) - previous)
+            for chunk_id in previous:
+                if chunk_id in chunk_records:
+                    document_chunks.setdefault(doc_id, set()).add(chunk_id)
+        raise
+    with store_lock:
+        _release_chunks(doc_id, previous - document_chunks.get(doc_id, set()))
+    maybe_schedule_compaction()
+
+def _release_chunks(doc_id: str, chunk_ids: Set[str]):
+    """
+    Drops doc_id's references to chunk_ids and deletes the chunks nothing
+    references any more. Must be called with store_lock held.
+    """
+    dead_rows, dead_remote, refs, remote_refs = [], [], [], []
+    moved = {}
+    for chunk_id in chunk_ids:
+        record = chunk_records.get(chunk_id)
+        if record is None or doc_id not in record["documents"]:
+            continue
+        record["documents"].discard(doc_id)
+        chunks = document_chunks.get(doc_id)
+        if chunks is not None:
+            chunks.discard(chunk_id)
+            if not chunks:
+                del document_chunks[doc_id]
+        if record["row"] is not None:
+            refs.append((doc_id, chunk_id))
+            metadata_index.remove(record["row"], "doc_id", doc_id)
+            metadata = in_memory_documents[record["row"]]["metadata"]
+            if record["documents"] and metadata["doc_id"] == doc_id:
+                # Results report the chunk under a document that still references it
+                metadata["doc_id"] = min(record["documents"])
+                moved[chunk_id] = {"doc_id": metadata["doc_id"]}
+        else:
+            remote_refs.append((doc_id, chunk_id))
+        if not record["documents"]:
+            _forget_chunk(chunk_id)
+            if record["row"] is not None:
+                dead_rows.append(record["row"])
+            else:
+                dead_remote.append(chunk_id)
+    if persistent_store is not None and refs:
+        # Other worker processes append to the same store, so rows are identified by sequence number there
+        persistent_store.release(refs, [in_memory_documents[row]["seq"] for row in dead_rows])
+    if persistent_store is not None and moved:
+        persistent_store.update_metadata(moved)
+    tombstones.add(dead_rows)
+    if remote_chunk_registry is not None and remote_refs:
+        remote_chunk_registry.release(remote_refs, dead_remote)
+    _update_remote_metadata(_remote_doc_ids(chunk_id for _, chunk_id in remote_refs))
+    remote_store = get_remote_store()
+    if dead_remote and remote_store is not None:
+        try:
+            remote_store.delete(dead_remote)
+        except Exception as e:
+            print(f"Error deleting from Pinecone: {e}")
+    mark_index_updated()
+
+def compact_store() -> int:
+    """
+    Rewrites the local index (and the persistent store) without deleted
+    rows, then swaps it in; searches keep using the old index meanwhile.
+    Returns the number of rows removed.
+    """
+    with store_lock:
+        documents, index, _, _, _, deleted = _local_store()
+        mask = deleted.mask(len(index))
+        if mask is None:
+            return 0
+        start = time.perf_counter()
+        removed = len(deleted)
+        if persistent_store is not None:
+            persistent_store.compact()
+            embeddings, documents = persistent_store.load()
+            _install_local_store(embeddings, documents, persistent_store.tombstoned_rows())
+        else:
+            keep = np.flatnonzero(~mask)
+            documents = [documents[row] for row in keep]
+            _install_local_store(None, documents, np.zeros(0, dtype=np.int64), index=index.compacted(keep))
+        dead = tombstones.mask(len(documents))
+        live_ids = set()
+        for row, doc in enumerate(documents):
+            if dead is not None and dead[row]:
+                doc.pop("signature", None)
+                continue
+            live_ids.add(doc["id"])
+            record = chunk_records.get(doc["id"])
+            if record is None:
+                # Appended by another worker process
+                _register_new_chunks([doc], np.array([row]))
+            else:
+                doc.pop("signature", None)
+                record["row"] = row
+                for doc_id in record["documents"]:
+                    metadata_index.add(row, "doc_id", doc_id)
+        # Deleted by another worker process; their old rows no longer exist
+        for chunk_id in [chunk_id for chunk_id, record in chunk_records.items()
+                         if record["row"] is not None and chunk_id not in live_ids]:
+            _forget_chunk(chunk_id)
+        compaction_stats["compactions"] += 1
+        compaction_stats["removed_rows"] += removed
+        compaction_stats["last_duration_seconds"] = time.perf_counter() - start
+    print(f"Compacted local vector store: removed {removed} deleted chunks")
+    return removed
+
+def maybe_schedule_compaction():
+    """
+    Starts compact_store() in a background thread once the deleted rows
+    reach COMPACTION_DEAD_RATIO of the local index.
+    """
+    global _compaction_thread
+    size = len(in_memory_index)
+    if len(tombstones) < settings.COMPACTION_MIN_DEAD_ROWS or \
+            tombstones.dead_ratio(size) < settings.COMPACTION_DEAD_RATIO:
+        return
+    with _swap_lock:
+        if _compaction_thread is not None and _compaction_thread.is_alive():
+            return
+        _compaction_thread = threading.Thread(target=_run_compaction, name="vector-compaction", daemon=True)
+        _compaction_thread.start()
+
+def _run_compaction():
+    try:
+        compact_store()
+    except Exception as e:
+        print(f"Error compacting local vector store: {e}")
+
+def split_text_into_chunks(text: str, max_chunk_size: Optional[int] = None) -> List[str]:
+    """
+    Split text into sentence-aligned chunks sized for the embedding model's
+    token window, optionally also capped at max_chunk_size characters.
+    """
+    return list(iter_chunks(
+        [text],
+        max_tokens=settings.CHUNK_MAX_TOKENS,
+        overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+        max_chars=max_chunk_size,
+    ))
 
-def search_documents(query: str, top_k: int = 5):
+def encode_queries(queries: List[str]) -> np.ndarray:
+    """
+    Encodes a batch of search queries in one model call.
+    """
+    return get_model().encode(queries, batch_size=len(queries), convert_to_numpy=True, show_progress_bar=False)
+
+# Coalesces concurrent query encodes from async routes into batched model calls
+query_batcher = EmbeddingBatcher(
+    encode_queries,
+    max_batch_size=settings.QUERY_BATCH_SIZE,
+    max_wait_ms=settings.QUERY_BATCH_WAIT_MS,
+)
+
+async def search_documents_async(query: str, top_k: int = 5, mode: str = "vector",
+                                 filters: Optional[Dict[str, List[str]]] = None):
+    """
+    Non-blocking search_documents for async routes: the query is encoded by
+    the micro-batcher and the index lookup runs in a worker thread.
+    """
+    # The first search may have to load the model; keep that off the event loop
+    model = _model or await asyncio.to_thread(get_model)
+    if model is None:
+        raise Exception("SentenceTransformer model is not available.")
+    key = _result_cache_key(query, top_k, mode, filters)
+    cached = search_result_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+    query_embedding = query_embedding_cache.get(normalize_query_text(query))
+    if query_embedding is None:
+        try:
+            query_embedding = await query_batcher.encode(query)
+        except Exception as e:
+            print(f"Error encoding query: {e}")
+            return []
+        query_embedding_cache.set(normalize_query_text(query), query_embedding)
+    return await asyncio.to_thread(_search_and_cache, key, query, query_embedding, top_k, mode, filters)
+
+def search_documents(query: str, top_k: int = 5, query_embedding: Optional[np.ndarray] = None,
+                     mode: str = "vector", filters: Optional[Dict[str, List[str]]] = None):
     """
     Embeds a query and searches for similar documents in Pinecone or in-memory storage.
+    A precomputed query_embedding skips the encode step. mode="hybrid" fuses
+    vector and BM25 rankings of the in-memory store (Pinecone is only
+    searched by vector). filters (see
+    parse_filter) restrict the search to chunks with matching metadata.
     """
+    model = get_model()
     if model is None:
         raise Exception("SentenceTransformer model is not available.")
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {mode}")
+    
+    key = _result_cache_key(query, top_k, mode, filters)
+    cached = search_result_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
         
     try:
-        query_embedding = model.encode(query).tolist()
-        
-        # Try Pinecone first
-        if pinecone_available and pc is not None:
-            try:
-                index = pc.Index(INDEX_NAME)
-                results = index.query(
-                    vector=query_embedding,
-                    top_k=top_k,
-                    include_metadata=True
-                )
-                # Handle different Pinecone result formats and ensure JSON serializable
-                if hasattr(results, 'matches'):
-                    matches = results.matches
-                elif isinstance(results, dict) and 'matches' in results:
-                    matches = results['matches']
-                else:
-                    matches = []
-                
-                # Convert to proper format and filter by similarity threshold
-                formatted_results = []
-                for match in matches:
-                    score = float(match.score)
-                    if score >= MIN_SIMILARITY_THRESHOLD:
-                        formatted_results.append({
-                            "id": str(match.id),
-                            "score": score,
-                            "metadata": {
-                                "text": str(match.metadata.get("text", "")),
-                                "doc_id": str(match.metadata.get("doc_id", ""))
-                            }
-                        })
-                return formatted_results
-            except Exception as e:
-                print(f"Error searching Pinecone: {e}")
-                # Fall back to in-memory search
-                return search_in_memory(query_embedding, top_k)
-        else:
-            # Use in-memory search
-            return search_in_memory(query_embedding, top_k)
-            
+        if query_embedding is None:
+            query_embedding = query_embedding_cache.get(normalize_query_text(query))
+        if query_embedding is None:
+            query_embedding = model.encode(query)
+            query_embedding_cache.set(normalize_query_text(query), query_embedding)
     except Exception as e:
         print(f"Error searching documents: {e}")
         return []
+    return _search_and_cache(key, query, query_embedding, top_k, mode, filters)
 
-def search_in_memory(query_embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
-    """
-    Search documents stored in memory using cosine similarity.
-    """
-    if not in_memory_embeddings:
+def _search_and_cache(key, query: str, query_embedding, top_k: int, mode: str,
+                      filters: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    try:
+        results = search_index(query, np.asarray(query_embedding).tolist(), top_k, mode, filters)
+    except Exception as e:
+        print(f"Error searching documents: {e}")
         return []
     
-    # Calculate cosine similarities
-    similarities = []
-    for i, doc_embedding in enumerate(in_memory_embeddings):
-        similarity = cosine_similarity(query_embedding, doc_embedding)
-        similarities.append((similarity, i))
-    
-    # Sort by similarity and get top_k results
-    similarities.sort(reverse=True)
-    results = []
-    
-    count = 0
-    for similarity, idx in similarities:
-        if similarity >= MIN_SIMILARITY_THRESHOLD:
-            doc = in_memory_documents[idx]
-            results.append({
-                "id": str(doc["id"]),
-                "score": float(similarity),
+    search_result_cache.set(key, results)
+    # Callers annotate results (e.g. with summaries), so never hand out the cached objects
+    return copy.deepcopy(results)
+
+def search_index(query: str, query_embedding: List[float], top_k: int, mode: str = "vector",
+                 filters: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    """
+    Searches Pinecone, falling back to in-memory storage, for the nearest chunks.
+    Hybrid mode needs the local inverted index, so it only applies to the
+    in-memory store; while Pinecone holds the chunks it is a vector search.
+    With near-duplicate detection, extra hits are fetched and only the best
+    chunk of each near-duplicate group is returned.
+    """
+    if near_duplicate_index is None:
+        return _search_index(query, query_embedding, top_k, mode, filters)
+    results = _search_index(query, query_embedding, top_k * settings.NEAR_DUPLICATE_OVERFETCH, mode, filters)
+    return collapse_near_duplicates(results, top_k)
+
+def collapse_near_duplicates(results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    Keeps the first (best-ranked) result of each near-duplicate group.
+    """
+    seen = set()
+    collapsed = []
+    for result in results:
+        group = result["metadata"].get("canonical_id") or result["id"]
+        if group in seen:
+            continue
+        seen.add(group)
+        collapsed.append(result)
+        if len(collapsed) == top_k:
+            break
+    return collapsed
+
+def _search_index(query: str, query_embedding: List[float], top_k: int, mode: str,
+                  filters: Optional[Dict[str, List[str]]]) -> List[Dict[str, Any]]:
+    # Try Pinecone first
+    remote_store = get_remote_store()
+    if remote_store is None and mode == "hybrid":
+        return search_in_memory_hybrid(query, query_embedding, top_k, filters=filters)
+    if remote_store is not None:
+        try:
+            matches = remote_store.query(query_embedding, top_k, filter=_remote_filter(filters) if filters else None)
+            # Filter by similarity threshold and ensure JSON serializable
+            return [{
+                "id": match["id"],
+                "score": match["score"],
                 "metadata": {
-                    "text": str(doc["metadata"]["text"]),
-                    "doc_id": str(doc["metadata"]["doc_id"])
+                    "text": str(match["metadata"].get("text", "")),
+                    "doc_id": _remote_result_doc_id(match["metadata"], filters),
+                    **{field: str(match["metadata"][field]) for field in ("domain", "source", "canonical_id", "summary")
+                       if match["metadata"].get(field)}
                 }
-            })
-            count += 1
-            if count >= top_k:
-                break
+            } for match in matches if match["score"] >= MIN_SIMILARITY_THRESHOLD]
+        except Exception as e:
+            print(f"Error searching Pinecone: {e}")
+            # Fall back to in-memory search
+            return search_in_memory(query_embedding, top_k, filters)
+    else:
+        # Use in-memory search
+        return search_in_memory(query_embedding, top_k, filters)
+
+def _remote_filter(filters: Dict[str, List[str]]) -> Dict[str, Any]:
+    """
+    Pinecone metadata filter for parse_filter() conditions. A deduplicated
+    chunk keeps the doc_id of the document that stored it, so doc_id is
+    matched against its doc_ids list, falling back to doc_id for chunks
+    stored before doc_ids was kept.
+    """
+    conditions = []
+    for field, values in filters.items():
+        if field == "doc_id":
+            conditions.append({"$or": [
+                {"doc_ids": {"$in": values}},
+                {"doc_ids": {"$exists": False}, "doc_id": {"$in": values}},
+            ]})
+        else:
+            conditions.append({field: {"$in": values}})
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def _result_doc_id(doc_id: str, references, filters: Optional[Dict[str, List[str]]]) -> str:
+    """
+    The doc_id reported for a chunk stored by doc_id and referenced by the
+    documents in references: with a doc_id filter, the first filtered
+    document referencing the chunk, otherwise doc_id.
+    """
+    wanted = (filters or {}).get("doc_id")
+    if not wanted or doc_id in wanted:
+        return doc_id
+    return next((value for value in wanted if value in references), doc_id)
+
+def _remote_result_doc_id(metadata: Dict[str, Any], filters: Optional[Dict[str, List[str]]]) -> str:
+    doc_id = str(metadata.get("doc_id", ""))
+    # doc_ids (see _remote_doc_ids) no longer lists a deleted document that stored a shared chunk
+    doc_ids = [str(value) for value in metadata.get("doc_ids") or ()]
+    if doc_ids and doc_id not in doc_ids:
+        doc_id = doc_ids[0]
+    return _result_doc_id(doc_id, doc_ids, filters)
+
+def _format_result(documents: List[Dict[str, Any]], idx: int, score: float,
+                   filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+    doc = documents[idx]
+    record = chunk_records.get(doc["id"])
+    metadata = {
+        "text": str(doc["metadata"]["text"]),
+        "doc_id": _result_doc_id(str(doc["metadata"]["doc_id"]), record["documents"] if record else (), filters)
+    }
+    for field in ("domain", "source", "canonical_id", "summary"):
+        if doc["metadata"].get(field):
+            metadata[field] = str(doc["metadata"][field])
+    return {
+        "id": str(doc["id"]),
+        "score": float(score),
+        "metadata": metadata
+    }
+
+def _filter_candidates(metadata: MetadataIndex, filters: Dict[str, List[str]], size: int,
+                       exclude: Optional[np.ndarray]) -> np.ndarray:
+    """
+    Rows matching filters that are not deleted.
+    """
+    mask = metadata.mask(filters, size)
+    if exclude is not None:
+        mask &= ~exclude
+    return np.flatnonzero(mask)
+
+def search_in_memory(query_embedding: List[float], top_k: int,
+                     filters: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    """
+    Search documents stored in memory using cosine similarity. With filters,
+    only the rows whose metadata matches are scored, so a selective filter
+    still returns top_k results and costs less than an unfiltered search.
+    """
+    documents, index, backend, _, metadata, deleted = _local_store()
+    exclude = deleted.mask(len(index))
+    if filters:
+        hits = index.search(query_embedding, top_k, rows=_filter_candidates(metadata, filters, len(index), exclude))
+    else:
+        hits = backend.search(query_embedding, top_k, exclude=exclude)
+    results = []
+    for idx, similarity in hits:
+        if similarity < MIN_SIMILARITY_THRESHOLD:
+            break
+        results.append(_format_result(documents, idx, similarity, filters))
+    
+    return results
+
+def search_in_memory_hybrid(query: str, query_embedding: List[float], top_k: int,
+                            prefilter: Optional[bool] = None,
+                            filters: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    """
+    Fuses BM25 and vector rankings with reciprocal rank fusion.
+
+    With prefilter, only the BM25 candidates are scored against the query
+    embedding instead of the whole index (unless there are fewer lexical
+    candidates than top_k). A fused hit is kept if it matched lexically or
+    its cosine similarity clears MIN_SIMILARITY_THRESHOLD. filters restrict
+    both rankings to rows with matching metadata.
+    """
+    if prefilter is None:
+        prefilter = settings.HYBRID_PREFILTER
+    candidate_count = max(top_k, settings.HYBRID_CANDIDATES)
+    documents, index, backend, bm25, metadata, deleted = _local_store()
+    if not bm25.ready:
+        # The BM25 index is still being built after startup
+        return search_in_memory(query_embedding, top_k, filters)
+    # Rows stored while this search runs may already be in the lexical index; they are left out
+    size = len(index)
+    exclude = deleted.mask(size)
+    candidates = None
+    if filters:
+        candidates = _filter_candidates(metadata, filters, size, exclude)
+        exclude = np.ones(size, dtype=bool)
+        exclude[candidates] = False
+    lexical = [(row, score) for row, score in bm25.search(query, candidate_count, exclude=exclude) if row < size]
+    lexical_rows = np.array([row for row, _ in lexical], dtype=np.int64)
+    if prefilter and len(lexical_rows) >= top_k:
+        vector = index.search(query_embedding, candidate_count, rows=lexical_rows)
+    elif candidates is not None:
+        vector = index.search(query_embedding, candidate_count, rows=candidates)
+    else:
+        vector = backend.search(query_embedding, candidate_count, exclude=exclude)
+    fused = reciprocal_rank_fusion(
+        [[row for row, _ in vector], lexical_rows.tolist()], k=settings.HYBRID_RRF_K
+    )[:top_k]
+    if not fused:
+        return []
     
+    fused_rows = np.array([row for row, _ in fused], dtype=np.int64)
+    similarities = dict(index.search(query_embedding, len(fused_rows), rows=fused_rows))
+    bm25_scores = dict(lexical)
+    results = []
+    for row, rrf_score in fused:
+        similarity = similarities.get(row, 0.0)
+        if row not in bm25_scores and similarity < MIN_SIMILARITY_THRESHOLD:
+            continue
+        result = _format_result(documents, row, similarity, filters)
+        result["rrf_score"] = float(rrf_score)
+        result["bm25_score"] = float(bm25_scores.get(row, 0.0))
+        results.append(result)
     return results
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
@@ -0,0 +1,93 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+
+class EmbeddingBatcher:
+    """
+    Collects query-encode requests from many coroutines and encodes them
+    together on a dedicated worker thread.
+
+    The worker waits up to max_wait_ms after the first request of a batch for
+    more to arrive (or until max_batch_size is reached), runs one batched
+    encode call and resolves each caller's future. The event loop only awaits
+    the future, so concurrent searches no longer serialise on model.encode.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def submit(self, text: str) -> Future:
+        """
+        Queues a text for encoding and returns a future for its embedding.
+        """
+        self.start()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    async def encode(self, text: str) -> np.ndarray:
+        """
+        Awaitable embedding of a single text.
+        """
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect(self, first: Tuple[str, Future]) -> Tuple[List[Tuple[str, Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._collect(first)
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                try:
+                    embeddings = self.encode_batch([text for text, _ in batch])
+                    for (_, future), embedding in zip(batch, embeddings):
+                        future.set_result(embedding)
+                except Exception as e:
+                    for _, future in batch:
+                        future.set_exception(e)
+                self.batches += 1
+                self.items += len(batch)
+            if stopping:
+                return
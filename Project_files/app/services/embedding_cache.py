@@ -0,0 +1,79 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+from typing import Any, Dict, List
+
+# SQLite's default limit on bound parameters per statement is 999
+LOOKUP_BATCH_SIZE = 500
+
+def content_hash(text: str) -> str:
+    """
+    Stable identity of a chunk's content, used for caching and deduplication.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Persistent cache of chunk embeddings keyed by content hash and model name.
+
+    Embeddings are stored as raw float32 blobs in a SQLite file, so
+    re-uploading a document only pays for the chunks that actually changed,
+    across restarts and across worker processes. Entries of other models are
+    kept but never returned.
+    """
+
+    def __init__(self, path: str, model_name: str):
+        self.path = path
+        self.model_name = model_name
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "hash TEXT, model TEXT, vector BLOB, PRIMARY KEY (hash, model))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Returns the cached embedding of every hash that is present.
+        """
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for i in range(0, len(unique), LOOKUP_BATCH_SIZE):
+                batch = unique[i:i + LOOKUP_BATCH_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                    [self.model_name, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            self.hits += sum(1 for key in hashes if key in found)
+            self.misses += sum(1 for key in hashes if key not in found)
+        return found
+
+    def put_many(self, embeddings: Dict[str, np.ndarray]):
+        if not embeddings:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [(key, self.model_name, np.asarray(vector, dtype=np.float32).tobytes())
+                 for key, vector in embeddings.items()],
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,23 +1,201 @@
+import asyncio
 import random
 import requests
 import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import numpy as np
 from app.config import settings
+from app.services.cache import LRUCache, normalize_query_text
+from app.services.iam_token import IAMTokenManager
+from app.services.llm_gateway import CircuitBreaker, GatewayRejected, LLMGateway, TokenBucket
+from app.services.semantic_cache import SemanticCache
+from app.services.single_flight import SingleFlight
+from app.services.text_chunker import estimate_tokens
+from app.services.watsonx_client import AsyncWatsonxClient, CHAT_API_VERSION, parse_chat_response
+
+# Shared by every Watsonx call, so IAM is only contacted when the token nears expiry
+token_manager = IAMTokenManager(
+    settings.IAM_URL,
+    settings.WATSONX_API_KEY,
+    expiry_margin=settings.IAM_TOKEN_EXPIRY_MARGIN_SECONDS,
+    refresh_ahead=settings.IAM_TOKEN_REFRESH_AHEAD_SECONDS,
+)
 
 def get_watsonx_token():
-    url = "https://iam.cloud.ibm.com/identity/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "apikey": settings.WATSONX_API_KEY,
-        "grant_type": "urn:ibm:params:oauth:grant-type:apikey"
-    }
-    response = requests.post(url, headers=headers, data=data, timeout=15)
-    response.raise_for_status()
-    return response.json()["access_token"]
+    return token_manager.get_token()
+
+# Async routes go through the pooled client; the synchronous functions
+# (used from worker threads) share one keep-alive requests session
+watsonx_client = AsyncWatsonxClient(
+    settings.WATSONX_URL,
+    settings.WATSONX_PROJECT_ID,
+    settings.WATSONX_MODEL_ID,
+    get_token=get_watsonx_token,
+    invalidate_token=token_manager.invalidate,
+    max_connections=settings.WATSONX_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.WATSONX_MAX_KEEPALIVE_CONNECTIONS,
+    max_concurrency=settings.WATSONX_MAX_CONCURRENT_REQUESTS,
+    timeout=settings.WATSONX_TIMEOUT_SECONDS,
+)
+_session = requests.Session()
+
+# Identical prompts already on their way to Watsonx are not sent again: concurrent
+# callers share the in-flight request and its answer (see COALESCE_LLM_REQUESTS)
+MAX_NEW_TOKENS = 1024
+llm_requests = SingleFlight()
+
+def _flight_key(prompt: str):
+    return settings.WATSONX_MODEL_ID, MAX_NEW_TOKENS, normalize_query_text(prompt)
+
+# Every Watsonx call is admitted by the gateway: bounded concurrency and queue,
+# a request rate limit, and a circuit breaker that fails fast while Watsonx is
+# erroring or slow. Rejected prompts get the last answer to the same prompt
+# (from fallback_responses) or an error message.
+llm_gateway = LLMGateway(
+    CircuitBreaker(
+        failure_rate=settings.LLM_BREAKER_FAILURE_RATE,
+        min_calls=settings.LLM_BREAKER_MIN_CALLS,
+        window=settings.LLM_BREAKER_WINDOW,
+        slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS or None,
+        open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+    ),
+    max_concurrency=settings.WATSONX_MAX_CONCURRENT_REQUESTS,
+    max_queued=settings.LLM_MAX_QUEUED_REQUESTS,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+    rate_limit=TokenBucket(settings.LLM_RATE_LIMIT_PER_SECOND, settings.LLM_RATE_LIMIT_BURST)
+    if settings.LLM_RATE_LIMIT_PER_SECOND > 0 else None,
+)
+# Background work (summary precompute) is admitted by its own gateway and breaker,
+# so it neither takes slots from interactive calls nor opens their circuit
+background_gateway = LLMGateway(
+    CircuitBreaker(
+        failure_rate=settings.LLM_BREAKER_FAILURE_RATE,
+        min_calls=settings.LLM_BREAKER_MIN_CALLS,
+        window=settings.LLM_BREAKER_WINDOW,
+        slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS or None,
+        open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+    ),
+    max_concurrency=settings.SUMMARY_PRECOMPUTE_WORKERS,
+    max_queued=settings.SUMMARY_PRECOMPUTE_WORKERS,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+    rate_limit=TokenBucket(settings.LLM_BACKGROUND_RATE_LIMIT_PER_SECOND, 1)
+    if settings.LLM_BACKGROUND_RATE_LIMIT_PER_SECOND > 0 else None,
+)
+fallback_responses = LRUCache(settings.LLM_FALLBACK_CACHE_SIZE, settings.LLM_FALLBACK_CACHE_TTL_SECONDS)
+
+def _fallback_response(prompt: str, rejection: GatewayRejected) -> str:
+    response = fallback_responses.get(_flight_key(prompt))
+    if response is None:
+        print(f"[GATEWAY] Watsonx call rejected: {rejection}")
+        return f"Error contacting Watsonx: {rejection}"
+    return response
 
-def ask_granite(prompt: str) -> str:
+def gateway_stats() -> Dict[str, Any]:
+    return {**llm_gateway.stats(), "background": background_gateway.stats(),
+            "fallback_responses": fallback_responses.stats()}
+
+# Responses of the functions opted in with SEMANTIC_CACHE_FUNCTIONS, one cache
+# per function. They are keyed by the embedding of the function's input (the
+# question, topic or text) rather than the full prompt, whose fixed
+# instructions would make every prompt of a function look alike.
+semantic_caches: Dict[str, SemanticCache] = {
+    name: SemanticCache(settings.SEMANTIC_CACHE_THRESHOLD, settings.SEMANTIC_CACHE_SIZE,
+                        settings.SEMANTIC_CACHE_TTL_SECONDS)
+    for name in (name.strip() for name in settings.SEMANTIC_CACHE_FUNCTIONS.split(",")) if name
+}
+
+def _semantic_cache(function: str, key: str) -> Optional[SemanticCache]:
+    """
+    function's semantic cache, or None if it has none or key is longer than
+    the embedding model sees (its truncated embedding would not tell apart
+    texts that only differ after the cut).
+    """
+    cache = semantic_caches.get(function)
+    if cache is None or estimate_tokens(key) > settings.SEMANTIC_CACHE_MAX_TOKENS:
+        return None
+    return cache
+
+def _is_error_response(response: str) -> bool:
+    return not response or response.startswith("Error contacting Watsonx") or response.startswith("[ERROR]")
+
+def _embed(text: str) -> Optional[np.ndarray]:
+    # Imported here so the LLM module does not pull in the vector store at import time
+    from app.services.document_embedder import encode_queries, get_model
+    from app.services.vector_index import normalize_rows
+    try:
+        if get_model() is None:
+            return None
+        return normalize_rows(encode_queries([text]))[0]
+    except Exception as e:
+        print(f"Error embedding prompt for the semantic cache: {e}")
+        return None
+
+async def _embed_async(text: str) -> Optional[np.ndarray]:
+    from app.services.document_embedder import get_model, query_batcher
+    from app.services.vector_index import normalize_rows
+    try:
+        if await asyncio.to_thread(get_model) is None:
+            return None
+        return normalize_rows((await query_batcher.encode(text))[np.newaxis])[0]
+    except Exception as e:
+        print(f"Error embedding prompt for the semantic cache: {e}")
+        return None
+
+def _ask_cached(function: str, key: str, prompt: str, background: bool = False) -> str:
+    """
+    ask_granite through function's semantic cache, if it has one; key is the
+    text compared with past prompts.
+    """
+    cache = _semantic_cache(function, key)
+    embedding = _embed(key) if cache is not None else None
+    if embedding is None:
+        return ask_granite(prompt, background)
+    response = cache.get(embedding)
+    if response is None:
+        response = ask_granite(prompt, background)
+        if not _is_error_response(response):
+            cache.set(embedding, response)
+    return response
+
+async def _ask_cached_async(function: str, key: str, prompt: str) -> str:
+    cache = _semantic_cache(function, key)
+    embedding = await _embed_async(key) if cache is not None else None
+    if embedding is None:
+        return await ask_granite_async(prompt)
+    response = cache.get(embedding)
+    if response is None:
+        response = await ask_granite_async(prompt)
+        if not _is_error_response(response):
+            cache.set(embedding, response)
+    return response
+
+def semantic_cache_stats() -> Dict[str, Dict]:
+    return {name: cache.stats() for name, cache in semantic_caches.items()}
+
+def ask_granite(prompt: str, background: bool = False) -> str:
     """
     Sends a prompt to the IBM Watsonx Granite LLM (chat endpoint) and returns the generated response.
+    Background calls are admitted by background_gateway instead of llm_gateway.
     """
+    if not settings.COALESCE_LLM_REQUESTS:
+        return _ask_granite(prompt, background)
+    # Background calls are not merged into interactive ones, which would admit them on the wrong gateway
+    key = ("background",) + _flight_key(prompt) if background else _flight_key(prompt)
+    return llm_requests.do(key, lambda: _ask_granite(prompt, background))
+
+def _ask_granite(prompt: str, background: bool = False) -> str:
+    gateway = background_gateway if background else llm_gateway
+    try:
+        with gateway.admit() as call:
+            response = _send_prompt(prompt)
+            call.failed = _is_error_response(response)
+    except GatewayRejected as e:
+        return _fallback_response(prompt, e)
+    if not call.failed:
+        fallback_responses.set(_flight_key(prompt), response)
+    return response
+
+def _send_prompt(prompt: str) -> str:
     token = get_watsonx_token()
     url = f"{settings.WATSONX_URL}/ml/v1/text/chat"
     headers = {
@@ -30,12 +208,18 @@ def ask_granite(prompt: str) -> str:
             {"role": "user", "content": prompt}
         ],
         "project_id": settings.WATSONX_PROJECT_ID,
-        "parameters": {"max_new_tokens": 1024}
+        "parameters": {"max_new_tokens": MAX_NEW_TOKENS}
     }
-    params = {"version": "2023-05-29"}
+    params = {"version": CHAT_API_VERSION}
     print("Payload being sent to Watsonx (chat endpoint):\n", json.dumps(payload, indent=2))
     try:
-        response = requests.post(url, headers=headers, params=params, json=payload, timeout=30)
+        response = _session.post(url, headers=headers, params=params, json=payload, timeout=settings.WATSONX_TIMEOUT_SECONDS)
+        if response.status_code == 401:
+            # The cached token was revoked or expired early; fetch a new one and retry once
+            token_manager.invalidate(token)
+            token = get_watsonx_token()
+            headers["Authorization"] = f"Bearer {token}"
+            response = _session.post(url, headers=headers, params=params, json=payload, timeout=settings.WATSONX_TIMEOUT_SECONDS)
         print("Watsonx response status:", response.status_code)
         if response.status_code != 200:
             print("Watsonx error response:", response.text)
@@ -43,15 +227,7 @@ def ask_granite(prompt: str) -> str:
         result = response.json()
         print("[DEBUG] Full Watsonx response:", json.dumps(result, indent=2))
         # Extract the generated text from the chat response (new format)
-        if (
-            "choices" in result and result["choices"] and
-            "message" in result["choices"][0] and
-            "content" in result["choices"][0]["message"]
-        ):
-            return result["choices"][0]["message"]["content"]
-        else:
-            print("[ERROR] 'choices' or 'content' missing in Watsonx response.")
-            return f"[ERROR] Unexpected Watsonx response: {json.dumps(result)}"
+        return parse_chat_response(result)
     except Exception as e:
         print(f"[EXCEPTION] Error contacting Watsonx: {e}")
         try:
@@ -60,10 +236,79 @@ def ask_granite(prompt: str) -> str:
             pass
         return f"Error contacting Watsonx: {e}"
 
+async def ask_granite_async(prompt: str) -> str:
+    """
+    ask_granite for async routes: awaits the pooled Watsonx client instead of blocking the event loop.
+    """
+    if not settings.COALESCE_LLM_REQUESTS:
+        return await _ask_granite_async(prompt)
+    return await llm_requests.do_async(_flight_key(prompt), lambda: _ask_granite_async(prompt))
+
+async def _ask_granite_async(prompt: str) -> str:
+    try:
+        async with llm_gateway.admit_async() as call:
+            response = await watsonx_client.chat(prompt, MAX_NEW_TOKENS)
+            call.failed = _is_error_response(response)
+    except GatewayRejected as e:
+        return _fallback_response(prompt, e)
+    if not call.failed:
+        fallback_responses.set(_flight_key(prompt), response)
+    return response
+
 def ask_city_question(prompt: str) -> str:
     """
     Answers only sustainable city, smart city, and urban living related questions. Greets for greetings, politely declines unrelated prompts.
     """
+    reply, full_prompt = _city_question(prompt)
+    return reply if full_prompt is None else _ask_cached("ask_city_question", prompt, full_prompt)
+
+async def ask_city_question_async(prompt: str) -> str:
+    reply, full_prompt = _city_question(prompt)
+    return reply if full_prompt is None else await _ask_cached_async("ask_city_question", prompt, full_prompt)
+
+async def ask_city_question_stream(prompt: str) -> AsyncIterator[str]:
+    """
+    ask_city_question that yields the answer piece by piece as Granite generates it.
+    """
+    reply, full_prompt = _city_question(prompt)
+    if full_prompt is None:
+        yield reply
+        return
+    # A cached answer is sent in one piece; a streamed one is cached once it is complete
+    cache = _semantic_cache("ask_city_question", prompt)
+    embedding = await _embed_async(prompt) if cache is not None else None
+    cached = cache.get(embedding) if embedding is not None else None
+    if cached is not None:
+        yield cached
+        return
+    answer = []
+    try:
+        async with llm_gateway.admit_async() as call:
+            stream = watsonx_client.chat_stream(full_prompt)
+            try:
+                async for delta in stream:
+                    # The breaker times the stream to its first piece, not the client's read
+                    call.responded()
+                    answer.append(delta)
+                    yield delta
+            finally:
+                await stream.aclose()
+    except GatewayRejected:
+        # Nothing was sent yet; serve the last answer if there is one, else report the rejection
+        fallback = fallback_responses.get(_flight_key(full_prompt))
+        if fallback is None:
+            raise
+        yield fallback
+        return
+    if answer:
+        fallback_responses.set(_flight_key(full_prompt), "".join(answer))
+        if embedding is not None:
+            cache.set(embedding, "".join(answer))
+
+def _city_question(prompt: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Returns (canned reply, None) for greetings and unrelated prompts, otherwise (None, prompt for Granite).
+    """
     greetings = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"]
     prompt_lower = prompt.strip().lower()
     if any(greet in prompt_lower for greet in greetings) and len(prompt_lower.split()) <= 3:
@@ -71,7 +316,7 @@ def ask_city_question(prompt: str) -> str:
             "Hello! How can I assist you with smart city or sustainability topics today?",
             "Hi there! Ask me anything about sustainable cities or urban living.",
             "Hey! Ready to help with your city or sustainability questions."
-        ])
+        ]), None
     # Check if the prompt is about city/sustainability topics
     city_keywords = [
         "city", "urban", "municipal", "governance", "transport", "infrastructure", "energy", "waste", "water", "air quality", "public transport", "policy", "sustainability", "eco", "green", "renewable", "smart city", "environment", "climate", "building", "planning", "development"
@@ -83,37 +328,58 @@ def ask_city_question(prompt: str) -> str:
             "environmental impact, and smart urban solutions."
         )
         full_prompt = f"{system_prompt}\n\nUser: {prompt}"
-        return ask_granite(full_prompt)
+        return None, full_prompt
     else:
-        return "I'm here to help with questions about sustainable cities, smart city governance, and urban living. Please ask something related to these topics!"
+        return "I'm here to help with questions about sustainable cities, smart city governance, and urban living. Please ask something related to these topics!", None
 
 def get_sustainability_tips(category: str) -> str:
     """
     Returns generic sustainability tips for any category.
     """
-    prompt = f"Provide 3 practical sustainability tips for the category: {category}."
-    return ask_granite(prompt)
+    return ask_granite(_tips_prompt(category))
 
-def generate_summary(text: str) -> str:
+async def get_sustainability_tips_async(category: str) -> str:
+    return await ask_granite_async(_tips_prompt(category))
+
+def _tips_prompt(category: str) -> str:
+    return f"Provide 3 practical sustainability tips for the category: {category}."
+
+def generate_summary(text: str, background: bool = False) -> str:
     """
     Returns a generic summary of the provided text.
     """
-    prompt = f"Summarize the following policy document in 3-4 sentences:\n\n{text}"
-    return ask_granite(prompt)
+    return _ask_cached("generate_summary", text, _summary_prompt(text), background)
+
+async def generate_summary_async(text: str) -> str:
+    return await _ask_cached_async("generate_summary", text, _summary_prompt(text))
+
+def _summary_prompt(text: str) -> str:
+    return f"Summarize the following policy document in 3-4 sentences:\n\n{text}"
 
 def generate_eco_tip(topic: str) -> str:
     """
     Returns 1 or 2 concise, actionable eco-friendly tips for sustainable cities or city-related sustainability topics.
     """
-    prompt = (
+    return _ask_cached("generate_eco_tip", topic, _eco_tip_prompt(topic))
+
+async def generate_eco_tip_async(topic: str) -> str:
+    return await _ask_cached_async("generate_eco_tip", topic, _eco_tip_prompt(topic))
+
+def _eco_tip_prompt(topic: str) -> str:
+    return (
         f"You are an expert in sustainable cities and urban living. "
         f"Give me 1 or 2 concise, actionable tips for making a city more sustainable, specifically about: {topic}. "
         f"The tips should be practical and focused on city or community-level sustainability."
     )
-    return ask_granite(prompt)
 
 def generate_city_report(kpi_data: dict) -> str:
     """Generates a detailed, well-structured sustainability report based on city KPI data."""
+    return _checked_report(ask_granite(_city_report_prompt(kpi_data)))
+
+async def generate_city_report_async(kpi_data: dict) -> str:
+    return _checked_report(await ask_granite_async(_city_report_prompt(kpi_data)))
+
+def _city_report_prompt(kpi_data: dict) -> str:
     city = kpi_data.get('city_name', 'the city')
     year = kpi_data.get('year', 'the specified year')
 
@@ -150,7 +416,9 @@ Finish with a Summary or Insights section that highlights key findings, areas of
 Format the report with clear markdown headings and bullet points or paragraphs. Make it professional, concise, and easy to read.
 If you cannot generate a report, explain why in a user-friendly way.
 """
-    response = ask_granite(prompt)
+    return prompt
+
+def _checked_report(response: str) -> str:
     if not response or len(response.strip()) < 20 or "sorry" in response.lower() or "couldn't" in response.lower():
         return ("The AI was unable to generate a sustainability report for the provided data. "
                 "Please check your KPI data for completeness and clarity, and try again. "
@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+import requests
+
+class IAMTokenManager:
+    """
+    Caches an IBM Cloud IAM access token for the Watsonx API.
+
+    get_token() returns the cached token until expiry_margin seconds before
+    it expires. Once less than refresh_ahead seconds of its lifetime are
+    left, the next call starts a refresh in a background thread and still
+    returns the current token, so requests only wait for IAM on the very
+    first call or after the token actually lapsed. Concurrent refreshes are
+    coalesced: every caller waits on the one in-flight request.
+    """
+
+    def __init__(self, url: str, api_key: str, expiry_margin: float = 60.0, refresh_ahead: float = 300.0,
+                 timeout: float = 15.0, session: Optional[requests.Session] = None):
+        self.url = url
+        self.api_key = api_key
+        self.expiry_margin = expiry_margin
+        self.refresh_ahead = refresh_ahead
+        self.timeout = timeout
+        self._session = session or requests.Session()
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._inflight: Optional[Future] = None
+        self.requests = 0
+        self.failures = 0
+
+    def get_token(self) -> str:
+        with self._lock:
+            now = time.monotonic()
+            if self._token is not None and now < self._expires_at - self.expiry_margin:
+                if now >= self._refresh_at and self._inflight is None:
+                    future = self._inflight = Future()
+                    threading.Thread(target=self._refresh, args=(future,), name="iam-token-refresh",
+                                     daemon=True).start()
+                return self._token
+            future = self._inflight
+            owner = future is None
+            if owner:
+                future = self._inflight = Future()
+        if owner:
+            self._refresh(future)
+        return future.result(timeout=self.timeout * 2)
+
+    def invalidate(self, token: str):
+        """
+        Drops token (e.g. after the API rejected it with 401) unless it was already replaced.
+        """
+        with self._lock:
+            if self._token == token:
+                self._token = None
+
+    def _refresh(self, future: Future):
+        try:
+            token, expires_in = self._request_token()
+            with self._lock:
+                now = time.monotonic()
+                self._token = token
+                self._expires_at = now + expires_in
+                # Short-lived tokens are refreshed once half their lifetime has passed
+                self._refresh_at = now + max(expires_in - self.refresh_ahead, expires_in / 2)
+            future.set_result(token)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            print(f"Error refreshing IAM token: {e}")
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._inflight is future:
+                    self._inflight = None
+
+    def _request_token(self):
+        with self._lock:
+            self.requests += 1
+        response = self._session.post(
+            self.url,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data={"apikey": self.api_key, "grant_type": "urn:ibm:params:oauth:grant-type:apikey"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        body = response.json()
+        if "expires_in" in body:
+            expires_in = float(body["expires_in"])
+        else:
+            expires_in = float(body["expiration"]) - time.time()
+        return body["access_token"], expires_in
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            valid_for = self._expires_at - time.monotonic() if self._token is not None else None
+            return {
+                "token_requests": self.requests,
+                "failures": self.failures,
+                "cached": self._token is not None,
+                "valid_for_seconds": valid_for,
+                "refreshing": self._inflight is not None,
+            }
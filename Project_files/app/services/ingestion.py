@@ -0,0 +1,201 @@
+import codecs
+import contextlib
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.services import document_embedder
+from app.services.text_chunker import StreamingChunker
+
+class IngestionJob:
+    """
+    Progress of one document being embedded in the background.
+    """
+
+    def __init__(self, doc_id: str, filename: str, total_bytes: int, replace: bool = False,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.id = str(uuid.uuid4())
+        self.doc_id = doc_id
+        self.filename = filename
+        # Attached to every chunk, e.g. the policy domain used by search filters
+        self.metadata = metadata or {}
+        # Whether the upload replaces the existing content of doc_id
+        self.replace = replace
+        self.status = "queued"
+        self.total_bytes = total_bytes
+        self.processed_bytes = 0
+        self.chunks_stored = 0
+        # Chunks skipped because identical text was already stored
+        self.chunks_deduplicated = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "doc_id": self.doc_id,
+            "filename": self.filename,
+            "replace": self.replace,
+            "metadata": self.metadata,
+            "status": self.status,
+            "processed_bytes": self.processed_bytes,
+            "total_bytes": self.total_bytes,
+            "progress": self.processed_bytes / self.total_bytes if self.total_bytes else 1.0,
+            "chunks_stored": self.chunks_stored,
+            "chunks_deduplicated": self.chunks_deduplicated,
+            "error": self.error,
+        }
+
+jobs: Dict[str, IngestionJob] = {}
+_jobs_lock = threading.Lock()
+
+def create_job(doc_id: str, filename: str, total_bytes: int, replace: bool = False,
+               metadata: Optional[Dict[str, Any]] = None) -> IngestionJob:
+    job = IngestionJob(doc_id, filename, total_bytes, replace=replace, metadata=metadata)
+    with _jobs_lock:
+        jobs[job.id] = job
+        _prune_jobs()
+    return job
+
+def _prune_jobs():
+    finished = [job for job in jobs.values() if job.finished_at is not None]
+    if len(finished) > settings.INGEST_JOB_HISTORY:
+        finished.sort(key=lambda job: job.finished_at)
+        for job in finished[:len(finished) - settings.INGEST_JOB_HISTORY]:
+            del jobs[job.id]
+
+def get_job(job_id: str) -> Optional[IngestionJob]:
+    return jobs.get(job_id)
+
+def list_jobs() -> List[IngestionJob]:
+    with _jobs_lock:
+        return sorted(jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+def ingest_file(job: IngestionJob, path: str, remove_after: bool = True):
+    """
+    Streams a UTF-8 text file through the chunker and embeds/upserts it in
+    batches of STREAM_UPSERT_CHUNKS, so memory stays bounded by the block
+    and batch sizes rather than the file size. For a replacing job, the
+    document's previous version is deleted once the new one is stored.
+    """
+    job.status = "running"
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    chunker = StreamingChunker(
+        max_tokens=settings.CHUNK_MAX_TOKENS,
+        overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+    )
+    pending: List[str] = []
+
+    def upsert(force: bool = False):
+        while pending and (force or len(pending) >= settings.STREAM_UPSERT_CHUNKS):
+            batch = pending[:settings.STREAM_UPSERT_CHUNKS]
+            del pending[:settings.STREAM_UPSERT_CHUNKS]
+            stored = document_embedder.store_chunks(job.doc_id, batch, first_chunk_index=job.chunks_stored,
+                                                    metadata=job.metadata)
+            job.chunks_deduplicated += len(batch) - stored
+            job.chunks_stored += len(batch)
+
+    replacing = document_embedder.replacing_document(job.doc_id) if job.replace else contextlib.nullcontext()
+    try:
+        with replacing, open(path, "rb") as f:
+            while True:
+                block = f.read(settings.UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                pending.extend(chunker.feed(decoder.decode(block)))
+                upsert()
+                job.processed_bytes += len(block)
+            pending.extend(chunker.feed(decoder.decode(b"", final=True)))
+            pending.extend(chunker.flush())
+            upsert(force=True)
+        job.status = "completed"
+        print(f"Stored document {job.doc_id} in memory with {job.chunks_stored} chunks (job {job.id})")
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        print(f"Error ingesting document {job.doc_id} (job {job.id}): {e}")
+    finally:
+        job.finished_at = time.time()
+        if remove_after:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class IngestionQueue:
+    """
+    Bounded queue of ingestion jobs drained by a pool of worker threads.
+
+    Embedding runs in torch, which releases the GIL, so a small pool keeps
+    bulk uploads off the request path without starving searches. When the
+    queue is full, submit() rejects the job instead of letting uploads pile
+    up in memory.
+    """
+
+    def __init__(self, workers: int, max_queued: int):
+        self.workers = workers
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queued)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def _start(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"ingest-worker-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def is_full(self) -> bool:
+        return self._queue.full()
+
+    def submit(self, job: IngestionJob, path: str) -> bool:
+        """
+        Queues the job; returns False (and marks it rejected) if the queue is full.
+        """
+        self._start()
+        try:
+            self._queue.put_nowait((job, path))
+            return True
+        except queue.Full:
+            job.status = "rejected"
+            job.error = "Ingestion queue is full."
+            job.finished_at = time.time()
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job, path = item
+            with self._lock:
+                self.active += 1
+            try:
+                ingest_file(job, path)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def shutdown(self):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "queued": self._queue.qsize(),
+            "max_queued": self._queue.maxsize,
+        }
+
+ingestion_queue = IngestionQueue(workers=settings.INGEST_WORKERS, max_queued=settings.INGEST_QUEUE_SIZE)
@@ -1,5 +1,3 @@
-import pandas as pd
-from sklearn.linear_model import LinearRegression
 import numpy as np
 from io import StringIO
 
@@ -10,6 +8,10 @@ def forecast_kpi(file_content: str) -> dict:
     
     Assumes the CSV has two columns: 'date' and 'value'.
     """
+    # Imported here so API startup does not pay for pandas and scikit-learn
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
+
     df = pd.read_csv(StringIO(file_content))
     
     # Basic data validation
@@ -0,0 +1,106 @@
+import math
+import re
+import threading
+import numpy as np
+from app.services.vector_index import fit_mask
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Keeps dotted and hyphenated terms together, e.g. "pm2.5", "2023-15", "co2"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    """
+    Incremental inverted index with Okapi BM25 scoring.
+
+    Rows use the same numbering as the vector index, so lexical hits can be
+    fused with, or used to restrict, vector scoring. Searches may run while
+    rows are added: they score a snapshot of the lengths and postings taken
+    under the index's lock, so a row being added is either fully visible or
+    not at all.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._posting_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths: List[int] = []
+        self._length_array = None
+        self._total_length = 0
+        self._lock = threading.Lock()
+        # False while the index is being built in the background (see document_embedder)
+        self.ready = True
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, row: int, text: str):
+        """
+        Indexes text under row. Rows must be added in increasing order.
+        """
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        with self._lock:
+            while len(self._lengths) < row:
+                self._lengths.append(0)
+            self._length_array = None
+            self._lengths.append(len(tokens))
+            self._total_length += len(tokens)
+            for term, tf in counts.items():
+                rows, tfs = self._postings.setdefault(term, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+                self._posting_arrays.pop(term, None)
+
+    def _arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Called with the lock held
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            rows, tfs = self._postings[term]
+            arrays = (np.array(rows, dtype=np.int64), np.array(tfs, dtype=np.float32))
+            self._posting_arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str, top_k: int, exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Returns up to top_k (row, BM25 score) pairs, best first. Rows flagged
+        in the boolean mask exclude (e.g. deleted rows) are never returned.
+        """
+        if top_k <= 0:
+            return []
+        with self._lock:
+            postings = [self._arrays(term) for term in set(tokenize(query)) if term in self._postings]
+            if not postings:
+                return []
+            count = len(self._lengths)
+            if self._length_array is None:
+                self._length_array = np.array(self._lengths, dtype=np.float32)
+            lengths = self._length_array
+            total_length = self._total_length
+        average_length = total_length / count if count else 1.0
+        scores = np.zeros(count, dtype=np.float32)
+        for rows, tfs in postings:
+            idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[rows] / average_length)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        if exclude is not None:
+            scores[fit_mask(exclude, count)] = 0
+        matched = np.flatnonzero(scores)
+        k = min(top_k, len(matched))
+        best = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(row), float(scores[row])) for row in best]
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuses several best-first row rankings: score(row) = sum of 1 / (k + rank).
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
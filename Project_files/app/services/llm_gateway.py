@@ -0,0 +1,316 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+class GatewayRejected(Exception):
+    """
+    Raised when the gateway turns a call away instead of sending it upstream.
+    """
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: rate tokens per second, holding at most burst.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Takes a token and returns how long the caller must wait before using
+        it, or None (taking nothing) if that would be longer than max_wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1.0 - self._tokens) / self.rate if self._tokens < 1.0 else 0.0
+            if wait > max_wait:
+                return None
+            self._tokens -= 1.0
+            return wait
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing upstream. Over the last window calls (once at
+    least min_calls were made), a failure rate of failure_rate or more opens
+    the circuit; slow calls count as failures. An open circuit rejects calls
+    for open_seconds, then lets a single probe through (half-open): its
+    success closes the circuit again, its failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_rate: float = 0.5, min_calls: int = 10, window: int = 50,
+                 slow_call_seconds: Optional[float] = None, open_seconds: float = 30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._outcomes: deque = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> Optional[str]:
+        """
+        Returns None if the call must be rejected, "probe" if it is the
+        half-open probe, else "call". A probe must end with record() or
+        release_probe().
+        """
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return None
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN:
+                if self._probing:
+                    return None
+                self._probing = True
+                return "probe"
+            return "call"
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def record(self, failed: bool, latency: float, probe: bool = False):
+        if self.slow_call_seconds is not None and latency >= self.slow_call_seconds:
+            failed = True
+        with self._lock:
+            if probe:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            # Calls admitted before the circuit opened do not count against the next closed period
+            if self._state != self.CLOSED:
+                return
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+
+    def release_probe(self):
+        """
+        Ends a half-open probe that finished without an outcome (e.g. was cancelled).
+        """
+        with self._lock:
+            self._probing = False
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        retry_after = self.retry_after() if state != self.CLOSED else 0.0
+        with self._lock:
+            outcomes = len(self._outcomes)
+            return {
+                "state": state,
+                "recent_calls": outcomes,
+                "recent_failure_rate": sum(self._outcomes) / outcomes if outcomes else 0.0,
+                "times_opened": self.opened,
+                "retry_after_seconds": retry_after,
+            }
+
+class _Call:
+    """
+    Outcome of one admitted call; set failed for calls that returned an error
+    instead of raising. Streaming calls mark responded() on their first piece.
+    """
+
+    def __init__(self, probe: bool):
+        self.probe = probe
+        self.failed = False
+        self.responded_at: Optional[float] = None
+
+    def responded(self):
+        if self.responded_at is None:
+            self.responded_at = time.monotonic()
+
+class LLMGateway:
+    """
+    Admission control in front of the LLM upstream.
+
+    A call is admitted only if the circuit breaker allows it, it gets a rate
+    limit token and one of max_concurrency slots within queue_timeout
+    seconds, and fewer than max_queued calls are already waiting; otherwise
+    GatewayRejected is raised right away, so callers fail fast instead of
+    piling up behind a degraded upstream. Threads and each event loop get
+    their own max_concurrency slots.
+
+        with gateway.admit() as call:
+            response = send(prompt)
+            call.failed = is_error(response)
+
+    Exceptions raised inside the block count as failures. A streaming caller
+    calls call.responded() when the first piece arrives: the breaker then
+    times the call to that point, not to the end of the client's read.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, max_concurrency: int = 32, max_queued: int = 256,
+                 queue_timeout: float = 10.0, rate_limit: Optional[TokenBucket] = None):
+        self.breaker = breaker
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.rate_limit = rate_limit
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._async_semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"circuit_open": 0, "queue_full": 0, "queue_timeout": 0, "rate_limited": 0}
+
+    def _reject(self, reason: str, message: str):
+        with self._lock:
+            self.rejected[reason] += 1
+        raise GatewayRejected(message)
+
+    def busy(self) -> bool:
+        """
+        True while calls are queued for a slot or the circuit is not closed.
+        """
+        with self._lock:
+            waiting = self.waiting
+        return waiting > 0 or self.breaker.state != CircuitBreaker.CLOSED
+
+    def _check(self) -> Tuple[_Call, float]:
+        """
+        Applies the breaker, queue bound and rate limit; returns the call and its rate-limit wait.
+        """
+        permit = self.breaker.allow()
+        if permit is None:
+            self._reject("circuit_open", f"Watsonx circuit open, retry in {math.ceil(self.breaker.retry_after())}s")
+        call = _Call(probe=permit == "probe")
+        with self._lock:
+            full = self.waiting >= self.max_queued
+            if not full:
+                self.waiting += 1
+        if full:
+            self._abandon(call, queued=False)
+            self._reject("queue_full", "too many queued Watsonx requests")
+        wait = self.rate_limit.reserve(self.queue_timeout) if self.rate_limit is not None else 0.0
+        if wait is None:
+            self._abandon(call)
+            self._reject("rate_limited", "Watsonx request rate limit exceeded")
+        return call, wait
+
+    def _abandon(self, call: _Call, queued: bool = True):
+        if queued:
+            with self._lock:
+                self.waiting -= 1
+        if call.probe:
+            self.breaker.release_probe()
+
+    def _start(self) -> float:
+        with self._lock:
+            self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+        return time.monotonic()
+
+    def _finish(self, call: _Call, start: float, completed: bool):
+        with self._lock:
+            self.in_flight -= 1
+        if completed:
+            end = call.responded_at if call.responded_at is not None else time.monotonic()
+            self.breaker.record(call.failed, end - start, call.probe)
+        elif call.probe:
+            self.breaker.release_probe()
+
+    @contextmanager
+    def admit(self):
+        call, wait = self._check()
+        deadline = time.monotonic() + self.queue_timeout
+        if wait:
+            time.sleep(wait)
+        if not self._semaphore.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self._abandon(call)
+            self._reject("queue_timeout", "timed out waiting for a Watsonx request slot")
+        start = self._start()
+        completed = False
+        try:
+            yield call
+            completed = True
+        except Exception:
+            call.failed = completed = True
+            raise
+        finally:
+            self._semaphore.release()
+            self._finish(call, start, completed)
+
+    def _async_pool(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._async_semaphore
+
+    @asynccontextmanager
+    async def admit_async(self):
+        call, wait = self._check()
+        semaphore = self._async_pool()
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            await asyncio.wait_for(semaphore.acquire(), timeout=max(0.0, self.queue_timeout - wait))
+        except asyncio.TimeoutError:
+            self._abandon(call)
+            self._reject("queue_timeout", "timed out waiting for a Watsonx request slot")
+        except BaseException:
+            self._abandon(call)
+            raise
+        start = self._start()
+        completed = False
+        try:
+            yield call
+            completed = True
+        except Exception:
+            call.failed = completed = True
+            raise
+        finally:
+            semaphore.release()
+            self._finish(call, start, completed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            summary = {
+                "queue_depth": self.waiting,
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "max_queued": self.max_queued,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "rate_limit_per_second": self.rate_limit.rate if self.rate_limit is not None else None,
+            }
+        summary["circuit_breaker"] = self.breaker.stats()
+        return summary
@@ -0,0 +1,103 @@
+import threading
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+class MetadataIndex:
+    """
+    Per-value row sets over chunk metadata, used to restrict search to the
+    rows matching a filter before any vector is scored.
+
+    Low-cardinality fields (dense_fields, e.g. a policy domain) keep a
+    precomputed boolean bitmap per value. Fields with a value per document
+    (doc_id, source) keep sorted row arrays instead, since a bitmap per
+    document would grow with documents x rows. A dense field that turns out
+    to have more than max_dense_values distinct values is switched to row
+    arrays for the same reason.
+    """
+
+    def __init__(self, fields: Iterable[str], dense_fields: Iterable[str] = (), max_dense_values: int = 32):
+        self.fields = tuple(fields)
+        self.dense_fields = set(dense_fields)
+        self.max_dense_values = max_dense_values
+        self._bitmaps: Dict[Tuple[str, str], np.ndarray] = {}
+        self._rows: Dict[Tuple[str, str], Set[int]] = {}
+        self._row_arrays: Dict[Tuple[str, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def add_document(self, row: int, metadata: Dict[str, Any]):
+        for field in self.fields:
+            value = metadata.get(field)
+            if value:
+                self.add(row, field, str(value))
+
+    def add(self, row: int, field: str, value: str):
+        key = (field, value)
+        if field in self.dense_fields and key not in self._bitmaps \
+                and len(self.values(field)) >= self.max_dense_values:
+            self._make_sparse(field)
+        if field in self.dense_fields:
+            bits = self._bitmaps.get(key)
+            if bits is None or row >= len(bits):
+                grown = np.zeros(max(row + 1, 2 * (len(bits) if bits is not None else 512)), dtype=bool)
+                if bits is not None:
+                    grown[:len(bits)] = bits
+                bits = self._bitmaps[key] = grown
+            bits[row] = True
+        else:
+            with self._lock:
+                self._rows.setdefault(key, set()).add(row)
+                self._row_arrays.pop(key, None)
+
+    def _make_sparse(self, field: str):
+        with self._lock:
+            for key in [key for key in self._bitmaps if key[0] == field]:
+                self._rows[key] = set(np.flatnonzero(self._bitmaps[key]).tolist())
+            self.dense_fields.discard(field)
+            for key in [key for key in self._bitmaps if key[0] == field]:
+                del self._bitmaps[key]
+
+    def remove(self, row: int, field: str, value: str):
+        key = (field, value)
+        bits = self._bitmaps.get(key)
+        if bits is not None and row < len(bits):
+            bits[row] = False
+        with self._lock:
+            rows = self._rows.get(key)
+            if rows is not None:
+                rows.discard(row)
+                self._row_arrays.pop(key, None)
+
+    def values(self, field: str) -> List[str]:
+        keys = self._bitmaps if field in self.dense_fields else self._rows
+        return sorted(value for key_field, value in list(keys) if key_field == field)
+
+    def _value_rows(self, field: str, value: str) -> np.ndarray:
+        key = (field, value)
+        with self._lock:
+            rows = self._row_arrays.get(key)
+            if rows is None:
+                rows = np.array(sorted(self._rows.get(key, ())), dtype=np.int64)
+                self._row_arrays[key] = rows
+            return rows
+
+    def mask(self, filters: Dict[str, List[str]], size: int) -> np.ndarray:
+        """
+        Boolean mask of the first size rows matching every field of filters
+        (any of the listed values per field).
+        """
+        mask: Optional[np.ndarray] = None
+        for field, values in filters.items():
+            field_mask = np.zeros(size, dtype=bool)
+            for value in values:
+                with self._lock:
+                    dense = field in self.dense_fields
+                    bits = self._bitmaps.get((field, value))
+                if dense:
+                    if bits is not None:
+                        length = min(len(bits), size)
+                        field_mask[:length] |= bits[:length]
+                else:
+                    rows = self._value_rows(field, value)
+                    field_mask[rows[rows < size]] = True
+            mask = field_mask if mask is None else mask & field_mask
+        return mask if mask is not None else np.ones(size, dtype=bool)
@@ -0,0 +1,109 @@
+import re
+import threading
+import zlib
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Mersenne prime 2**31 - 1: products of two values below it fit in int64
+_PRIME = (1 << 31) - 1
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+def shingles(text: str, size: int = 3) -> np.ndarray:
+    """
+    Hashes of the overlapping size-word windows of text, case-insensitive.
+    Texts shorter than size words yield a single shingle of all their words.
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    windows = [" ".join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))]
+    return np.unique(np.array([zlib.crc32(window.encode("utf-8")) for window in windows], dtype=np.int64))
+
+class MinHasher:
+    """
+    MinHash signatures: the minimum of num_perm random hash permutations
+    over a text's shingles. The fraction of equal positions in two
+    signatures estimates the Jaccard similarity of their shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.int64)
+
+    def signature(self, text: str) -> np.ndarray:
+        values = shingles(text) % _PRIME
+        return ((self._a * values[None, :] + self._b) % _PRIME).min(axis=1)
+
+def estimated_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / len(a)
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures for finding stored
+    chunks whose text nearly matches a new one.
+
+    Signatures are split into bands; chunks sharing any band are candidates,
+    and a candidate counts as a near-duplicate when its estimated Jaccard
+    similarity reaches threshold. Each chunk is linked to the canonical
+    chunk of its duplicate group, i.e. the first one stored.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._canonical: Dict[str, str] = {}
+        self._buckets: Dict[Tuple[int, bytes], set] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes())
+                for band in range(self.bands)]
+
+    def find(self, signature: np.ndarray, accept=None) -> Optional[Tuple[str, float]]:
+        """
+        Returns (chunk id, similarity) of the most similar stored chunk at or
+        above the threshold, or None. accept(chunk_id) can veto candidates.
+        """
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            best = None
+            for chunk_id in candidates:
+                if accept is not None and not accept(chunk_id):
+                    continue
+                similarity = estimated_similarity(signature, self._signatures[chunk_id])
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (chunk_id, similarity)
+            return best
+
+    def add(self, chunk_id: str, signature: np.ndarray, canonical_id: Optional[str] = None):
+        with self._lock:
+            self._signatures[chunk_id] = signature
+            self._canonical[chunk_id] = canonical_id or chunk_id
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(chunk_id)
+
+    def canonical(self, chunk_id: str) -> Optional[str]:
+        return self._canonical.get(chunk_id)
+
+    def remove(self, chunk_id: str):
+        with self._lock:
+            signature = self._signatures.pop(chunk_id, None)
+            if signature is None:
+                return
+            del self._canonical[chunk_id]
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(chunk_id)
+                    if not bucket:
+                        del self._buckets[key]
@@ -0,0 +1,291 @@
+import json
+import os
+import shutil
+import sqlite3
+from contextlib import closing
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+EMBEDDINGS_FILE = "embeddings.f32"
+CHUNKS_FILE = "chunks.sqlite"
+
+class PersistentVectorStore:
+    """
+    On-disk home of the local vector store.
+
+    Normalised embeddings are appended to a raw float32 file that is opened
+    read-only with np.memmap on load, so every worker process maps the same
+    pages from the OS page cache instead of holding a private copy. Chunk
+    text and metadata live in a SQLite sidecar whose row numbers match the
+    embedding rows; the committed row count in SQLite is authoritative, so a
+    crash between the two writes only leaves ignorable trailing bytes.
+
+    Each chunk also gets a sequence number when it is appended, which is
+    never reused and survives compaction. Worker processes append to the
+    same store, so a row number in one worker's index is not the row
+    number on disk; deletions are therefore recorded by sequence number.
+    Deleted chunks are dropped by compact(), which writes the surviving rows
+    to a new embeddings file and switches to it in the same transaction
+    that renumbers the chunks.
+    """
+
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        self.chunks_path = os.path.join(directory, CHUNKS_FILE)
+        os.makedirs(directory, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.chunks_path, timeout=30, isolation_level=None)
+
+    def _init_db(self):
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "row INTEGER PRIMARY KEY, id TEXT, text TEXT, metadata TEXT, seq INTEGER, signature BLOB)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS chunks_id ON chunks (id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS deleted_chunks (seq INTEGER PRIMARY KEY)")
+            # Documents referencing each chunk; deduplicated chunks have several
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_refs ("
+                "doc_id TEXT, chunk_id TEXT, PRIMARY KEY (doc_id, chunk_id))"
+            )
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('dim', ?)", (str(self.dim),))
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('count', '0')")
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('embeddings_file', ?)", (EMBEDDINGS_FILE,))
+            self._migrate(conn)
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('next_seq', (SELECT COALESCE(MAX(seq) + 1, 0) FROM chunks))")
+            conn.execute("CREATE INDEX IF NOT EXISTS chunks_seq ON chunks (seq)")
+            conn.execute("COMMIT")
+
+    def _migrate(self, conn: sqlite3.Connection):
+        # Stores written before sequence numbers tombstoned row numbers; at that point no
+        # compaction had renumbered the rows since, so a chunk's row becomes its sequence number
+        if "seq" not in [column[1] for column in conn.execute("PRAGMA table_info(chunks)")]:
+            conn.execute("ALTER TABLE chunks ADD COLUMN seq INTEGER")
+            conn.execute("UPDATE chunks SET seq = row")
+        if "signature" not in [column[1] for column in conn.execute("PRAGMA table_info(chunks)")]:
+            conn.execute("ALTER TABLE chunks ADD COLUMN signature BLOB")
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tombstones'").fetchone():
+            conn.execute("INSERT OR IGNORE INTO deleted_chunks SELECT seq FROM chunks "
+                         "WHERE row IN (SELECT row FROM tombstones)")
+            conn.execute("DROP TABLE tombstones")
+
+    def _read_meta(self, conn: sqlite3.Connection) -> Tuple[int, int]:
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        return int(meta["dim"]), int(meta["count"])
+
+    def _embeddings_path(self, conn: sqlite3.Connection) -> str:
+        name = conn.execute("SELECT value FROM meta WHERE key = 'embeddings_file'").fetchone()[0]
+        return os.path.join(self.directory, name)
+
+    def load(self) -> Tuple[Optional[np.ndarray], List[Dict[str, Any]]]:
+        """
+        Returns a read-only memory map of the stored embeddings and the chunk
+        documents, each with its sequence number under "seq" and, if one was
+        stored, its MinHash signature under "signature".
+        """
+        with closing(self._connect()) as conn:
+            dim, count = self._read_meta(conn)
+            if dim != self.dim:
+                raise ValueError(f"Stored embeddings have dimension {dim}, expected {self.dim}")
+            embeddings_path = self._embeddings_path(conn)
+            rows = conn.execute(
+                "SELECT id, text, metadata, seq, signature FROM chunks WHERE row < ? ORDER BY row", (count,)
+            ).fetchall()
+        documents = []
+        for chunk_id, text, metadata, seq, signature in rows:
+            doc = {"id": chunk_id, "text": text, "metadata": json.loads(metadata), "seq": seq}
+            if signature is not None:
+                doc["signature"] = np.frombuffer(signature, dtype=np.int64)
+            documents.append(doc)
+        if count == 0:
+            return None, documents
+        embeddings = np.memmap(embeddings_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+        return embeddings, documents
+
+    def tombstoned_rows(self) -> np.ndarray:
+        """
+        Rows (as returned by load()) of the deleted chunks.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT row FROM chunks WHERE seq IN (SELECT seq FROM deleted_chunks) ORDER BY row"
+            ).fetchall()
+        return np.array([row for row, in rows], dtype=np.int64)
+
+    def chunk_refs(self) -> List[Tuple[str, str]]:
+        """
+        Returns every (doc_id, chunk_id) reference.
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT doc_id, chunk_id FROM chunk_refs").fetchall()
+
+    def append(self, embeddings: np.ndarray, documents: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Appends normalised embeddings and their chunk documents (with their
+        MinHash "signature", if computed) in one transaction and returns the
+        chunks' sequence numbers.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE serialises writers from every worker process
+            conn.execute("BEGIN IMMEDIATE")
+            _, count = self._read_meta(conn)
+            first_seq = int(conn.execute("SELECT value FROM meta WHERE key = 'next_seq'").fetchone()[0])
+            with open(self._embeddings_path(conn), "ab") as f:
+                f.truncate(count * self.dim * embeddings.itemsize)
+                f.write(embeddings.tobytes())
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?)",
+                [(count + i, doc["id"], doc["text"], json.dumps(doc["metadata"]), first_seq + i,
+                  doc["signature"].astype(np.int64).tobytes() if doc.get("signature") is not None else None)
+                 for i, doc in enumerate(documents)],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunk_refs VALUES (?, ?)",
+                [(doc["metadata"]["doc_id"], doc["id"]) for doc in documents],
+            )
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'count'", (str(count + len(documents)),))
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'next_seq'", (str(first_seq + len(documents)),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return np.arange(first_seq, first_seq + len(documents), dtype=np.int64)
+
+    def update_metadata(self, updates: Dict[str, Dict[str, Any]]):
+        """
+        Merges fields into the stored metadata of chunks, {chunk_id: fields}.
+        """
+        ids = list(updates)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = []
+            # SQLite's default limit on bound parameters per statement is 999
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                rows += conn.execute(
+                    f"SELECT row, id, metadata FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+            conn.executemany("UPDATE chunks SET metadata = ? WHERE row = ?",
+                             [(json.dumps({**json.loads(metadata), **updates[chunk_id]}), row)
+                              for row, chunk_id, metadata in rows])
+            conn.execute("COMMIT")
+
+    def add_refs(self, refs: Iterable[Tuple[str, str]]):
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT OR IGNORE INTO chunk_refs VALUES (?, ?)", list(refs))
+            conn.execute("COMMIT")
+
+    def release(self, refs: Iterable[Tuple[str, str]], dead_seqs: Iterable[int]):
+        """
+        Drops (doc_id, chunk_id) references and deletes the chunks, by
+        sequence number, that no document references any more.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("DELETE FROM chunk_refs WHERE doc_id = ? AND chunk_id = ?", list(refs))
+            conn.executemany("INSERT OR IGNORE INTO deleted_chunks VALUES (?)", [(int(seq),) for seq in dead_seqs])
+            conn.execute("COMMIT")
+
+    def compact(self) -> int:
+        """
+        Rewrites the store without its deleted chunks and returns how many
+        rows were removed. Surviving rows keep their order but are renumbered.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            _, count = self._read_meta(conn)
+            dead = {row for row, in conn.execute(
+                "SELECT row FROM chunks WHERE row < ? AND seq IN (SELECT seq FROM deleted_chunks)", (count,))}
+            if not dead:
+                conn.execute("ROLLBACK")
+                return 0
+            live = np.ones(count, dtype=bool)
+            live[list(dead)] = False
+            keep = np.flatnonzero(live)
+            old_path = self._embeddings_path(conn)
+            generation = int(dict(conn.execute("SELECT key, value FROM meta").fetchall()).get("generation", "0")) + 1
+            new_name = f"embeddings.{generation}.f32"
+            source = np.memmap(old_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+            with open(os.path.join(self.directory, new_name), "wb") as f:
+                for start in range(0, len(keep), 16384):
+                    f.write(np.ascontiguousarray(source[keep[start:start + 16384]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            del source
+            rows = conn.execute(
+                "SELECT id, text, metadata, seq, signature FROM chunks WHERE row < ? "
+                "AND seq NOT IN (SELECT seq FROM deleted_chunks) ORDER BY row", (count,)
+            ).fetchall()
+            conn.execute("DELETE FROM chunks")
+            conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?)",
+                             [(i, *row) for i, row in enumerate(rows)])
+            conn.execute("DELETE FROM deleted_chunks")
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'count'", (str(len(keep)),))
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'embeddings_file'", (new_name,))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('generation', ?)", (str(generation),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        # The previous file is kept until the next compaction, since other
+        # processes (or an in-flight snapshot) may still be reading it
+        self._remove_files_except({new_name, os.path.basename(old_path)})
+        return len(dead)
+
+    def _remove_files_except(self, keep: set):
+        for name in os.listdir(self.directory):
+            if name.startswith("embeddings.") and name.endswith(".f32") and name not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def snapshot(self, destination: str):
+        """
+        Writes a consistent copy of the store into destination.
+        """
+        os.makedirs(destination, exist_ok=True)
+        with closing(self._connect()) as conn, \
+                closing(sqlite3.connect(os.path.join(destination, CHUNKS_FILE))) as target:
+            conn.backup(target)
+            # Rows below the backed-up count are never rewritten in place, so
+            # copying that prefix of its embeddings file is consistent with the backup
+            _, count = self._read_meta(target)
+            source_path = self._embeddings_path(target)
+            target.execute("UPDATE meta SET value = ? WHERE key = 'embeddings_file'", (EMBEDDINGS_FILE,))
+            target.commit()
+        remaining = count * self.dim * np.dtype(np.float32).itemsize
+        with open(os.path.join(destination, EMBEDDINGS_FILE), "wb") as dst:
+            if remaining > 0:
+                with open(source_path, "rb") as src:
+                    while remaining > 0:
+                        block = src.read(min(remaining, 1 << 20))
+                        if not block:
+                            break
+                        dst.write(block)
+                        remaining -= len(block)
+
+    def restore(self, source: str):
+        """
+        Replaces the store's files with a snapshot previously written by snapshot().
+        """
+        for name in (EMBEDDINGS_FILE, CHUNKS_FILE):
+            tmp_path = os.path.join(self.directory, name + ".restore")
+            shutil.copyfile(os.path.join(source, name), tmp_path)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        self._init_db()
+        self._remove_files_except({EMBEDDINGS_FILE})
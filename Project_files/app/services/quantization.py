@@ -0,0 +1,177 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from app.services.vector_index import VectorIndex, fit_mask, normalize_query, normalize_rows, top_k_scores
+
+# Rows are converted back to float32 in blocks of this many rows while
+# scoring, which bounds the temporary memory a query needs.
+SCORING_BLOCK_ROWS = 16384
+
+class Int8VectorIndex:
+    """
+    Cosine-similarity index that stores each normalised row as int8 codes
+    plus one float32 scale, about 4x smaller than a float32 row.
+
+    With rescore enabled, the best top_k * rescore_factor approximate
+    candidates are re-ranked against full-precision rows. Those come from
+    the memory-mapped store when one is attached. Rows appended in this
+    process are re-ranked by their dequantised vectors, unless keep_float32
+    keeps a float32 copy of them, which costs 4 * dim more bytes per row
+    than the int8 row itself.
+    """
+
+    def __init__(self, dim: int, rescore: bool = True, rescore_factor: int = 4,
+                 keep_float32: bool = False, initial_capacity: int = 1024):
+        self.dim = dim
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        self.keep_float32 = keep_float32
+        capacity = max(initial_capacity, 1)
+        self._codes = np.zeros((capacity, dim), dtype=np.int8)
+        self._scales = np.zeros(capacity, dtype=np.float32)
+        self._size = 0
+        # Full-precision rows: an attached (memory-mapped) prefix, then rows added since
+        self._base: Optional[np.ndarray] = None
+        self._tail = VectorIndex(dim, initial_capacity) if rescore and keep_float32 else None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _ensure_capacity(self, required: int):
+        capacity = self._codes.shape[0]
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        codes = np.zeros((capacity, self.dim), dtype=np.int8)
+        codes[:self._size] = self._codes[:self._size]
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        self._codes, self._scales = codes, scales
+
+    def _append_codes(self, normalized: np.ndarray) -> np.ndarray:
+        start = self._size
+        self._ensure_capacity(start + len(normalized))
+        for offset in range(0, len(normalized), SCORING_BLOCK_ROWS):
+            codes, scales = quantize_int8(normalized[offset:offset + SCORING_BLOCK_ROWS])
+            end = start + offset + len(codes)
+            self._codes[start + offset:end] = codes
+            self._scales[start + offset:end] = scales
+        self._size += len(normalized)
+        return np.arange(start, self._size)
+
+    def add(self, embeddings) -> np.ndarray:
+        """
+        Appends one or more embeddings and returns their row numbers.
+        """
+        batch = normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim))
+        if self._tail is not None:
+            self._tail.add(batch)
+        return self._append_codes(batch)
+
+    def attach(self, matrix: np.ndarray):
+        """
+        Replaces the contents with the normalised rows of matrix. The matrix
+        itself is only kept (not copied) as the full-precision rescoring source.
+        """
+        if matrix.ndim != 2 or matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected a (n, {self.dim}) matrix, got {matrix.shape}")
+        self._size = 0
+        self._append_codes(matrix)
+        if self.rescore:
+            self._base = matrix if len(matrix) else None
+            self._tail = VectorIndex(self.dim) if self.keep_float32 else None
+
+    def compacted(self, keep: np.ndarray) -> "Int8VectorIndex":
+        """
+        Returns a new index holding only the given rows, renumbered in order.
+        """
+        index = Int8VectorIndex(self.dim, rescore=self.rescore, rescore_factor=self.rescore_factor,
+                                keep_float32=self.keep_float32, initial_capacity=len(keep))
+        index._codes[:len(keep)] = self._codes[keep]
+        index._scales[:len(keep)] = self._scales[keep]
+        index._size = len(keep)
+        if index._tail is not None and len(keep):
+            index._tail.add(self._full_precision(keep))
+        return index
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns approximate (dequantised) vectors of the given rows.
+        """
+        return self._codes[rows].astype(np.float32) * (self._scales[rows] / 127.0)[:, None]
+
+    def _full_precision(self, rows: np.ndarray) -> np.ndarray:
+        base_size = 0 if self._base is None else len(self._base)
+        in_base = rows < base_size
+        result = np.empty((len(rows), self.dim), dtype=np.float32)
+        if in_base.any():
+            result[in_base] = self._base[rows[in_base]]
+        if not in_base.all():
+            appended = rows[~in_base]
+            if self._tail is not None:
+                result[~in_base] = self._tail.reconstruct(appended - base_size)
+            else:
+                result[~in_base] = self.reconstruct(appended)
+        return result
+
+    def _approximate_scores(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        count = self._size if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SCORING_BLOCK_ROWS):
+            end = min(start + SCORING_BLOCK_ROWS, count)
+            block = slice(start, end) if rows is None else rows[start:end]
+            scores[start:end] = (self._codes[block].astype(np.float32) @ query) * self._scales[block]
+        return scores / 127.0
+
+    def search(self, query_embedding, top_k: int, rows: Optional[np.ndarray] = None,
+               exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Returns up to top_k (row, cosine similarity) pairs, best first.
+        If rows is given, only those rows are scored. Rows flagged in the
+        boolean mask exclude (e.g. deleted rows) are never returned.
+        """
+        if exclude is not None:
+            exclude = fit_mask(exclude, self._size)
+            if rows is not None:
+                rows = rows[~exclude[rows]]
+                exclude = None
+        if self._size == 0 or top_k <= 0 or (rows is not None and len(rows) == 0):
+            return []
+        query = normalize_query(query_embedding, self.dim)
+        scores = self._approximate_scores(query, rows)
+        if not self.rescore:
+            hits = top_k_scores(scores, top_k, exclude)
+            return hits if rows is None else [(int(rows[i]), score) for i, score in hits]
+        positions = np.array([i for i, _ in top_k_scores(scores, top_k * self.rescore_factor, exclude)], dtype=np.int64)
+        if len(positions) == 0:
+            return []
+        candidates = positions if rows is None else np.asarray(rows)[positions]
+        exact = self._full_precision(candidates) @ query
+        return [(int(candidates[i]), score) for i, score in top_k_scores(exact, top_k)]
+
+    def memory_bytes(self) -> int:
+        """
+        Bytes of private memory used by codes, scales and any in-process full-precision rows.
+        """
+        tail = self._tail.memory_bytes() if self._tail is not None else 0
+        return self._size * (self.dim + self._scales.itemsize) + tail
+
+def quantize_int8(normalized: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row int8 quantisation: row ~= codes * scale / 127.
+    """
+    scales = np.abs(normalized).max(axis=1).astype(np.float32)
+    safe = np.where(scales == 0, 1.0, scales)
+    codes = np.rint(normalized / safe[:, None] * 127.0).astype(np.int8)
+    return codes, scales
+
+def create_vector_index(dim: int, quantization: str = "none", rescore: bool = True,
+                        rescore_factor: int = 4, keep_float32: bool = False):
+    """
+    Builds the local vector index for the storage mode selected in settings ("none" or "int8").
+    """
+    if quantization == "none":
+        return VectorIndex(dim)
+    if quantization == "int8":
+        return Int8VectorIndex(dim, rescore=rescore, rescore_factor=rescore_factor, keep_float32=keep_float32)
+    raise ValueError(f"Unknown vector quantization mode: {quantization}")
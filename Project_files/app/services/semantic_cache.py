@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import numpy as np
+
+class SemanticCache:
+    """
+    Bounded cache of LLM responses looked up by prompt embedding instead of
+    exact text: a prompt whose (normalised) embedding has a cosine
+    similarity of at least threshold with a cached prompt gets that
+    prompt's response. Entries expire after ttl_seconds and the least
+    recently used entry is evicted when the cache is full.
+
+    Embeddings live in one preallocated matrix, so a lookup is a single
+    matrix-vector product over the occupied slots.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_size: int = 1024, ttl_seconds: Optional[float] = None):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._vectors: Optional[np.ndarray] = None
+        # slot -> (response, expires_at), least recently used first
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._similarity_total = 0.0
+
+    def get(self, embedding: np.ndarray) -> Optional[str]:
+        """
+        Returns the response of the most similar cached prompt, or None if none is similar enough.
+        """
+        with self._lock:
+            if self._entries:
+                now = time.monotonic()
+                for slot in [slot for slot, (_, expires_at) in self._entries.items()
+                             if expires_at is not None and expires_at <= now]:
+                    del self._entries[slot]
+            if self._entries:
+                slots = np.fromiter(self._entries, dtype=np.int64, count=len(self._entries))
+                similarities = self._vectors[slots] @ embedding
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    slot = int(slots[best])
+                    self._entries.move_to_end(slot)
+                    self.hits += 1
+                    self._similarity_total += float(similarities[best])
+                    return self._entries[slot][0]
+            self.misses += 1
+            return None
+
+    def set(self, embedding: np.ndarray, response: str):
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, len(embedding)), dtype=np.float32)
+            if len(self._entries) >= self.max_size:
+                slot, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+            else:
+                used = set(self._entries)
+                slot = next(slot for slot in range(self.max_size) if slot not in used)
+            self._vectors[slot] = embedding
+            self._entries[slot] = (response, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "mean_hit_similarity": self._similarity_total / self.hits if self.hits else None,
+        }
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    call and everyone who arrives while it is in flight waits for and gets
+    the same result (or exception). Nothing is cached; the next call after
+    it finishes runs again.
+
+    do() serves threads and do_async() coroutines; the two are tracked
+    separately, and async calls are only shared within one event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Tuple[Hashable, int], asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = self._calls[key] = Future()
+                self.executions += 1
+        if owner:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+        return future.result()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        task_key = (key, id(loop))
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(task_key)
+            if task is None or task.get_loop() is not loop:
+                task = self._tasks[task_key] = loop.create_task(fn())
+                self.executions += 1
+                task.add_done_callback(lambda done: self._forget(task_key, done))
+        # A waiter that is cancelled (e.g. its client disconnected) leaves the call running for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key: Tuple[Hashable, int], task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.calls - self.executions,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
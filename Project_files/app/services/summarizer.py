@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.services.cache import LRUCache
+from app.services.embedding_cache import content_hash
+from app.services.granite_llm import generate_summary_async
+from app.services.summary_cache import SummaryCache
+
+# Chunk summaries by content hash, opened on first use by get_summary_cache()
+summary_cache = None
+_summary_cache_lock = threading.Lock()
+_summary_cache_failed = False
+
+# Summaries still being generated, by content hash. A search that misses its
+# deadline leaves them running, and later searches of the same chunk wait on
+# the same task instead of asking Granite again.
+_pending: Dict[str, asyncio.Task] = {}
+# Finished summaries (including failures, which are not persisted) for
+# clients polling GET /policy/summaries/{summary_id}
+recent_summaries = LRUCache(settings.SUMMARY_RECENT_SIZE, settings.SUMMARY_RECENT_TTL_SECONDS)
+
+def get_summary_cache() -> Optional[SummaryCache]:
+    """
+    Opens the persistent summary cache, or returns None if it is disabled or unavailable.
+    """
+    global summary_cache, _summary_cache_failed
+    if summary_cache is None and settings.SUMMARY_CACHE_PATH and not _summary_cache_failed:
+        with _summary_cache_lock:
+            if summary_cache is None and not _summary_cache_failed:
+                try:
+                    summary_cache = SummaryCache(settings.SUMMARY_CACHE_PATH, settings.WATSONX_MODEL_ID)
+                except Exception as e:
+                    print(f"Error opening summary cache: {e}")
+                    _summary_cache_failed = True
+    return summary_cache
+
+def is_failed_summary(summary: Optional[str]) -> bool:
+    return not summary or summary.startswith("Error contacting Watsonx") or summary.startswith("[ERROR]")
+
+async def _summarize(key: str, text: str, semaphore: asyncio.Semaphore) -> str:
+    try:
+        async with semaphore:
+            summary = await generate_summary_async(text)
+    except Exception as e:
+        summary = f"Error contacting Watsonx: {e}"
+    if not summary or not summary.strip():
+        summary = "[ERROR] Granite LLM returned an empty summary."
+    cache = get_summary_cache()
+    if cache is not None and not is_failed_summary(summary):
+        await asyncio.to_thread(cache.put, key, summary)
+    recent_summaries.set(key, summary)
+    return summary
+
+def _summary_task(key: str, text: str, semaphore: asyncio.Semaphore) -> asyncio.Task:
+    task = _pending.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = _pending[key] = asyncio.create_task(_summarize(key, text, semaphore))
+        task.add_done_callback(lambda done: _pending.pop(key, None) if _pending.get(key) is done else None)
+    return task
+
+async def summarize_results(results: List[Dict[str, Any]], deadline: Optional[float] = None):
+    """
+    Adds a Granite summary to every search result, summarising uncached
+    chunks concurrently (at most SUMMARY_CONCURRENCY at a time). Each result
+    gets a summary_id (its content hash) and a summary_status: "ready", or
+    "pending" with summary None if it was not done within deadline seconds.
+    Pending summaries keep running and can be fetched with get_summary().
+    """
+    if deadline is None:
+        deadline = settings.SUMMARY_DEADLINE_SECONDS
+    texts: Dict[str, str] = {}
+    for result in results:
+        text = result.get("metadata", {}).get("text", "")
+        # Summarised at ingest time (see summary_precompute)
+        stored = result.get("metadata", {}).pop("summary", None)
+        if text and stored:
+            result["summary_id"] = content_hash(text)
+            result["summary"] = stored
+            result["summary_status"] = "ready"
+        elif text:
+            result["summary_id"] = content_hash(text)
+            texts[result["summary_id"]] = text
+        else:
+            result["summary"] = "No text available to summarize."
+            result["summary_status"] = "ready"
+
+    summaries: Dict[str, str] = {}
+    cache = get_summary_cache()
+    if cache is not None and texts:
+        summaries.update(await asyncio.to_thread(cache.get_many, list(texts)))
+    semaphore = asyncio.Semaphore(settings.SUMMARY_CONCURRENCY)
+    tasks = {key: _summary_task(key, text, semaphore) for key, text in texts.items() if key not in summaries}
+    if tasks:
+        done, _ = await asyncio.wait(set(tasks.values()), timeout=deadline)
+        for key, task in tasks.items():
+            if task in done:
+                summaries[key] = task.result()
+
+    for result in results:
+        key = result.get("summary_id")
+        if key is not None and result.get("summary_status") is None:
+            result["summary"] = summaries.get(key)
+            result["summary_status"] = "ready" if key in summaries else "pending"
+    return results
+
+async def get_summary(summary_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the status of a summary handed out as pending, or None if it is unknown.
+    """
+    if summary_id in _pending:
+        return {"summary_id": summary_id, "summary_status": "pending", "summary": None}
+    summary = recent_summaries.get(summary_id)
+    cache = get_summary_cache()
+    if summary is None and cache is not None:
+        summary = (await asyncio.to_thread(cache.get_many, [summary_id])).get(summary_id)
+    if summary is None:
+        return None
+    return {"summary_id": summary_id, "summary_status": "ready", "summary": summary}
+
+def summary_stats() -> Dict[str, Any]:
+    return {
+        "pending": len(_pending),
+        "cache": summary_cache.stats() if summary_cache is not None else None,
+        "recent": recent_summaries.stats(),
+    }
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List
+
+# SQLite's default limit on bound parameters per statement is 999
+LOOKUP_BATCH_SIZE = 500
+
+class SummaryCache:
+    """
+    Persistent cache of chunk summaries keyed by content hash and LLM model.
+
+    A chunk is summarised once per model, however many searches return it,
+    across restarts and worker processes. Summaries of other models are kept
+    but never returned.
+    """
+
+    def __init__(self, path: str, model_id: str):
+        self.path = path
+        self.model_id = model_id
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "hash TEXT, model TEXT, summary TEXT, created_at REAL, PRIMARY KEY (hash, model))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, hashes: List[str]) -> Dict[str, str]:
+        """
+        Returns the cached summary of every hash that is present.
+        """
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(unique), LOOKUP_BATCH_SIZE):
+                batch = unique[i:i + LOOKUP_BATCH_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT hash, summary FROM summaries WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                    [self.model_id, *batch],
+                ).fetchall()
+                found.update(rows)
+            self.hits += sum(1 for key in hashes if key in found)
+            self.misses += sum(1 for key in hashes if key not in found)
+        return found
+
+    def put(self, key: str, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                (key, self.model_id, summary, time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_id,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
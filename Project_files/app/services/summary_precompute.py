@@ -0,0 +1,143 @@
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.services import document_embedder
+from app.services.granite_llm import generate_summary, llm_gateway
+from app.services.summarizer import get_summary_cache, is_failed_summary
+
+class SummaryQueue:
+    """
+    Background stage that summarises newly stored chunks and writes each
+    summary into the chunk's metadata in the vector store, so searches can
+    return it without calling Granite.
+
+    Chunks are queued by the embedder once they are stored; worker threads
+    summarise them (reusing the summary cache for known content) and store
+    the summaries in batches. When the queue is full, chunks are dropped:
+    /policy/search-docs still summarises them on demand.
+
+    Workers call Granite through the background gateway and hold off, polling
+    every backoff seconds, while interactive calls are queued or their
+    circuit is not closed.
+    """
+
+    def __init__(self, workers: int, max_queued: int, batch_size: int = 16, backoff: float = 1.0):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.backoff = backoff
+        self._stopping = threading.Event()
+        self._queue: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue(maxsize=max_queued)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.active = 0
+        self.summarized = 0
+        self.cached = 0
+        self.failed = 0
+        self.dropped = 0
+        self.deferred = 0
+
+    def _start(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"summary-worker-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, documents: List[Dict[str, Any]]):
+        """
+        Queues stored chunk documents for summarisation.
+        """
+        chunks = [{"id": doc["id"], "text": doc["text"], "hash": doc["metadata"]["content_hash"]}
+                  for doc in documents if not doc["metadata"].get("summary")]
+        if not chunks:
+            return
+        self._start()
+        for i in range(0, len(chunks), self.batch_size):
+            try:
+                self._queue.put_nowait(chunks[i:i + self.batch_size])
+            except queue.Full:
+                with self._lock:
+                    self.dropped += len(chunks) - i
+                return
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            with self._lock:
+                self.active += 1
+            try:
+                self._summarize(batch)
+            except Exception as e:
+                print(f"Error precomputing summaries: {e}")
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def _summarize(self, batch: List[Dict[str, Any]]):
+        cache = get_summary_cache()
+        summaries = cache.get_many([chunk["hash"] for chunk in batch]) if cache is not None else {}
+        with self._lock:
+            self.cached += len(summaries)
+        updates = {}
+        for chunk in batch:
+            summary = summaries.get(chunk["hash"])
+            if summary is None:
+                if not self._wait_for_interactive():
+                    break
+                summary = generate_summary(chunk["text"], background=True)
+                if is_failed_summary(summary):
+                    with self._lock:
+                        self.failed += 1
+                    continue
+                if cache is not None:
+                    cache.put(chunk["hash"], summary)
+                with self._lock:
+                    self.summarized += 1
+            updates[chunk["id"]] = summary
+        if updates:
+            document_embedder.store_chunk_summaries(updates)
+
+    def _wait_for_interactive(self) -> bool:
+        """
+        Waits until the interactive gateway is idle; False if the queue is shutting down.
+        """
+        if not llm_gateway.busy():
+            return True
+        with self._lock:
+            self.deferred += 1
+        while llm_gateway.busy():
+            if self._stopping.wait(self.backoff):
+                return False
+        return True
+
+    def shutdown(self):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._stopping.set()
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+        self._stopping.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.PRECOMPUTE_SUMMARIES,
+            "workers": self.workers,
+            "active": self.active,
+            "queued_batches": self._queue.qsize(),
+            "summarized": self.summarized,
+            "from_cache": self.cached,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "deferred": self.deferred,
+        }
+
+summary_queue = SummaryQueue(workers=settings.SUMMARY_PRECOMPUTE_WORKERS, max_queued=settings.SUMMARY_PRECOMPUTE_QUEUE_SIZE,
+                             backoff=settings.SUMMARY_PRECOMPUTE_BACKOFF_SECONDS)
+if settings.PRECOMPUTE_SUMMARIES:
+    document_embedder.chunk_store_listeners.append(summary_queue.submit)
@@ -0,0 +1,158 @@
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# Segment boundaries: blank lines (paragraphs), single line breaks, and
+# whitespace after sentence-ending punctuation
+BOUNDARY_PATTERN = re.compile(r"\n[ \t\r]*\n\s*|\r?\n|(?<=[.!?])[ \t]+")
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Text without any boundary is force-split once this much is pending, keeping memory bounded
+MAX_PENDING_CHARS = 1 << 16
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token count: words plus punctuation marks. WordPiece splits rare
+    words further, so budgets should leave some headroom below the model limit.
+    """
+    return len(TOKEN_PATTERN.findall(text))
+
+class StreamingChunker:
+    """
+    Incremental, sentence-aware chunker.
+
+    Text is fed in arbitrary blocks; only complete segments (sentences,
+    lines, paragraphs) are consumed, so a chunk never ends mid-sentence
+    unless a single sentence exceeds the budget on its own. A chunk is
+    closed when the next segment would exceed max_tokens (or max_chars), or
+    at a paragraph break once it holds at least min_tokens of its own text.
+    Each chunk starts with up to overlap_tokens of the previous chunk's
+    trailing segments, also across paragraph breaks.
+    """
+
+    def __init__(self, max_tokens: int = 200, overlap_tokens: int = 32, min_tokens: Optional[int] = None,
+                 max_chars: Optional[int] = None, count_tokens: Callable[[str], int] = estimate_tokens):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens if min_tokens is not None else max_tokens // 2
+        self.max_chars = max_chars
+        self.count_tokens = count_tokens
+        self._buffer = ""
+        # Current chunk as (segment, separator, tokens); the first _carried are overlap
+        self._segments: List[Tuple[str, str, int]] = []
+        self._carried = 0
+        self._tokens = 0
+        self._chars = 0
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Adds a block of text and returns any chunks completed by it.
+        """
+        self._buffer += text
+        chunks: List[str] = []
+        start = 0
+        for match in BOUNDARY_PATTERN.finditer(self._buffer):
+            # A boundary touching the end of the buffer may still grow
+            # (e.g. a line break that turns into a paragraph break)
+            if match.end() == len(self._buffer):
+                break
+            self._add_segment(self._buffer[start:match.start()], match.group(), chunks)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        if len(self._buffer) > MAX_PENDING_CHARS:
+            cut = self._buffer.rfind(" ") + 1 or len(self._buffer)
+            self._add_segment(self._buffer[:cut], " ", chunks)
+            self._buffer = self._buffer[cut:]
+        return chunks
+
+    def flush(self) -> List[str]:
+        """
+        Consumes the remaining text and returns the final chunks.
+        """
+        chunks: List[str] = []
+        start = 0
+        for match in BOUNDARY_PATTERN.finditer(self._buffer):
+            self._add_segment(self._buffer[start:match.start()], match.group(), chunks)
+            start = match.end()
+        self._add_segment(self._buffer[start:], "", chunks)
+        self._buffer = ""
+        if len(self._segments) > self._carried:
+            self._emit(chunks, overlap=False)
+        self._segments, self._carried, self._tokens, self._chars = [], 0, 0, 0
+        return chunks
+
+    def _add_segment(self, segment: str, boundary: str, chunks: List[str]):
+        segment = segment.strip()
+        if not segment:
+            return
+        paragraph_end = boundary.count("\n") >= 2
+        separator = "\n\n" if paragraph_end else ("\n" if "\n" in boundary else " ")
+        tokens = self.count_tokens(segment)
+        if tokens > self.max_tokens or (self.max_chars and len(segment) > self.max_chars):
+            for piece in self._split_long_segment(segment):
+                self._append(piece, " ", self.count_tokens(piece), chunks)
+            self._segments[-1] = (self._segments[-1][0], separator, self._segments[-1][2])
+        else:
+            self._append(segment, separator, tokens, chunks)
+        carried_tokens = sum(tokens for _, _, tokens in self._segments[:self._carried])
+        if paragraph_end and self._tokens - carried_tokens >= self.min_tokens:
+            self._emit(chunks, overlap=True)
+
+    def _append(self, segment: str, separator: str, tokens: int, chunks: List[str]):
+        over_tokens = self._tokens + tokens > self.max_tokens
+        over_chars = self.max_chars and self._chars + len(segment) + 1 > self.max_chars
+        if self._segments and (over_tokens or over_chars):
+            if len(self._segments) > self._carried:
+                self._emit(chunks, overlap=True)
+            # Drop carried overlap that leaves no room for the new segment
+            while self._segments and (self._tokens + tokens > self.max_tokens or
+                                      (self.max_chars and self._chars + len(segment) + 1 > self.max_chars)):
+                dropped, _, dropped_tokens = self._segments.pop(0)
+                self._tokens -= dropped_tokens
+                self._chars -= len(dropped) + 1
+                self._carried -= 1
+        self._segments.append((segment, separator, tokens))
+        self._tokens += tokens
+        self._chars += len(segment) + 1
+
+    def _emit(self, chunks: List[str], overlap: bool):
+        chunks.append("".join(text + separator for text, separator, _ in self._segments).strip())
+        carried: List[Tuple[str, str, int]] = []
+        if overlap:
+            budget = self.overlap_tokens
+            for segment in reversed(self._segments):
+                if segment[2] > budget:
+                    break
+                carried.insert(0, segment)
+                budget -= segment[2]
+        self._segments = carried
+        self._carried = len(carried)
+        self._tokens = sum(tokens for _, _, tokens in carried)
+        self._chars = sum(len(text) + 1 for text, _, _ in carried)
+
+    def _split_long_segment(self, segment: str) -> Iterator[str]:
+        words = segment.split()
+        piece: List[str] = []
+        tokens = 0
+        chars = 0
+        for word in words:
+            word_tokens = self.count_tokens(word)
+            too_long = tokens + word_tokens > self.max_tokens or \
+                (self.max_chars and chars + len(word) + 1 > self.max_chars)
+            if piece and too_long:
+                yield " ".join(piece)
+                piece, tokens, chars = [], 0, 0
+            piece.append(word)
+            tokens += word_tokens
+            chars += len(word) + 1
+        if piece:
+            yield " ".join(piece)
+
+def iter_chunks(blocks: Iterable[str], **options) -> Iterator[str]:
+    """
+    Lazily chunks a stream of text blocks; see StreamingChunker for options.
+    """
+    chunker = StreamingChunker(**options)
+    for block in blocks:
+        yield from chunker.feed(block)
+    yield from chunker.flush()
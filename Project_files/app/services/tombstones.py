@@ -0,0 +1,43 @@
+import numpy as np
+from typing import Optional
+
+class TombstoneBitmap:
+    """
+    Growable bitmap of deleted index rows.
+
+    Deleting a chunk only sets its bit; searches pass mask() to the index
+    so flagged rows are never returned, and compaction later rewrites the
+    index without them.
+    """
+
+    def __init__(self):
+        self._bits = np.zeros(0, dtype=bool)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, rows):
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        if len(rows) == 0:
+            return
+        required = int(rows[-1]) + 1
+        if required > len(self._bits):
+            bits = np.zeros(max(required, 2 * len(self._bits)), dtype=bool)
+            bits[:len(self._bits)] = self._bits
+            self._bits = bits
+        self.count += int(np.count_nonzero(~self._bits[rows]))
+        self._bits[rows] = True
+
+    def mask(self, size: int) -> Optional[np.ndarray]:
+        """
+        Boolean mask of the first size rows, or None when nothing is deleted.
+        """
+        if self.count == 0:
+            return None
+        if len(self._bits) >= size:
+            return self._bits[:size]
+        return np.concatenate([self._bits, np.zeros(size - len(self._bits), dtype=bool)])
+
+    def dead_ratio(self, size: int) -> float:
+        return self.count / size if size else 0.0
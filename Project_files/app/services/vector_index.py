@@ -0,0 +1,147 @@
+import numpy as np
+from typing import List, Optional, Tuple
+
+class VectorIndex:
+    """
+    Exact cosine-similarity index backed by a contiguous float32 matrix.
+
+    Rows are L2-normalised on insert, so a query is scored against every
+    stored chunk with a single matrix-vector product. The matrix is
+    preallocated and grows geometrically to keep appends amortised O(1).
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((max(initial_capacity, 1), dim), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        Read-only view of the populated rows.
+        """
+        view = self._vectors[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns the stored (normalised) vectors of the given rows.
+        """
+        return self._vectors[rows]
+
+    def memory_bytes(self) -> int:
+        """
+        Bytes of private memory used by the populated rows; memory-mapped rows count as zero.
+        """
+        if isinstance(self._vectors, np.memmap):
+            return 0
+        return self._size * self.dim * self._vectors.itemsize
+
+    def attach(self, matrix: np.ndarray):
+        """
+        Uses an existing matrix of normalised rows (e.g. a read-only np.memmap)
+        as the index contents without copying it. The first append after
+        attaching copies the rows into a private, growable buffer.
+        """
+        if matrix.ndim != 2 or matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected a (n, {self.dim}) matrix, got {matrix.shape}")
+        self._vectors = matrix
+        self._size = matrix.shape[0]
+
+    def _ensure_capacity(self, required: int):
+        capacity = self._vectors.shape[0]
+        if required <= capacity:
+            return
+        capacity = max(capacity, 1)
+        while capacity < required:
+            capacity *= 2
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+
+    def add(self, embeddings) -> np.ndarray:
+        """
+        Appends one or more embeddings and returns their row numbers.
+        """
+        batch = normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim))
+        start = self._size
+        self._ensure_capacity(start + len(batch))
+        self._vectors[start:start + len(batch)] = batch
+        self._size += len(batch)
+        return np.arange(start, self._size)
+
+    def compacted(self, keep: np.ndarray) -> "VectorIndex":
+        """
+        Returns a new index holding only the given rows, renumbered in order.
+        """
+        index = VectorIndex(self.dim, len(keep))
+        index._vectors[:len(keep)] = self._vectors[keep]
+        index._size = len(keep)
+        return index
+
+    def search(self, query_embedding, top_k: int, rows: Optional[np.ndarray] = None,
+               exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Returns up to top_k (row, cosine similarity) pairs, best first.
+        If rows is given, only those rows are scored. Rows flagged in the
+        boolean mask exclude (e.g. deleted rows) are never returned.
+        """
+        size = self._size
+        if size == 0 or top_k <= 0:
+            return []
+        query = normalize_query(query_embedding, self.dim)
+        if exclude is not None:
+            exclude = fit_mask(exclude, size)
+        if rows is None:
+            return top_k_scores(self._vectors[:size] @ query, top_k, exclude)
+        if exclude is not None:
+            rows = rows[~exclude[rows]]
+        if len(rows) == 0:
+            return []
+        scores = self._vectors[rows] @ query
+        return [(int(rows[i]), score) for i, score in top_k_scores(scores, top_k)]
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalises each row; all-zero rows are left as zeros.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def normalize_query(query_embedding, dim: int) -> np.ndarray:
+    """
+    Returns the query as a unit-length float32 vector.
+    """
+    return normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, dim))[0]
+
+def fit_mask(mask: np.ndarray, size: int) -> np.ndarray:
+    """
+    Trims or pads a boolean row mask to size rows; rows past its end are unflagged.
+    """
+    if len(mask) >= size:
+        return mask[:size]
+    return np.concatenate([mask, np.zeros(size - len(mask), dtype=bool)])
+
+def top_k_scores(scores: np.ndarray, top_k: int, exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+    """
+    Selects the top_k highest scores with argpartition, then sorts only those.
+    Positions flagged in the boolean mask exclude are never selected.
+    """
+    if exclude is not None:
+        exclude = fit_mask(exclude, len(scores))
+        scores = np.where(exclude, -np.inf, scores)
+        top_k = min(top_k, len(scores) - int(np.count_nonzero(exclude)))
+        if top_k <= 0:
+            return []
+    k = min(top_k, len(scores))
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(int(row), float(scores[row])) for row in ordered]
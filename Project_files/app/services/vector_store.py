@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# (id, values, metadata) as accepted by Pinecone's upsert
+VectorRecord = Tuple[str, List[float], Dict[str, Any]]
+
+class RemoteVectorStore:
+    """
+    Base class for remote vector databases.
+
+    upsert() splits records into batches of batch_size and keeps up to
+    max_in_flight batches in flight at once; subclasses only implement
+    _upsert_batch and query. Per-batch latencies are kept for stats().
+    """
+
+    def __init__(self, batch_size: int = 100, max_in_flight: int = 4):
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="vector-upsert")
+        self._latencies: deque = deque(maxlen=10000)
+        self._lock = threading.Lock()
+        self.upserted_vectors = 0
+        self.upserted_batches = 0
+
+    def _upsert_batch(self, batch: Sequence[VectorRecord]):
+        raise NotImplementedError
+
+    def _delete_batch(self, ids: Sequence[str]):
+        raise NotImplementedError
+
+    def _update_metadata(self, vector_id: str, metadata: Dict[str, Any]):
+        raise NotImplementedError
+
+    def query(self, vector: List[float], top_k: int,
+              filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Returns matches as {"id", "score", "metadata"} dicts, best first.
+        filter is a Pinecone metadata filter, e.g. {"domain": {"$in": ["water"]}}.
+        """
+        raise NotImplementedError
+
+    def _timed_upsert(self, batch: Sequence[VectorRecord]):
+        start = time.perf_counter()
+        self._upsert_batch(batch)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._latencies.append(elapsed)
+            self.upserted_vectors += len(batch)
+            self.upserted_batches += 1
+
+    def upsert(self, records: Sequence[VectorRecord]):
+        """
+        Upserts all records in parallel batches; raises if any batch fails.
+        """
+        batches = [records[i:i + self.batch_size] for i in range(0, len(records), self.batch_size)]
+        if len(batches) == 1:
+            self._timed_upsert(batches[0])
+            return
+        for future in [self._executor.submit(self._timed_upsert, batch) for batch in batches]:
+            future.result()
+
+    def delete(self, ids: Sequence[str]):
+        """
+        Deletes vectors by id, batch_size ids per request.
+        """
+        ids = list(ids)
+        for future in [self._executor.submit(self._delete_batch, ids[i:i + self.batch_size])
+                       for i in range(0, len(ids), self.batch_size)]:
+            future.result()
+
+    def update_metadata(self, updates: Dict[str, Dict[str, Any]]):
+        """
+        Merges metadata fields into existing vectors, {id: fields}. Pinecone
+        updates one vector per request, so these run max_in_flight at a time.
+        """
+        for future in [self._executor.submit(self._update_metadata, vector_id, fields)
+                       for vector_id, fields in updates.items()]:
+            future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000.0
+        summary = {
+            "batch_size": self.batch_size,
+            "max_in_flight": self.max_in_flight,
+            "upserted_vectors": self.upserted_vectors,
+            "upserted_batches": self.upserted_batches,
+        }
+        if len(latencies):
+            for name, q in (("p50", 50), ("p95", 95), ("p99", 99)):
+                summary[f"upsert_latency_{name}_ms"] = float(np.percentile(latencies, q))
+        return summary
+
+class PineconeVectorStore(RemoteVectorStore):
+    """
+    Pinecone index accessed through the official client. The index handle
+    is resolved on first use, since that requires a control-plane call.
+    """
+
+    def __init__(self, index_factory: Callable[[], Any], **options):
+        super().__init__(**options)
+        self._index_factory = index_factory
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self._index_factory()
+        return self._index
+
+    def _upsert_batch(self, batch: Sequence[VectorRecord]):
+        self.index.upsert(vectors=list(batch))
+
+    def _delete_batch(self, ids: Sequence[str]):
+        self.index.delete(ids=list(ids))
+
+    def _update_metadata(self, vector_id: str, metadata: Dict[str, Any]):
+        self.index.update(id=vector_id, set_metadata=metadata)
+
+    def query(self, vector: List[float], top_k: int,
+              filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        results = self.index.query(vector=vector, top_k=top_k, include_metadata=True, filter=filter)
+        # Handle different Pinecone result formats
+        if hasattr(results, 'matches'):
+            matches = results.matches
+        elif isinstance(results, dict) and 'matches' in results:
+            matches = results['matches']
+        else:
+            matches = []
+        return [{
+            "id": str(match.id),
+            "score": float(match.score),
+            "metadata": dict(match.metadata or {})
+        } for match in matches]
+
+class PineconeRestVectorStore(RemoteVectorStore):
+    """
+    Pinecone-compatible data-plane REST API (an index host URL), e.g. the
+    local stand-in in tools/pinecone_stub.py. Uses a keep-alive session.
+    """
+
+    def __init__(self, host: str, api_key: str = "", timeout: float = 30, **options):
+        super().__init__(**options)
+        self.host = host.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max(self.max_in_flight, 1))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Api-Key": api_key, "Content-Type": "application/json"})
+
+    def _upsert_batch(self, batch: Sequence[VectorRecord]):
+        payload = {"vectors": [
+            {"id": vector_id, "values": list(values), "metadata": metadata}
+            for vector_id, values, metadata in batch
+        ]}
+        response = self.session.post(f"{self.host}/vectors/upsert", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    def _delete_batch(self, ids: Sequence[str]):
+        response = self.session.post(f"{self.host}/vectors/delete", json={"ids": list(ids)}, timeout=self.timeout)
+        response.raise_for_status()
+
+    def _update_metadata(self, vector_id: str, metadata: Dict[str, Any]):
+        response = self.session.post(f"{self.host}/vectors/update", json={"id": vector_id, "setMetadata": metadata},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+
+    def query(self, vector: List[float], top_k: int,
+              filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        payload = {"vector": list(vector), "topK": top_k, "includeMetadata": True}
+        if filter:
+            payload["filter"] = filter
+        response = self.session.post(f"{self.host}/query", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return [{
+            "id": str(match["id"]),
+            "score": float(match["score"]),
+            "metadata": match.get("metadata") or {}
+        } for match in response.json().get("matches", [])]
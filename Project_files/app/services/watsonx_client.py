@@ -0,0 +1,214 @@
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+import httpx
+import numpy as np
+
+CHAT_API_VERSION = "2023-05-29"
+
+def parse_chat_response(result: Dict[str, Any]) -> str:
+    """
+    Extracts the generated text from a Watsonx chat response.
+    """
+    if (
+        "choices" in result and result["choices"] and
+        "message" in result["choices"][0] and
+        "content" in result["choices"][0]["message"]
+    ):
+        return result["choices"][0]["message"]["content"]
+    print("[ERROR] 'choices' or 'content' missing in Watsonx response.")
+    return f"[ERROR] Unexpected Watsonx response: {json.dumps(result)}"
+
+def parse_stream_event(data: str) -> str:
+    """
+    Extracts the text delta from the data of one chat_stream server-sent event.
+    """
+    result = json.loads(data)
+    choices = result.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+class AsyncWatsonxClient:
+    """
+    Non-blocking client for the Watsonx chat endpoint.
+
+    Requests share one httpx.AsyncClient, so connections to Watsonx are kept
+    alive and reused instead of paying a TCP/TLS handshake per prompt, and at
+    most max_concurrency requests are in flight; the rest wait without
+    blocking the event loop. The pool belongs to the event loop that first
+    used it and is recreated if another loop calls in (e.g. test clients).
+    """
+
+    def __init__(self, base_url: str, project_id: str, model_id: str, get_token: Callable[[], str],
+                 invalidate_token: Optional[Callable[[str], None]] = None, max_connections: int = 100,
+                 max_keepalive_connections: int = 20, max_concurrency: int = 32, timeout: float = 30.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url.rstrip("/")
+        self.project_id = project_id
+        self.model_id = model_id
+        self.get_token = get_token
+        self.invalidate_token = invalidate_token
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self._latencies: deque = deque(maxlen=10000)
+        self._first_token_latencies: deque = deque(maxlen=10000)
+
+    def _pool(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Connections of a previous loop cannot be used (or closed) from this one
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, transport=self.transport)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client, self._semaphore
+
+    async def aclose(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = self._semaphore = self._loop = None
+
+    def _payload(self, prompt: str, max_new_tokens: int) -> Dict[str, Any]:
+        return {
+            "model_id": self.model_id,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "project_id": self.project_id,
+            "parameters": {"max_new_tokens": max_new_tokens}
+        }
+
+    @asynccontextmanager
+    async def _slot(self):
+        """
+        Holds one of the max_concurrency request slots.
+        """
+        client, semaphore = self._pool()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.requests += 1
+        try:
+            yield client
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    async def chat(self, prompt: str, max_new_tokens: int = 1024) -> str:
+        """
+        Sends prompt as a user message and returns the generated text, or an
+        error message if Watsonx cannot be reached.
+        """
+        payload = self._payload(prompt, max_new_tokens)
+        async with self._slot() as client:
+            start = time.perf_counter()
+            try:
+                response = await self._post(client, payload)
+                if response.status_code != 200:
+                    print("Watsonx error response:", response.text)
+                response.raise_for_status()
+                self._latencies.append(time.perf_counter() - start)
+                return parse_chat_response(response.json())
+            except Exception as e:
+                self.errors += 1
+                print(f"[EXCEPTION] Error contacting Watsonx: {e}")
+                return f"Error contacting Watsonx: {e}"
+
+    async def chat_stream(self, prompt: str, max_new_tokens: int = 1024) -> AsyncIterator[str]:
+        """
+        Sends prompt to the chat_stream endpoint and yields the generated text
+        as Watsonx produces it. Errors are raised to the caller; closing the
+        iterator early closes the connection.
+        """
+        payload = self._payload(prompt, max_new_tokens)
+        async with self._slot() as client:
+            start = time.perf_counter()
+            first = True
+            try:
+                token = await asyncio.to_thread(self.get_token)
+                for attempt in range(2):
+                    async with self._stream(client, token, payload) as response:
+                        if response.status_code == 401 and attempt == 0 and self.invalidate_token is not None:
+                            self.invalidate_token(token)
+                            token = await asyncio.to_thread(self.get_token)
+                            continue
+                        if response.status_code != 200:
+                            await response.aread()
+                            print("Watsonx error response:", response.text)
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            delta = parse_stream_event(line[len("data:"):].strip())
+                            if not delta:
+                                continue
+                            if first:
+                                self._first_token_latencies.append(time.perf_counter() - start)
+                                first = False
+                            yield delta
+                        break
+                self._latencies.append(time.perf_counter() - start)
+            except Exception:
+                self.errors += 1
+                raise
+
+    async def _post(self, client: httpx.AsyncClient, payload: Dict[str, Any]) -> httpx.Response:
+        # Cached tokens return immediately; a refresh blocks, so it runs in a worker thread
+        token = await asyncio.to_thread(self.get_token)
+        response = await self._send(client, token, payload)
+        if response.status_code == 401 and self.invalidate_token is not None:
+            # The cached token was revoked or expired early; fetch a new one and retry once
+            self.invalidate_token(token)
+            token = await asyncio.to_thread(self.get_token)
+            response = await self._send(client, token, payload)
+        return response
+
+    def _headers(self, token: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+    async def _send(self, client: httpx.AsyncClient, token: str, payload: Dict[str, Any]) -> httpx.Response:
+        return await client.post(
+            f"{self.base_url}/ml/v1/text/chat",
+            headers=self._headers(token),
+            params={"version": CHAT_API_VERSION},
+            json=payload,
+        )
+
+    def _stream(self, client: httpx.AsyncClient, token: str, payload: Dict[str, Any]):
+        return client.stream(
+            "POST",
+            f"{self.base_url}/ml/v1/text/chat_stream",
+            headers={**self._headers(token), "Accept": "text/event-stream"},
+            params={"version": CHAT_API_VERSION},
+            json=payload,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        summary = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_connections": self.limits.max_connections,
+        }
+        for prefix, values in (("latency", self._latencies), ("stream_first_token", self._first_token_latencies)):
+            latencies = np.array(values) * 1000.0
+            if len(latencies):
+                for name, q in (("p50", 50), ("p95", 95), ("p99", 99)):
+                    summary[f"{prefix}_{name}_ms"] = float(np.percentile(latencies, q))
+        return summary
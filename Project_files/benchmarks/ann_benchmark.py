@@ -0,0 +1,62 @@
+"""
+Recall@k and QPS of the local IVF-flat backend against exact search.
+
+Uses synthetic clustered 384-d unit vectors (the all-MiniLM-L6-v2 size).
+Run from Project_files/:
+
+    python benchmarks/ann_benchmark.py --size 200000 --nprobe 4 8 16 32
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.vector_index import VectorIndex
+from app.services.ann_index import IVFFlatIndex
+
+def synthetic_embeddings(n: int, dim: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    points = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+def run_queries(search, queries, top_k):
+    start = time.perf_counter()
+    results = [[row for row, _ in search(q, top_k)] for q in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    data = synthetic_embeddings(args.size + args.queries, args.dim, clusters=1000, rng=rng)
+    queries = data[args.size:]
+
+    index = VectorIndex(args.dim, initial_capacity=args.size)
+    index.add(data[:args.size])
+
+    truth, exact_qps = run_queries(index.search, queries, args.top_k)
+    print(f"{'backend':<18}{'recall@' + str(args.top_k):>12}{'QPS':>12}")
+    print(f"{'exact':<18}{1.0:>12.3f}{exact_qps:>12.1f}")
+
+    ivf = IVFFlatIndex(index, nlist=args.nlist)
+    start = time.perf_counter()
+    ivf.train()
+    print(f"(IVF training on {args.size} rows took {time.perf_counter() - start:.1f}s)")
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, qps = run_queries(ivf.search, queries, args.top_k)
+        recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+        print(f"{'ivf nprobe=' + str(nprobe):<18}{recall:>12.3f}{qps:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Throughput (MB/s) of the streaming chunker on a large policy file.
+
+Builds a synthetic corpus by repeating the sample policies and feeds it to
+the chunker in fixed-size blocks, as the streaming upload path does. Run
+from Project_files/:
+
+    python benchmarks/chunker_benchmark.py --megabytes 50
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services.text_chunker import iter_chunks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=20)
+    parser.add_argument("--block-size", type=int, default=64 * 1024)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--overlap-tokens", type=int, nargs="+", default=[0, 32, 64])
+    args = parser.parse_args()
+
+    policies = [open(path, encoding="utf-8").read()
+                for path in sorted(glob.glob(os.path.join(ROOT, "sample_examples", "sample_policies", "*.txt")))]
+    sample = "\n\n".join(policies) + "\n\n"
+    corpus = sample * max(1, int(args.megabytes * 1e6 / len(sample)))
+    size_mb = len(corpus.encode("utf-8")) / 1e6
+    blocks = [corpus[i:i + args.block_size] for i in range(0, len(corpus), args.block_size)]
+
+    print(f"corpus: {size_mb:.1f} MB in {len(blocks)} blocks of {args.block_size} chars")
+    print(f"{'overlap':>8}{'chunks':>10}{'avg chars':>11}{'MB/s':>9}")
+    for overlap in args.overlap_tokens:
+        start = time.perf_counter()
+        count = 0
+        total_chars = 0
+        for chunk in iter_chunks(blocks, max_tokens=args.max_tokens, overlap_tokens=overlap):
+            count += 1
+            total_chars += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"{overlap:>8}{count:>10}{total_chars / max(count, 1):>11.0f}{size_mb / elapsed:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Memory per chunk and recall@k of each local vector storage mode.
+
+Compares float32 storage with int8 scalar quantisation, with and without
+full-precision rescoring, on synthetic 384-d vectors. Run from Project_files/:
+
+    python benchmarks/quantization_benchmark.py --size 100000
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.quantization import create_vector_index
+from ann_benchmark import run_queries, synthetic_embeddings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    data = synthetic_embeddings(args.size + args.queries, args.dim, clusters=1000, rng=rng)
+    corpus, queries = data[:args.size], data[args.size:]
+
+    exact = create_vector_index(args.dim, "none")
+    exact.add(corpus)
+    truth, _ = run_queries(exact.search, queries, args.top_k)
+
+    modes = [
+        ("float32", exact),
+        ("int8", create_vector_index(args.dim, "int8", rescore=False)),
+        ("int8 + rescore", create_vector_index(args.dim, "int8", rescore=True)),
+        ("int8 + float32 rescore", create_vector_index(args.dim, "int8", rescore=True, keep_float32=True)),
+    ]
+    print(f"{'mode':<22}{'bytes/chunk':>14}{'recall@' + str(args.top_k):>12}{'QPS':>10}")
+    for name, index in modes:
+        if index is not exact:
+            index.add(corpus)
+        found, qps = run_queries(index.search, queries, args.top_k)
+        recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+        print(f"{name:<22}{index.memory_bytes() / args.size:>14.0f}{recall:>12.3f}{qps:>10.1f}")
+
+    # Rescoring against a memory-mapped float32 file keeps only the codes in private memory
+    mapped = create_vector_index(args.dim, "int8", rescore=True)
+    mapped.attach(exact.vectors)
+    found, qps = run_queries(mapped.search, queries, args.top_k)
+    recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+    print(f"{'int8 + mmap rescore':<22}{mapped.memory_bytes() / args.size:>14.0f}{recall:>12.3f}{qps:>10.1f}")
+
+if __name__ == "__main__":
+    main()
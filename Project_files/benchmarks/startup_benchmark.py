@@ -0,0 +1,123 @@
+"""
+Cold-start cost of the API: import-time breakdown and time to first response.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+prints the import time of the heaviest top-level packages and app modules,
+then starts uvicorn in a subprocess several times and measures the time
+from spawning it until GET / first answers. Exits with status 1 if the
+startup hook (without --warm-up) imports the embedding model or Pinecone
+client packages. Run from Project_files/:
+
+    python benchmarks/startup_benchmark.py --runs 5
+    python benchmarks/startup_benchmark.py --warm-up   # with WARM_UP_ON_STARTUP=true
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Loaded on first use (or by WARM_UP_ON_STARTUP), never by a plain startup
+HEAVY_MODULES = ("sentence_transformers", "torch", "pinecone")
+
+def import_times(env: dict):
+    """
+    Returns the wall time of importing app.main and the parsed
+    (module, self_us, cumulative_us) lines of its -X importtime report.
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import app.main failed:\n{result.stderr[-2000:]}")
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return elapsed, modules
+
+def startup_modules(env: dict):
+    """
+    Runs the application's startup and shutdown hooks in a fresh interpreter
+    and returns the HEAVY_MODULES imported by then.
+    """
+    script = (
+        "import asyncio, sys, app.main\n"
+        "async def start():\n"
+        "    async with app.main.lifespan(app.main.app):\n"
+        "        pass\n"
+        "asyncio.run(start())\n"
+        # On stderr, as the app's background threads print to stdout
+        f"print('loaded:' + ','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules), file=sys.stderr)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"application startup failed:\n{result.stderr[-2000:]}")
+    last_line = result.stderr.strip().splitlines()[-1]
+    return [name for name in last_line[len("loaded:"):].split(",") if name]
+
+def time_to_first_response(env: dict, port: int, timeout: float) -> float:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"No response from uvicorn within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8199)
+    parser.add_argument("--top", type=int, default=15, help="number of packages/modules listed")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--warm-up", action="store_true", help="measure with WARM_UP_ON_STARTUP enabled")
+    args = parser.parse_args()
+
+    env = dict(os.environ, WARM_UP_ON_STARTUP="true" if args.warm_up else "false")
+    elapsed, modules = import_times(env)
+    total_us = next((cumulative for name, _, cumulative in modules if name == "app.main"), 0)
+
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    print(f"import app.main: {total_us / 1000:.0f} ms (interpreter wall time {elapsed * 1000:.0f} ms)\n")
+    print(f"{'package':<32}{'self ms':>10}")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<32}{self_us / 1000:>10.1f}")
+    print(f"\n{'app module':<48}{'cumulative ms':>14}")
+    app_modules = [(name, cumulative) for name, _, cumulative in modules if name.startswith("app.")]
+    for name, cumulative_us in sorted(app_modules, key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<48}{cumulative_us / 1000:>14.1f}")
+
+    loaded = startup_modules(env)
+    print(f"\nloaded by startup: {', '.join(loaded) or 'none'}")
+
+    timings = [time_to_first_response(env, args.port, args.timeout) for _ in range(args.runs)]
+    print(f"\ntime to first GET / ({args.runs} runs): median {statistics.median(timings) * 1000:.0f} ms, "
+          f"max {max(timings) * 1000:.0f} ms")
+    if loaded and not args.warm_up:
+        print(f"FAIL: startup imported {', '.join(loaded)}; these must only load on first use")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Bulk-ingest throughput and tail latency of batched vector upserts.
+
+Starts the local Pinecone stand-in (tools/pinecone_stub.py) in-process
+unless --host points at a running index, then upserts synthetic 384-d
+vectors with each batch size / in-flight combination. Run from
+Project_files/:
+
+    python benchmarks/upsert_benchmark.py --vectors 20000 --latency-ms 20
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services.vector_store import PineconeRestVectorStore
+
+def start_stub(port: int, latency_ms: float) -> str:
+    os.environ["STUB_LATENCY_MS"] = str(latency_ms)
+    import uvicorn
+    from tools.pinecone_stub import app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="", help="Pinecone-compatible index host; defaults to the in-process stub")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=20, help="simulated per-request latency of the stub")
+    parser.add_argument("--vectors", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 50, 100, 200])
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    host = args.host or start_stub(args.port, args.latency_ms)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.vectors, args.dim)).astype(np.float32)
+
+    print(f"{'batch':>6}{'in-flight':>10}{'vectors/s':>12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for batch_size in args.batch_sizes:
+        for in_flight in args.in_flight:
+            if batch_size == 1 and in_flight > 1:
+                continue
+            store = PineconeRestVectorStore(host, batch_size=batch_size, max_in_flight=in_flight)
+            count = args.vectors if batch_size > 1 else min(args.vectors, 500)
+            records = [(f"bench-{batch_size}-{in_flight}-{i}", vectors[i].tolist(), {"doc_id": "bench"})
+                       for i in range(count)]
+            start = time.perf_counter()
+            if batch_size == 1:
+                # The old behaviour: one upsert call per vector
+                for record in records:
+                    store.upsert([record])
+            else:
+                store.upsert(records)
+            elapsed = time.perf_counter() - start
+            stats = store.stats()
+            print(f"{batch_size:>6}{in_flight:>10}{count / elapsed:>12.0f}"
+                  f"{stats['upsert_latency_p50_ms']:>9.1f}{stats['upsert_latency_p95_ms']:>9.1f}"
+                  f"{stats['upsert_latency_p99_ms']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import sys
+import numpy as np
+import pytest
+
+# Keep the app off the network and the on-disk stores before it is imported
+os.environ.update({
+    "PINECONE_API_KEY": "",
+    "PINECONE_HOST": "",
+    "VECTOR_STORE_DIR": "",
+    "EMBEDDING_CACHE_PATH": "",
+    "REMOTE_CHUNK_REGISTRY_PATH": "",
+    "SUMMARY_CACHE_PATH": "",
+    "PRECOMPUTE_SUMMARIES": "false",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import document_embedder
+from app.services.vector_store import RemoteVectorStore
+from tools import pinecone_stub
+
+class HashingModel:
+    """
+    Stand-in for the SentenceTransformer: a bag of hashed words, so texts
+    sharing words are similar and tests need neither torch nor the model.
+    """
+
+    def get_sentence_embedding_dimension(self):
+        return document_embedder.EMBEDDING_DIM
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), document_embedder.EMBEDDING_DIM), dtype=np.float32)
+        for i, text in enumerate([texts] if single else texts):
+            for word in text.lower().split():
+                vectors[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % vectors.shape[1]] += 1
+        return vectors[0] if single else vectors
+
+@pytest.fixture
+def embedder(monkeypatch):
+    """
+    document_embedder with an empty in-memory local store, no remote store and the hashing model.
+    """
+    monkeypatch.setattr(document_embedder, "_model", HashingModel())
+    monkeypatch.setattr(document_embedder, "remote_store", None)
+    monkeypatch.setattr(document_embedder, "_remote_store_initialized", True)
+    monkeypatch.setattr(document_embedder, "persistent_store", None)
+    monkeypatch.setattr(document_embedder, "remote_chunk_registry", None)
+    monkeypatch.setattr(document_embedder, "near_duplicate_index", document_embedder._new_near_duplicate_index())
+
+    def reset():
+        document_embedder._install_local_store(None, [], np.zeros(0, dtype=np.int64))
+        document_embedder.chunk_records.clear()
+        document_embedder.chunk_ids_by_hash.clear()
+        document_embedder.document_chunks.clear()
+        document_embedder.query_embedding_cache.clear()
+
+    reset()
+    yield document_embedder
+    reset()
+
+class StubVectorStore(RemoteVectorStore):
+    """
+    Remote store backed by tools/pinecone_stub.py's handlers, called in process.
+    """
+
+    def _upsert_batch(self, batch):
+        pinecone_stub.upsert(pinecone_stub.UpsertRequest(vectors=[
+            pinecone_stub.Vector(id=vector_id, values=list(values), metadata=metadata)
+            for vector_id, values, metadata in batch
+        ]))
+
+    def _delete_batch(self, ids):
+        pinecone_stub.delete(pinecone_stub.DeleteRequest(ids=list(ids)))
+
+    def _update_metadata(self, vector_id, metadata):
+        pinecone_stub.update(pinecone_stub.UpdateRequest(id=vector_id, setMetadata=metadata))
+
+    def query(self, vector, top_k, filter=None):
+        response = pinecone_stub.query(pinecone_stub.QueryRequest(
+            vector=list(vector), topK=top_k, includeMetadata=True, filter=filter))
+        return response["matches"]
+
+@pytest.fixture
+def remote_embedder(embedder, monkeypatch):
+    """
+    The embedder fixture with an empty Pinecone stand-in as its remote store.
+    """
+    monkeypatch.setattr(pinecone_stub, "_index", None)
+    monkeypatch.setattr(pinecone_stub, "_ids", [])
+    monkeypatch.setattr(pinecone_stub, "_rows", {})
+    monkeypatch.setattr(pinecone_stub, "_metadata", [])
+    monkeypatch.setattr(pinecone_stub, "_stale", set())
+    monkeypatch.setattr(embedder, "remote_store", StubVectorStore())
+    return embedder
@@ -0,0 +1,67 @@
+import threading
+import numpy as np
+from app.services.ann_index import IVFFlatIndex
+from app.services.vector_index import VectorIndex
+
+def _vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+def test_ivf_finds_added_rows_after_training():
+    index = VectorIndex(16)
+    vectors = _vectors(400)
+    index.add(vectors)
+    ivf = IVFFlatIndex(index, nlist=8, nprobe=8, min_train_size=64)
+    ivf.add(np.arange(400))
+    assert ivf.is_trained
+    extra = _vectors(1, seed=1)
+    index.add(extra)
+    ivf.add(np.array([400]))
+    assert ivf.search(extra[0], 1)[0][0] == 400
+
+def test_ivf_search_during_retraining_sees_complete_lists():
+    index = VectorIndex(16)
+    vectors = _vectors(400)
+    index.add(vectors)
+    ivf = IVFFlatIndex(index, nlist=8, nprobe=8, min_train_size=64)
+    ivf.add(np.arange(400))
+    seen = []
+    reconstruct = index.reconstruct
+
+    def reconstruct_and_search(rows):
+        # Searches at every step of train(), including while rows are assigned to the new lists
+        seen.append(ivf.search(vectors[7], 1))
+        return reconstruct(rows)
+
+    index.reconstruct = reconstruct_and_search
+    ivf.train()
+    assert seen and all(hits and hits[0][0] == 7 for hits in seen)
+    assert ivf.search(vectors[7], 1)[0][0] == 7
+
+def test_ivf_concurrent_add_and_search():
+    index = VectorIndex(16)
+    vectors = _vectors(2000)
+    index.add(vectors[:200])
+    ivf = IVFFlatIndex(index, nlist=16, nprobe=16, min_train_size=64)
+    ivf.add(np.arange(200))
+    errors, done = [], threading.Event()
+
+    def search():
+        # With every bucket probed, a search must find every row added before it started
+        while not done.is_set():
+            try:
+                hits = ivf.search(vectors[0], 1)
+                if not hits or hits[0][0] != 0:
+                    errors.append(hits)
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=search) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for start in range(200, 2000, 50):
+        index.add(vectors[start:start + 50])
+        ivf.add(np.arange(start, start + 50))
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert not errors
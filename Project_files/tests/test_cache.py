@@ -0,0 +1,68 @@
+import time
+from app.services.cache import LRUCache, normalize_query_text
+from conftest import HashingModel
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+def test_lru_cache_entries_expire():
+    cache = LRUCache(max_size=4, ttl_seconds=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_normalize_query_text_ignores_case_and_spacing():
+    assert normalize_query_text("  Bike   Lanes\n") == normalize_query_text("bike lanes")
+
+class CountingModel(HashingModel):
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.append(texts)
+        return super().encode(texts, **kwargs)
+
+def test_repeated_search_reuses_the_query_embedding_and_results(embedder, monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(embedder, "_model", model)
+    embedder.store_chunks("plan", ["protected bike lanes downtown"])
+    embedder.mark_index_updated()
+    model.encoded.clear()
+
+    first = embedder.search_documents("Bike lanes", top_k=1)
+    first[0]["summary"] = "annotated by the caller"
+    second = embedder.search_documents("  bike   LANES ", top_k=1)
+
+    assert model.encoded == ["Bike lanes"]
+    assert "summary" not in second[0]
+    assert embedder.search_result_cache.stats()["hits"] >= 1
+
+def test_storing_chunks_invalidates_cached_results(embedder, monkeypatch):
+    embedder.store_chunks("plan", ["protected bike lanes downtown"])
+    embedder.mark_index_updated()
+    assert len(embedder.search_documents("bike lanes", top_k=5)) == 1
+
+    embedder.store_chunks("plan-2", ["bike lanes along the river"])
+    assert len(embedder.search_documents("bike lanes", top_k=5)) == 2
+
+def test_precomputed_summaries_keep_cached_results(embedder):
+    embedder.store_chunks("plan", ["protected bike lanes downtown"])
+    (chunk_id,) = embedder.document_chunks["plan"]
+    embedder.search_documents("bike lanes", top_k=1)
+    version = embedder.index_version
+
+    embedder.store_chunk_summaries({chunk_id: "Protected lanes downtown."})
+    assert embedder.index_version == version
+    assert len(embedder.search_result_cache) == 1
+    query = embedder.encode_queries(["bike lanes"])[0]
+    assert embedder.search_in_memory(query, 1)[0]["metadata"]["summary"] == "Protected lanes downtown."
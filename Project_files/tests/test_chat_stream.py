@@ -0,0 +1,81 @@
+import asyncio
+import json
+import httpx
+import pytest
+from app.api import chat_router
+from app.services import granite_llm
+from app.services.llm_gateway import CircuitBreaker, LLMGateway
+from app.services.watsonx_client import AsyncWatsonxClient
+
+CITY_QUESTION = "How can the city reduce energy use?"
+
+def _events(*deltas):
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n" for delta in deltas]
+    return "id: 1\nevent: message\n" + "".join(lines)
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+def test_chat_stream_yields_each_delta():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, text=_events("LED ", "", "street lights."),
+                              headers={"Content-Type": "text/event-stream"})
+
+    client = AsyncWatsonxClient("https://watsonx.test", "project", "granite", get_token=lambda: "token",
+                                transport=httpx.MockTransport(handler))
+    assert asyncio.run(_collect(client.chat_stream("prompt"))) == ["LED ", "street lights."]
+    assert requests[0].url.path == "/ml/v1/text/chat_stream"
+    assert "stream_first_token_p50_ms" in client.stats()
+
+def test_chat_stream_raises_upstream_errors():
+    client = AsyncWatsonxClient("https://watsonx.test", "project", "granite", get_token=lambda: "token",
+                                transport=httpx.MockTransport(lambda request: httpx.Response(500, text="down")))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_collect(client.chat_stream("prompt")))
+
+@pytest.fixture
+def stream_pieces(monkeypatch):
+    """
+    Replaces Watsonx streaming with the given pieces, or an exception to raise after them.
+    """
+    pieces = []
+
+    async def chat_stream(prompt):
+        for piece in pieces:
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+
+    monkeypatch.setattr(granite_llm.watsonx_client, "chat_stream", chat_stream)
+    monkeypatch.setattr(granite_llm, "llm_gateway", LLMGateway(CircuitBreaker()))
+    monkeypatch.setattr(granite_llm, "semantic_caches", {})
+    monkeypatch.setattr(granite_llm, "fallback_responses", granite_llm.LRUCache(16))
+    return pieces
+
+def test_router_sends_deltas_as_server_sent_events(stream_pieces):
+    stream_pieces.extend(["Switch to ", "LED lighting."])
+    events = asyncio.run(_collect(chat_router._sse_events(CITY_QUESTION)))
+
+    assert events == [
+        'data: {"delta": "Switch to "}\n\n',
+        'data: {"delta": "LED lighting."}\n\n',
+        "event: done\ndata: {}\n\n",
+    ]
+    # The complete answer is kept as the fallback for this prompt
+    key = granite_llm._flight_key(granite_llm._city_question(CITY_QUESTION)[1])
+    assert granite_llm.fallback_responses.get(key) == "Switch to LED lighting."
+
+def test_router_reports_errors_mid_stream(stream_pieces):
+    stream_pieces.extend(["Partial ", RuntimeError("connection reset")])
+    events = asyncio.run(_collect(chat_router._sse_events(CITY_QUESTION)))
+
+    assert events[0] == 'data: {"delta": "Partial "}\n\n'
+    assert events[-1].startswith("event: error\n")
+    assert "connection reset" in events[-1]
+
+def test_canned_replies_are_streamed_in_one_piece(stream_pieces):
+    events = asyncio.run(_collect(chat_router._sse_events("What is your favourite film?")))
+    assert len(events) == 2 and events[-1] == "event: done\ndata: {}\n\n"
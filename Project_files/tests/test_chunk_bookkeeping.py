@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+from app.services.persistent_store import PersistentVectorStore
+from app.services.tombstones import TombstoneBitmap
+
+@pytest.fixture
+def persistent_embedder(embedder, monkeypatch, tmp_path):
+    monkeypatch.setattr(embedder, "persistent_store", PersistentVectorStore(str(tmp_path), embedder.EMBEDDING_DIM))
+    return embedder
+
+def _stored_ids(store):
+    return [doc["id"] for doc in store.load()[1]]
+
+def test_shared_chunk_is_kept_until_last_reference_is_deleted(embedder):
+    embedder.store_chunks("doc-a", ["shared paragraph about water reuse", "only in a"])
+    embedder.store_chunks("doc-b", ["shared paragraph about water reuse"])
+    shared = embedder.chunk_ids_by_hash[embedder.content_hash("shared paragraph about water reuse")]
+    assert embedder.chunk_records[shared]["documents"] == {"doc-a", "doc-b"}
+
+    assert embedder.delete_document("doc-a") == 2
+    assert embedder.chunk_records[shared]["documents"] == {"doc-b"}
+    assert len(embedder.tombstones) == 1
+
+    assert embedder.delete_document("doc-b") == 1
+    assert shared not in embedder.chunk_records
+    assert len(embedder.tombstones) == 2
+    assert embedder.delete_document("doc-b") == 0
+
+def test_shared_chunk_is_reported_under_a_document_referencing_it(persistent_embedder):
+    embedder = persistent_embedder
+    for doc_id in ("doc-a", "doc-b", "doc-c"):
+        embedder.store_chunks(doc_id, ["shared paragraph about water reuse"])
+    query = embedder.encode_queries(["water reuse"])[0]
+    assert embedder.search_in_memory(query, 1, {"doc_id": ["doc-c"]})[0]["metadata"]["doc_id"] == "doc-c"
+
+    embedder.delete_document("doc-a")
+    assert embedder.search_in_memory(query, 1)[0]["metadata"]["doc_id"] == "doc-b"
+    assert embedder.persistent_store.load()[1][0]["metadata"]["doc_id"] == "doc-b"
+    hit = embedder.search_in_memory_hybrid("water reuse", query.tolist(), 1, filters={"doc_id": ["doc-c"]})[0]
+    assert hit["metadata"]["doc_id"] == "doc-c"
+
+def test_shared_remote_chunk_is_reported_under_a_document_referencing_it(remote_embedder):
+    embedder = remote_embedder
+    for doc_id in ("doc-a", "doc-b", "doc-c"):
+        embedder.store_chunks(doc_id, ["shared paragraph about water reuse"])
+    query = embedder.encode_queries(["water reuse"])[0].tolist()
+
+    embedder.delete_document("doc-a")
+    assert embedder.search_index("water reuse", query, 1)[0]["metadata"]["doc_id"] == "doc-b"
+    hit = embedder.search_index("water reuse", query, 1, filters={"doc_id": ["doc-c"]})[0]
+    assert hit["metadata"]["doc_id"] == "doc-c"
+
+def test_compaction_drops_deleted_rows_and_renumbers(embedder):
+    embedder.store_chunks("doc-a", ["alpha chunk text", "beta chunk text"])
+    embedder.store_chunks("doc-b", ["gamma chunk text"])
+    embedder.delete_document("doc-a")
+    assert embedder.compact_store() == 2
+    assert [doc["id"] for doc in embedder.in_memory_documents] == list(embedder.document_chunks["doc-b"])
+    (chunk_id,) = embedder.document_chunks["doc-b"]
+    assert embedder.chunk_records[chunk_id]["row"] == 0
+    assert len(embedder.tombstones) == 0
+    query = embedder.encode_queries(["gamma chunk text"])[0]
+    assert embedder.search_in_memory(query, 3)[0]["id"] == chunk_id
+
+def test_delete_with_another_worker_appending_tombstones_the_right_chunk(persistent_embedder):
+    embedder = persistent_embedder
+    other_worker = PersistentVectorStore(embedder.persistent_store.directory, embedder.EMBEDDING_DIM)
+    embedder.store_chunks("doc-a", ["first chunk of a"])
+    other_worker.append(np.eye(1, embedder.EMBEDDING_DIM, dtype=np.float32),
+                        [{"id": "other", "text": "other worker chunk", "metadata": {"doc_id": "doc-o"}}])
+    embedder.store_chunks("doc-b", ["first chunk of b"])
+    # doc-b is local row 1 here but row 2 on disk
+    embedder.delete_document("doc-b")
+    embedder.compact_store()
+    ids = _stored_ids(embedder.persistent_store)
+    assert "other" in ids and len(ids) == 2
+    assert not any(chunk_id.startswith("doc-b") for chunk_id in ids)
+    # The other worker's chunk is picked up by compaction
+    assert embedder.chunk_records["other"]["documents"] == {"doc-o"}
+
+def test_compaction_forgets_chunks_deleted_by_another_worker(persistent_embedder):
+    embedder = persistent_embedder
+    embedder.store_chunks("doc-a", ["chunk deleted elsewhere"])
+    embedder.store_chunks("doc-b", ["chunk deleted here"])
+    (chunk_a,) = embedder.document_chunks["doc-a"]
+    other_worker = PersistentVectorStore(embedder.persistent_store.directory, embedder.EMBEDDING_DIM)
+    other_worker.release([("doc-a", chunk_a)], [embedder.in_memory_documents[0]["seq"]])
+    embedder.delete_document("doc-b")
+    embedder.compact_store()
+    assert _stored_ids(embedder.persistent_store) == []
+    assert embedder.chunk_records == {} and embedder.document_chunks == {}
+
+def test_refs_survive_reload(persistent_embedder, monkeypatch):
+    embedder = persistent_embedder
+    embedder.store_chunks("doc-a", ["shared text for reload", "a only"])
+    embedder.store_chunks("doc-b", ["shared text for reload"])
+    embedder.delete_document("doc-a")
+    directory = embedder.persistent_store.directory
+    with embedder.store_lock:
+        embedder._install_local_store(None, [], np.zeros(0, dtype=np.int64))
+        embedder.chunk_records.clear()
+        embedder.chunk_ids_by_hash.clear()
+        embedder.document_chunks.clear()
+    monkeypatch.setattr(embedder, "persistent_store", None)
+    monkeypatch.setattr(embedder.settings, "VECTOR_STORE_DIR", directory)
+    embedder.load_persistent_store()
+    assert set(embedder.document_chunks) == {"doc-b"}
+    assert len(embedder.tombstones) == 1
+
+def test_replacing_a_document_reuses_unchanged_chunks(embedder):
+    embedder.store_chunks("plan", ["unchanged opening section", "old closing section"])
+    unchanged = embedder.chunk_ids_by_hash[embedder.content_hash("unchanged opening section")]
+
+    with embedder.replacing_document("plan"):
+        embedder.store_chunks("plan", ["unchanged opening section", "new closing section"])
+
+    texts = {embedder.chunk_records[chunk_id]["hash"] for chunk_id in embedder.document_chunks["plan"]}
+    assert texts == {embedder.content_hash("unchanged opening section"), embedder.content_hash("new closing section")}
+    assert unchanged in embedder.document_chunks["plan"]
+    assert len(embedder.tombstones) == 1
+
+def test_failed_replacement_keeps_the_previous_version(embedder):
+    embedder.store_chunks("plan", ["original policy text"])
+    previous = set(embedder.document_chunks["plan"])
+
+    with pytest.raises(RuntimeError):
+        with embedder.replacing_document("plan"):
+            embedder.store_chunks("plan", ["half stored new version"])
+            raise RuntimeError("upload aborted")
+
+    assert embedder.document_chunks["plan"] == previous
+    assert len(embedder.tombstones) == 1
+
+def test_tombstone_bitmap_grows_and_counts_unique_rows():
+    bitmap = TombstoneBitmap()
+    assert bitmap.mask(4) is None
+    bitmap.add([1, 1, 6])
+    bitmap.add([6])
+
+    assert len(bitmap) == 2
+    assert list(np.flatnonzero(bitmap.mask(8))) == [1, 6]
+    assert len(bitmap.mask(3)) == 3
+    assert bitmap.dead_ratio(8) == 0.25
@@ -0,0 +1,74 @@
+import pytest
+from app.config import settings
+from tools import pinecone_stub
+from conftest import StubVectorStore
+
+@pytest.fixture
+def registry_embedder(remote_embedder, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "REMOTE_CHUNK_REGISTRY_PATH", str(tmp_path / "remote_chunks.sqlite"))
+    remote_embedder.load_remote_chunks()
+    assert remote_embedder.remote_chunk_registry is not None
+    return remote_embedder
+
+def _restart(embedder, monkeypatch):
+    # A new process only has what the registry and the remote store kept
+    embedder.chunk_records.clear()
+    embedder.chunk_ids_by_hash.clear()
+    embedder.document_chunks.clear()
+    monkeypatch.setattr(embedder, "remote_chunk_registry", None)
+    monkeypatch.setattr(embedder, "near_duplicate_index", embedder._new_near_duplicate_index())
+    embedder.load_remote_chunks()
+
+def test_remote_documents_can_be_deleted_after_restart(registry_embedder, monkeypatch):
+    embedder = registry_embedder
+    embedder.store_chunks("doc-a", ["bike lane expansion plan", "shared closing paragraph"])
+    embedder.store_chunks("doc-b", ["shared closing paragraph"])
+    _restart(embedder, monkeypatch)
+
+    assert embedder.document_chunks["doc-b"] <= embedder.document_chunks["doc-a"]
+    assert embedder.delete_document("doc-a") == 2
+    # The shared chunk is still referenced by doc-b
+    assert len(pinecone_stub._rows) == 1
+    _restart(embedder, monkeypatch)
+    assert embedder.delete_document("doc-b") == 1
+    assert len(pinecone_stub._rows) == 0
+    assert len(embedder.remote_chunk_registry) == 0
+
+def test_reupload_after_restart_is_deduplicated(registry_embedder, monkeypatch):
+    embedder = registry_embedder
+    chunks = ["tree canopy survey results", "street tree watering schedule"]
+    assert embedder.store_chunks("trees", chunks) == 2
+    _restart(embedder, monkeypatch)
+    assert embedder.store_chunks("trees-copy", chunks) == 0
+    assert len(pinecone_stub._rows) == 2
+    assert embedder.delete_document("trees") == 2
+    assert len(pinecone_stub._rows) == 2
+
+def test_near_duplicates_are_linked_after_restart(registry_embedder, monkeypatch):
+    embedder = registry_embedder
+    text = " ".join(f"word{i}" for i in range(60))
+    embedder.store_chunks("original", [text])
+    _restart(embedder, monkeypatch)
+    embedder.store_chunks("copy", [text + " extra"])
+    (copy_id,) = embedder.document_chunks["copy"]
+    (original_id,) = embedder.document_chunks["original"]
+    assert pinecone_stub._metadata[pinecone_stub._rows[copy_id]]["canonical_id"] == original_id
+
+def test_registry_is_loaded_when_the_remote_store_is_first_used(registry_embedder, monkeypatch):
+    embedder = registry_embedder
+    embedder.store_chunks("doc-a", ["bike lane expansion plan"])
+    # A restarted process that has not used Pinecone yet
+    embedder.chunk_records.clear()
+    embedder.chunk_ids_by_hash.clear()
+    embedder.document_chunks.clear()
+    monkeypatch.setattr(embedder, "remote_chunk_registry", None)
+    monkeypatch.setattr(embedder, "remote_store", None)
+    monkeypatch.setattr(embedder, "_remote_store_initialized", False)
+    monkeypatch.setattr(settings, "PINECONE_HOST", "http://pinecone.test")
+    monkeypatch.setattr(embedder, "create_remote_store", StubVectorStore)
+
+    assert embedder.remote_chunk_registry is None
+    assert isinstance(embedder.get_remote_store(), StubVectorStore)
+    assert embedder.remote_chunk_registry is not None
+    assert embedder.delete_document("doc-a") == 1
+    assert len(pinecone_stub._rows) == 0
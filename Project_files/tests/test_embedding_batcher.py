@@ -0,0 +1,44 @@
+import asyncio
+import numpy as np
+import pytest
+from app.services.embedding_batcher import EmbeddingBatcher
+
+def _encode_lengths(texts):
+    return np.array([[len(text)] for text in texts], dtype=np.float32)
+
+def test_concurrent_queries_are_encoded_in_one_batch():
+    batches = []
+    batcher = EmbeddingBatcher(lambda texts: batches.append(texts) or _encode_lengths(texts), max_wait_ms=50)
+
+    async def search_all():
+        return await asyncio.gather(*(batcher.encode("q" * n) for n in range(1, 9)))
+
+    try:
+        embeddings = asyncio.run(search_all())
+    finally:
+        batcher.stop()
+    assert [float(e[0]) for e in embeddings] == [float(n) for n in range(1, 9)]
+    assert len(batches) == 1 and batcher.items == 8
+
+def test_batches_are_capped_at_max_batch_size():
+    batches = []
+    batcher = EmbeddingBatcher(lambda texts: batches.append(texts) or _encode_lengths(texts),
+                               max_batch_size=3, max_wait_ms=50)
+    try:
+        futures = [batcher.submit(f"query {i}") for i in range(7)]
+        assert [f.result(timeout=5)[0] for f in futures] == [7.0] * 7
+    finally:
+        batcher.stop()
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+
+def test_encode_errors_reach_every_caller_in_the_batch():
+    def fail(texts):
+        raise RuntimeError("model unavailable")
+    batcher = EmbeddingBatcher(fail, max_wait_ms=50)
+    try:
+        futures = [batcher.submit("a"), batcher.submit("b")]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="model unavailable"):
+                future.result(timeout=5)
+    finally:
+        batcher.stop()
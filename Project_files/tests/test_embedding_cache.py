@@ -0,0 +1,40 @@
+import numpy as np
+from app.services.embedding_cache import EmbeddingCache, LOOKUP_BATCH_SIZE, content_hash
+from conftest import HashingModel
+
+def test_embeddings_persist_per_model(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingCache(path, "minilm").put_many({"h1": np.array([1.0, 2.0], dtype=np.float32)})
+
+    reopened = EmbeddingCache(path, "minilm")
+    assert np.array_equal(reopened.get_many(["h1", "h2"])["h1"], [1.0, 2.0])
+    assert reopened.stats()["hits"] == 1 and reopened.stats()["misses"] == 1
+    assert EmbeddingCache(path, "other-model").get_many(["h1"]) == {}
+
+def test_lookups_larger_than_the_sqlite_parameter_limit(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), "minilm")
+    count = LOOKUP_BATCH_SIZE * 2 + 7
+    cache.put_many({f"h{i}": np.full(2, i, dtype=np.float32) for i in range(count)})
+    found = cache.get_many([f"h{i}" for i in range(count)])
+    assert len(found) == count
+    assert found[f"h{count - 1}"][0] == count - 1
+
+class CountingModel(HashingModel):
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        return super().encode(texts, **kwargs)
+
+def test_encode_chunks_only_encodes_uncached_chunks(embedder, monkeypatch, tmp_path):
+    model = CountingModel()
+    monkeypatch.setattr(embedder, "_model", model)
+    monkeypatch.setattr(embedder, "embedding_cache", EmbeddingCache(str(tmp_path / "embeddings.sqlite"), "test"))
+    first = embedder.encode_chunks(["bike lanes", "tree planting"])
+
+    second = embedder.encode_chunks(["tree planting", "green roofs", "bike lanes"])
+
+    assert model.encoded == ["bike lanes", "tree planting", "green roofs"]
+    assert np.array_equal(second[0], first[1]) and np.array_equal(second[2], first[0])
+    assert content_hash("green roofs") in embedder.embedding_cache.get_many([content_hash("green roofs")])
@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.services.iam_token import IAMTokenManager
+
+class FakeResponse:
+    def __init__(self, body, status=200):
+        self.body = body
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status != 200:
+            raise RuntimeError(f"IAM returned {self.status}")
+
+    def json(self):
+        return self.body
+
+class FakeIAM:
+    """
+    requests.Session stand-in issuing token-1, token-2, ... valid for expires_in seconds.
+    """
+
+    def __init__(self, expires_in=3600, delay=0.0, status=200):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.status = status
+        self.issued = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        time.sleep(self.delay)
+        with self._lock:
+            self.issued += 1
+            token = f"token-{self.issued}"
+        return FakeResponse({"access_token": token, "expires_in": self.expires_in}, self.status)
+
+def _manager(iam, **options):
+    return IAMTokenManager("https://iam.test/identity/token", "key", session=iam, **options)
+
+def test_token_is_cached_until_it_nears_expiry():
+    iam = FakeIAM()
+    manager = _manager(iam)
+    assert manager.get_token() == manager.get_token() == "token-1"
+    assert iam.issued == 1
+
+def test_concurrent_first_calls_share_one_request():
+    iam = FakeIAM(delay=0.05)
+    manager = _manager(iam)
+    with ThreadPoolExecutor(8) as pool:
+        tokens = list(pool.map(lambda _: manager.get_token(), range(8)))
+    assert set(tokens) == {"token-1"}
+    assert iam.issued == 1
+
+def test_token_is_refreshed_ahead_of_expiry_in_the_background():
+    iam = FakeIAM(expires_in=1, delay=0.05)
+    manager = _manager(iam, expiry_margin=0.1, refresh_ahead=0.6)
+    assert manager.get_token() == "token-1"
+    # Tokens are refreshed once half their lifetime has passed
+    time.sleep(0.55)
+
+    # Past the refresh point the current token is still served while a new one is fetched
+    assert manager.get_token() == "token-1"
+    deadline = time.monotonic() + 5
+    while manager.get_token() != "token-2":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert iam.issued == 2
+
+def test_invalidated_token_is_replaced():
+    iam = FakeIAM()
+    manager = _manager(iam)
+    token = manager.get_token()
+    manager.invalidate("some-older-token")
+    assert manager.get_token() == token
+    manager.invalidate(token)
+    assert manager.get_token() == "token-2"
+
+def test_failed_request_is_raised_and_counted():
+    manager = _manager(FakeIAM(status=500))
+    with pytest.raises(RuntimeError, match="500"):
+        manager.get_token()
+    assert manager.stats()["failures"] == 1
+    assert not manager.stats()["cached"]
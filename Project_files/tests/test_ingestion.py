@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from app.config import settings
+from app.services import ingestion
+from conftest import HashingModel
+
+TEXT = " ".join(f"Straße {i} gets a café and bike parking." for i in range(30))
+
+class BlockingModel(HashingModel):
+    """
+    Blocks every encode until release is set (or fails it, with fail), recording the texts.
+    """
+
+    def __init__(self, fail=False):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = fail
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend([texts] if isinstance(texts, str) else texts)
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            self.fail = False
+            raise RuntimeError("embedding failed")
+        return super().encode(texts, **kwargs)
+
+def _upload(tmp_path, text=TEXT):
+    path = tmp_path / "upload.txt"
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+def test_streamed_upload_is_stored_in_bounded_batches(embedder, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "UPLOAD_BLOCK_SIZE", 7)
+    monkeypatch.setattr(settings, "STREAM_UPSERT_CHUNKS", 2)
+    monkeypatch.setattr(settings, "CHUNK_MAX_TOKENS", 20)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP_TOKENS", 4)
+    batches = []
+    store_chunks = embedder.store_chunks
+
+    def recording_store_chunks(doc_id, chunks, *args, **kwargs):
+        batches.append(chunks)
+        return store_chunks(doc_id, chunks, *args, **kwargs)
+    monkeypatch.setattr(embedder, "store_chunks", recording_store_chunks)
+    path = _upload(tmp_path)
+    job = ingestion.create_job("streets", "upload.txt", os.path.getsize(path), metadata={"domain": "transport"})
+
+    ingestion.ingest_file(job, path)
+
+    assert job.status == "completed", job.error
+    assert job.processed_bytes == job.total_bytes
+    assert max(len(batch) for batch in batches) == 2
+    # Multi-byte characters split across blocks decode the same as the whole text
+    assert [chunk for batch in batches for chunk in batch] == embedder.split_text_into_chunks(TEXT)
+    assert job.chunks_stored == len(embedder.document_chunks["streets"])
+    assert not os.path.exists(path)
+
+def test_failed_ingestion_is_reported_on_the_job(embedder, monkeypatch, tmp_path):
+    def fail(*args, **kwargs):
+        raise RuntimeError("embedding failed")
+    monkeypatch.setattr(embedder, "store_chunks", fail)
+    path = _upload(tmp_path)
+    job = ingestion.create_job("streets", "upload.txt", os.path.getsize(path))
+
+    ingestion.ingest_file(job, path)
+
+    assert job.status == "failed"
+    assert job.error == "embedding failed"
+    assert job.finished_at is not None
+
+def test_queue_runs_jobs_on_workers_and_rejects_when_full(monkeypatch, tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+    finished = []
+
+    def ingest_file(job, path):
+        started.set()
+        release.wait(5)
+        finished.append(job.doc_id)
+    monkeypatch.setattr(ingestion, "ingest_file", ingest_file)
+    queue = ingestion.IngestionQueue(workers=1, max_queued=1)
+    jobs = [ingestion.create_job(f"doc-{i}", "upload.txt", 0) for i in range(3)]
+    try:
+        assert queue.submit(jobs[0], "a")
+        assert started.wait(5)
+        assert queue.submit(jobs[1], "b")
+        assert queue.is_full()
+        assert not queue.submit(jobs[2], "c")
+        assert jobs[2].status == "rejected"
+        assert queue.stats()["active"] == 1
+    finally:
+        release.set()
+        queue.shutdown()
+    assert finished == ["doc-0", "doc-1"]
+
+def _ingest_concurrently(embedder, model, tmp_path):
+    """
+    Ingests TEXT as "first" and, once first is being embedded, as "second".
+    """
+    jobs = []
+    threads = []
+    for name in ("first", "second"):
+        directory = tmp_path / name
+        directory.mkdir()
+        path = _upload(directory)
+        job = ingestion.create_job(name, "upload.txt", os.path.getsize(path))
+        jobs.append(job)
+        threads.append(threading.Thread(target=ingestion.ingest_file, args=(job, path)))
+        threads[-1].start()
+        assert model.started.wait(5)
+    # Let the second upload reach the chunks the first one is storing
+    time.sleep(0.1)
+    model.release.set()
+    for thread in threads:
+        thread.join(5)
+    return jobs
+
+def test_concurrent_uploads_of_the_same_text_store_it_once(embedder, monkeypatch, tmp_path):
+    model = BlockingModel()
+    monkeypatch.setattr(embedder, "_model", model)
+    jobs = _ingest_concurrently(embedder, model, tmp_path)
+
+    assert [job.status for job in jobs] == ["completed", "completed"]
+    chunks = embedder.split_text_into_chunks(TEXT)
+    assert len(embedder.in_memory_documents) == len(set(chunks))
+    assert sorted(model.encoded) == sorted(set(chunks))
+    assert embedder.document_chunks["second"] == embedder.document_chunks["first"]
+
+def test_chunks_of_a_failed_upload_are_stored_by_the_concurrent_one(embedder, monkeypatch, tmp_path):
+    model = BlockingModel(fail=True)
+    monkeypatch.setattr(embedder, "_model", model)
+    jobs = _ingest_concurrently(embedder, model, tmp_path)
+
+    assert [job.status for job in jobs] == ["failed", "completed"]
+    assert len(embedder.in_memory_documents) == len(set(embedder.split_text_into_chunks(TEXT)))
+    assert "first" not in embedder.document_chunks
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("sentence_transformers", "torch", "pinecone", "pandas", "sklearn")
+
+def _loaded_modules(script, **env):
+    """
+    Runs script in a fresh interpreter and returns the heavy modules it left imported.
+    """
+    script += f"print('loaded:', [name for name in {HEAVY_MODULES!r} if name in sys.modules])\n"
+    result = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, env=dict(os.environ, **env),
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip().splitlines()[-1]
+
+def test_importing_the_app_does_not_load_models_or_clients():
+    pytest.importorskip("fastapi")
+    loaded = _loaded_modules("import sys, app.main\n",
+                             VECTOR_STORE_DIR="", REMOTE_CHUNK_REGISTRY_PATH="", PINECONE_API_KEY="")
+    assert loaded == "loaded: []"
+
+def test_startup_does_not_connect_pinecone(tmp_path):
+    pytest.importorskip("fastapi")
+    script = (
+        "import asyncio, sys, app.main\n"
+        "async def start():\n"
+        "    async with app.main.lifespan(app.main.app):\n"
+        "        pass\n"
+        "asyncio.run(start())\n"
+    )
+    # The default (dummy) Pinecone credentials and a registry path, as in a fresh checkout
+    registry = tmp_path / "remote_chunks.sqlite"
+    loaded = _loaded_modules(script, VECTOR_STORE_DIR=str(tmp_path / "vector_store"),
+                             REMOTE_CHUNK_REGISTRY_PATH=str(registry), PINECONE_API_KEY="dummy_pinecone_key",
+                             PINECONE_HOST="", WARM_UP_ON_STARTUP="false")
+    assert loaded == "loaded: []"
+    assert not registry.exists()
+
+def test_model_is_loaded_once_on_first_use(embedder, monkeypatch):
+    loads = []
+
+    class Model:
+        def __init__(self, name):
+            loads.append(name)
+
+        def get_sentence_embedding_dimension(self):
+            return embedder.EMBEDDING_DIM
+
+    module = type(sys)("sentence_transformers")
+    module.SentenceTransformer = Model
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    monkeypatch.setattr(embedder, "_model", None)
+    monkeypatch.setattr(embedder, "_model_failed", False)
+
+    assert isinstance(embedder.get_model(), Model)
+    assert embedder.get_model() is embedder.get_model()
+    assert len(loads) == 1
+
+def test_model_with_the_wrong_dimension_is_rejected(embedder, monkeypatch):
+    class Model:
+        def __init__(self, name):
+            pass
+
+        def get_sentence_embedding_dimension(self):
+            return embedder.EMBEDDING_DIM + 1
+
+    module = type(sys)("sentence_transformers")
+    module.SentenceTransformer = Model
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    monkeypatch.setattr(embedder, "_model", None)
+    monkeypatch.setattr(embedder, "_model_failed", False)
+
+    assert embedder.get_model() is None
+    assert embedder._model_failed
@@ -0,0 +1,43 @@
+import threading
+import numpy as np
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+def test_tokenize_keeps_dotted_and_hyphenated_terms():
+    assert tokenize("PM2.5 levels in 2023-15, CO2") == ["pm2.5", "levels", "in", "2023-15", "co2"]
+
+def test_bm25_ranks_rarer_matches_first():
+    index = BM25Index()
+    index.add(0, "water quality report")
+    index.add(1, "water water water")
+    index.add(2, "air quality report")
+    assert [row for row, _ in index.search("water", 5)] == [1, 0]
+    assert index.search("water", 5, exclude=np.array([False, True]))[0][0] == 0
+    assert index.search("nothing", 5) == []
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    assert reciprocal_rank_fusion([[1, 2], [2, 3]])[0][0] == 2
+
+def test_bm25_concurrent_add_and_search():
+    index = BM25Index()
+    index.add(0, "recycling schedule")
+    errors, done = [], threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                hits = index.search("recycling schedule", 10)
+                if not hits or hits[0][0] != 0:
+                    errors.append(hits)
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=search) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for row in range(1, 20000):
+        index.add(row, f"recycling bins collected on day {row}")
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert not errors
+    assert len(index) == 20000
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.services import granite_llm
+from app.services.llm_gateway import CircuitBreaker, GatewayRejected, LLMGateway, TokenBucket
+
+CITY_QUESTION = "How can the city cut transport emissions?"
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """
+    The interactive gateway, replaced by one whose breaker opens on one call slower than 50 ms.
+    """
+    gateway = LLMGateway(CircuitBreaker(min_calls=1, slow_call_seconds=0.05, open_seconds=60))
+    monkeypatch.setattr(granite_llm, "llm_gateway", gateway)
+    monkeypatch.setattr(granite_llm, "semantic_caches", {})
+    return gateway
+
+def _fake_stream(monkeypatch, first_delay, pieces):
+    async def chat_stream(prompt):
+        await asyncio.sleep(first_delay)
+        for piece in pieces:
+            yield piece
+    monkeypatch.setattr(granite_llm.watsonx_client, "chat_stream", chat_stream)
+
+async def _read_slowly(stream, delay):
+    pieces = []
+    async for piece in stream:
+        pieces.append(piece)
+        await asyncio.sleep(delay)
+    return pieces
+
+def test_slow_reader_of_a_successful_stream_leaves_the_breaker_closed(gateway, monkeypatch):
+    _fake_stream(monkeypatch, 0, ["Expand ", "bus ", "lanes."])
+    pieces = asyncio.run(_read_slowly(granite_llm.ask_city_question_stream(CITY_QUESTION), 0.05))
+
+    assert "".join(pieces) == "Expand bus lanes."
+    assert gateway.admitted == 1
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+def test_slow_first_token_counts_as_a_slow_call(gateway, monkeypatch):
+    _fake_stream(monkeypatch, 0.1, ["Expand bus lanes."])
+    asyncio.run(_read_slowly(granite_llm.ask_city_question_stream(CITY_QUESTION), 0))
+
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+
+def test_breaker_opens_on_failure_rate_and_recovers_through_a_probe():
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window=4, open_seconds=0.05)
+    for failed in (False, True, False):
+        breaker.record(failed, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() is None
+
+    time.sleep(0.06)
+    assert breaker.allow() == "probe"
+    assert breaker.allow() is None
+    breaker.record(True, 0.1, probe=True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow() == "probe"
+    breaker.record(False, 0.1, probe=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.opened == 2
+
+def test_open_circuit_rejects_calls_without_running_them():
+    gateway = LLMGateway(CircuitBreaker(min_calls=1, open_seconds=60))
+    with pytest.raises(RuntimeError):
+        with gateway.admit():
+            raise RuntimeError("upstream error")
+
+    with pytest.raises(GatewayRejected, match="circuit open"):
+        with gateway.admit():
+            pytest.fail("admitted while the circuit is open")
+    assert gateway.stats()["rejected"]["circuit_open"] == 1
+
+def test_calls_beyond_the_queue_bound_are_rejected():
+    gateway = LLMGateway(CircuitBreaker(), max_concurrency=1, max_queued=1, queue_timeout=5)
+    started = threading.Event()
+    release = threading.Event()
+
+    def hold_slot():
+        with gateway.admit():
+            started.set()
+            release.wait(5)
+
+    def wait_for_slot():
+        with gateway.admit():
+            pass
+
+    holder = threading.Thread(target=hold_slot)
+    holder.start()
+    started.wait(5)
+    waiter = threading.Thread(target=wait_for_slot)
+    waiter.start()
+    while gateway.stats()["queue_depth"] < 1:
+        time.sleep(0.01)
+    assert gateway.busy()
+
+    with pytest.raises(GatewayRejected, match="too many queued"):
+        with gateway.admit():
+            pass
+    release.set()
+    holder.join()
+    waiter.join()
+    assert gateway.stats()["admitted"] == 2
+    assert not gateway.busy()
+
+def test_queue_timeout_and_rate_limit_reject_calls():
+    gateway = LLMGateway(CircuitBreaker(), max_concurrency=1, queue_timeout=0.05)
+
+    async def hold_and_wait():
+        async with gateway.admit_async():
+            with pytest.raises(GatewayRejected, match="timed out"):
+                async with gateway.admit_async():
+                    pass
+
+    asyncio.run(hold_and_wait())
+    assert gateway.stats()["rejected"]["queue_timeout"] == 1
+
+    limited = LLMGateway(CircuitBreaker(), rate_limit=TokenBucket(rate=1, burst=1), queue_timeout=0.1)
+    with limited.admit():
+        pass
+    with pytest.raises(GatewayRejected, match="rate limit"):
+        with limited.admit():
+            pass
+
+def test_rejected_prompt_is_answered_from_the_fallback_cache(monkeypatch):
+    gateway = LLMGateway(CircuitBreaker(min_calls=1, open_seconds=60))
+    monkeypatch.setattr(granite_llm, "llm_gateway", gateway)
+    monkeypatch.setattr(granite_llm, "fallback_responses", granite_llm.LRUCache(16))
+    monkeypatch.setattr(granite_llm, "_send_prompt", lambda prompt: "Composting cuts landfill waste.")
+    assert granite_llm._ask_granite("compost tips") == "Composting cuts landfill waste."
+
+    gateway.breaker._open()
+    assert granite_llm._ask_granite("compost tips") == "Composting cuts landfill waste."
+    assert granite_llm._ask_granite("other prompt").startswith("Error contacting Watsonx: Watsonx circuit open")
@@ -0,0 +1,22 @@
+import numpy as np
+from app.services.metadata_index import MetadataIndex
+
+def test_mask_combines_fields_and_values():
+    index = MetadataIndex(fields=("domain", "source"), dense_fields=("domain",))
+    index.add_document(0, {"domain": "water", "source": "a.txt"})
+    index.add_document(1, {"domain": "waste", "source": "a.txt"})
+    index.add_document(2, {"domain": "water", "source": "b.txt"})
+    assert np.flatnonzero(index.mask({"domain": ["water"]}, 3)).tolist() == [0, 2]
+    assert np.flatnonzero(index.mask({"domain": ["water", "waste"], "source": ["a.txt"]}, 3)).tolist() == [0, 1]
+    index.remove(0, "domain", "water")
+    assert np.flatnonzero(index.mask({"domain": ["water"]}, 3)).tolist() == [2]
+
+def test_high_cardinality_dense_field_switches_to_row_sets():
+    index = MetadataIndex(fields=("domain",), dense_fields=("domain",), max_dense_values=4)
+    for row in range(1000):
+        index.add(row, "domain", f"value-{row % 50}")
+    assert "domain" not in index.dense_fields
+    assert not index._bitmaps
+    assert len(index.values("domain")) == 50
+    assert np.flatnonzero(index.mask({"domain": ["value-3"]}, 1000)).tolist() == list(range(3, 1000, 50))
+    assert np.flatnonzero(index.mask({"domain": ["value-0", "value-1"]}, 100)).tolist() == [0, 1, 50, 51]
@@ -0,0 +1,43 @@
+from app.config import settings
+from app.services.near_duplicates import MinHasher, NearDuplicateIndex, estimated_similarity
+
+BASE = " ".join(f"word{i}" for i in range(60))
+NEAR = BASE + " appendix"
+OTHER = " ".join(f"term{i}" for i in range(60))
+
+def test_minhash_estimates_jaccard_similarity():
+    hasher = MinHasher(num_perm=256)
+    assert estimated_similarity(hasher.signature(BASE), hasher.signature(BASE.upper())) == 1.0
+    assert estimated_similarity(hasher.signature(BASE), hasher.signature(NEAR)) > 0.9
+    assert estimated_similarity(hasher.signature(BASE), hasher.signature(OTHER)) < 0.1
+
+def test_index_links_near_duplicates_to_the_first_chunk():
+    index = NearDuplicateIndex(threshold=0.9)
+    index.add("base", index.hasher.signature(BASE))
+    match = index.find(index.hasher.signature(NEAR))
+    assert match is not None and match[0] == "base"
+    index.add("near", index.hasher.signature(NEAR), canonical_id=index.canonical(match[0]))
+
+    assert index.canonical("near") == "base"
+    assert index.find(index.hasher.signature(OTHER)) is None
+    assert index.find(index.hasher.signature(NEAR), accept=lambda chunk_id: chunk_id != "base")[0] == "near"
+    index.remove("base")
+    assert len(index) == 1
+
+def test_stored_near_duplicates_are_linked_and_collapsed_in_results(embedder, monkeypatch):
+    monkeypatch.setattr(settings, "NEAR_DUPLICATE_ACTION", "link")
+    embedder.store_chunks("2023", [BASE])
+    embedder.store_chunks("2024", [NEAR])
+    (near_id,) = embedder.document_chunks["2024"]
+    (base_id,) = embedder.document_chunks["2023"]
+    assert embedder.in_memory_documents[embedder.chunk_records[near_id]["row"]]["metadata"]["canonical_id"] == base_id
+
+    results = embedder.search_documents(BASE, top_k=5)
+    assert len(results) == 1
+
+def test_collapse_action_references_the_existing_chunk(embedder, monkeypatch):
+    monkeypatch.setattr(settings, "NEAR_DUPLICATE_ACTION", "collapse")
+    embedder.store_chunks("2023", [BASE])
+
+    assert embedder.store_chunks("2024", [NEAR]) == 0
+    assert embedder.document_chunks["2024"] == embedder.document_chunks["2023"]
@@ -0,0 +1,72 @@
+import sqlite3
+import numpy as np
+from app.services.persistent_store import CHUNKS_FILE, PersistentVectorStore
+
+DIM = 8
+
+def _chunk(chunk_id, doc_id):
+    return {"id": chunk_id, "text": f"text of {chunk_id}", "metadata": {"doc_id": doc_id, "text": f"text of {chunk_id}"}}
+
+def _embeddings(n, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_append_and_load_round_trip(tmp_path):
+    store = PersistentVectorStore(str(tmp_path), DIM)
+    embeddings = _embeddings(3)
+    seqs = store.append(embeddings, [_chunk(f"c{i}", "doc") for i in range(3)])
+    loaded, documents = PersistentVectorStore(str(tmp_path), DIM).load()
+    assert np.allclose(loaded, embeddings)
+    assert [doc["id"] for doc in documents] == ["c0", "c1", "c2"]
+    assert [doc["seq"] for doc in documents] == seqs.tolist()
+    assert sorted(store.chunk_refs()) == [("doc", "c0"), ("doc", "c1"), ("doc", "c2")]
+
+def test_release_from_interleaved_workers_deletes_the_right_chunks(tmp_path):
+    # Two worker processes append to the same store in turn, so their local row numbers differ from the disk's
+    worker_a = PersistentVectorStore(str(tmp_path), DIM)
+    worker_b = PersistentVectorStore(str(tmp_path), DIM)
+    a_seqs = worker_a.append(_embeddings(2, 1), [_chunk("a0", "doc-a"), _chunk("a1", "doc-a")])
+    worker_b.append(_embeddings(2, 2), [_chunk("b0", "doc-b"), _chunk("b1", "doc-b")])
+    a_seqs = np.concatenate([a_seqs, worker_a.append(_embeddings(1, 3), [_chunk("a2", "doc-a")])])
+
+    # Worker A deletes its local rows 1 and 2 (a1, a2), which are rows 1 and 4 on disk
+    worker_a.release([("doc-a", "a1"), ("doc-a", "a2")], a_seqs[[1, 2]])
+    assert worker_b.tombstoned_rows().tolist() == [1, 4]
+    assert ("doc-a", "a1") not in worker_b.chunk_refs()
+
+    assert worker_b.compact() == 2
+    embeddings, documents = worker_a.load()
+    assert [doc["id"] for doc in documents] == ["a0", "b0", "b1"]
+    assert len(embeddings) == 3
+    assert worker_a.tombstoned_rows().tolist() == []
+
+def test_sequence_numbers_survive_compaction(tmp_path):
+    store = PersistentVectorStore(str(tmp_path), DIM)
+    seqs = store.append(_embeddings(3), [_chunk(f"c{i}", "doc") for i in range(3)])
+    store.release([("doc", "c0")], seqs[:1])
+    store.compact()
+    # A deleted and re-stored chunk gets a new sequence number, so the old deletion cannot hit it
+    new_seq = store.append(_embeddings(1), [_chunk("c0", "doc")])
+    store.release([], seqs[1:2])
+    assert new_seq[0] > seqs[-1]
+    store.compact()
+    assert [doc["id"] for doc in store.load()[1]] == ["c2", "c0"]
+
+def test_tombstoned_rows_are_migrated(tmp_path):
+    store = PersistentVectorStore(str(tmp_path), DIM)
+    store.append(_embeddings(3), [_chunk(f"c{i}", "doc") for i in range(3)])
+    # Recreate the layout written before sequence numbers existed
+    with sqlite3.connect(str(tmp_path / CHUNKS_FILE)) as conn:
+        conn.execute("CREATE TABLE chunks_old (row INTEGER PRIMARY KEY, id TEXT, text TEXT, metadata TEXT)")
+        conn.execute("INSERT INTO chunks_old SELECT row, id, text, metadata FROM chunks")
+        conn.execute("DROP TABLE chunks")
+        conn.execute("ALTER TABLE chunks_old RENAME TO chunks")
+        conn.execute("DROP TABLE deleted_chunks")
+        conn.execute("DELETE FROM meta WHERE key = 'next_seq'")
+        conn.execute("CREATE TABLE tombstones (row INTEGER PRIMARY KEY)")
+        conn.execute("INSERT INTO tombstones VALUES (1)")
+    store = PersistentVectorStore(str(tmp_path), DIM)
+    assert store.tombstoned_rows().tolist() == [1]
+    assert store.append(_embeddings(1), [_chunk("c3", "doc")]).tolist() == [3]
+    store.compact()
+    assert [doc["id"] for doc in store.load()[1]] == ["c0", "c2", "c3"]
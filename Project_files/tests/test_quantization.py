@@ -0,0 +1,49 @@
+import numpy as np
+from app.services.quantization import Int8VectorIndex, create_vector_index, quantize_int8
+from app.services.vector_index import VectorIndex, normalize_rows
+
+DIM = 384
+
+def _corpus(n, seed=0):
+    return normalize_rows(np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32))
+
+def test_quantize_int8_round_trips_closely():
+    rows = _corpus(10)
+    codes, scales = quantize_int8(rows)
+    assert np.abs(codes.astype(np.float32) * (scales / 127.0)[:, None] - rows).max() < 0.01
+
+def test_rescoring_index_uses_less_memory_per_row_than_float32():
+    corpus = _corpus(1000)
+    float32 = VectorIndex(DIM)
+    float32.add(corpus)
+    int8 = create_vector_index(DIM, "int8", rescore=True)
+    int8.add(corpus)
+    # int8 codes plus one float32 scale per row, and no float32 copy
+    assert int8.memory_bytes() / len(corpus) == DIM + 4
+    assert int8.memory_bytes() < float32.memory_bytes() / 3
+
+def test_float32_copy_is_opt_in():
+    corpus = _corpus(100)
+    index = Int8VectorIndex(DIM, rescore=True, keep_float32=True)
+    index.add(corpus)
+    assert index.memory_bytes() / len(corpus) == DIM + 4 + 4 * DIM
+    assert index.search(corpus[3], 1)[0][0] == 3
+    assert abs(index.search(corpus[3], 1)[0][1] - 1.0) < 1e-5
+
+def test_attached_rows_are_rescored_at_full_precision():
+    corpus = _corpus(500)
+    index = Int8VectorIndex(DIM, rescore=True)
+    index.attach(corpus)
+    index.add(_corpus(10, seed=1))
+    assert index.memory_bytes() / len(index) == DIM + 4
+    row, score = index.search(corpus[42], 1)[0]
+    assert row == 42 and abs(score - 1.0) < 1e-5
+    assert index.search(_corpus(10, seed=1)[5], 1)[0][0] == 505
+
+def test_compacted_keeps_rows_in_order():
+    corpus = _corpus(20)
+    index = Int8VectorIndex(DIM)
+    index.add(corpus)
+    compacted = index.compacted(np.array([1, 5, 7]))
+    assert len(compacted) == 3
+    assert compacted.search(corpus[5], 1)[0][0] == 1
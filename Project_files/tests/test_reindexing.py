@@ -0,0 +1,53 @@
+import threading
+import numpy as np
+import pytest
+from app.config import settings
+
+@pytest.fixture
+def ivf_embedder(embedder, monkeypatch):
+    # A small IVF index retrains several times while the documents below are stored
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_BACKEND", "ivf")
+    monkeypatch.setattr(settings, "IVF_NLIST", 4)
+    monkeypatch.setattr(settings, "IVF_NPROBE", 4)
+    with embedder.store_lock:
+        embedder._install_local_store(None, [], np.zeros(0, dtype=np.int64))
+    return embedder
+
+def test_search_during_bulk_reindex(ivf_embedder):
+    embedder = ivf_embedder
+    embedder.store_chunks("anchor", ["composting guidelines for community gardens"], metadata={"domain": "waste"})
+    query = "composting guidelines for community gardens"
+    query_embedding = embedder.encode_queries([query])[0].tolist()
+    errors, done = [], threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                for results in (embedder.search_in_memory(query_embedding, 3),
+                                embedder.search_in_memory_hybrid(query, query_embedding, 3),
+                                embedder.search_in_memory_hybrid(query, query_embedding, 3,
+                                                                 filters={"domain": ["waste"]})):
+                    if not results or results[0]["metadata"]["doc_id"] != "anchor":
+                        errors.append(results)
+            except Exception as e:
+                errors.append(e)
+
+    def ingest(worker):
+        for doc in range(10):
+            doc_id = f"bulk-{worker}-{doc}"
+            chunks = [f"street lighting survey {doc_id} section {i} energy usage" for i in range(40)]
+            with embedder.replacing_document(doc_id):
+                embedder.store_chunks(doc_id, chunks, metadata={"domain": "energy"})
+
+    readers = [threading.Thread(target=search) for _ in range(2)]
+    writers = [threading.Thread(target=ingest, args=(worker,)) for worker in range(3)]
+    for thread in readers + writers:
+        thread.start()
+    for writer in writers:
+        writer.join()
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert not errors
+    assert embedder.search_backend.is_trained
+    assert len(embedder.document_chunks) == 31
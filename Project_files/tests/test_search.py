@@ -0,0 +1,50 @@
+from app.services.document_embedder import parse_filter
+
+def test_parse_filter_groups_values_by_field():
+    assert parse_filter("domain:water, domain:waste,doc_id:abc") == {"domain": ["water", "waste"], "doc_id": ["abc"]}
+    assert parse_filter("  ") is None
+
+def test_hybrid_search_ranks_exact_terms(embedder):
+    embedder.store_chunks("ordinance", ["ordinance 2023-15 limits pm2.5 emissions"])
+    embedder.store_chunks("other", ["air quality emissions limits for the city"])
+    results = embedder.search_documents("pm2.5 ordinance", mode="hybrid")
+    assert results[0]["metadata"]["doc_id"] == "ordinance"
+    assert results[0]["bm25_score"] > 0
+
+def test_hybrid_search_with_remote_store_falls_back_to_vector_search(remote_embedder):
+    embedder = remote_embedder
+    embedder.store_chunks("water", ["rainwater harvesting rebate program"], metadata={"domain": "water"})
+    assert len(embedder.in_memory_documents) == 0
+    for mode in ("vector", "hybrid"):
+        results = embedder.search_documents("rainwater harvesting rebate program", mode=mode)
+        assert [result["metadata"]["doc_id"] for result in results] == ["water"]
+        assert results[0]["metadata"]["domain"] == "water"
+
+def test_remote_doc_id_filter_finds_deduplicated_chunks(remote_embedder):
+    embedder = remote_embedder
+    embedder.store_chunks("doc-a", ["noise ordinance quiet hours"])
+    embedder.store_chunks("doc-b", ["noise ordinance quiet hours"])
+    query = "noise ordinance quiet hours"
+    assert len(embedder.search_documents(query, filters={"doc_id": ["doc-b"]})) == 1
+    embedder.delete_document("doc-a")
+    assert embedder.search_documents(query, filters={"doc_id": ["doc-a"]}) == []
+    assert len(embedder.search_documents(query, filters={"doc_id": ["doc-b"]})) == 1
+
+def test_remote_filter_keeps_matching_chunks_stored_without_doc_ids(remote_embedder):
+    embedder = remote_embedder
+    embedder.remote_store.upsert([("legacy", [1.0] * embedder.EMBEDDING_DIM, {"doc_id": "old", "text": "legacy"})])
+    query = [1.0] * embedder.EMBEDDING_DIM
+    hits = embedder._search_index("legacy", query, 5, "vector", {"doc_id": ["old"]})
+    assert [hit["id"] for hit in hits] == ["legacy"]
+    assert embedder._search_index("legacy", query, 5, "vector", {"doc_id": ["other"], "domain": ["x"]}) == []
+
+def test_local_filter_returns_matches_outside_the_unfiltered_top_k(embedder):
+    for i in range(20):
+        embedder.store_chunks(f"water-{i}", [f"stormwater drainage upgrade phase {i}"], metadata={"domain": "water"})
+    embedder.store_chunks("waste", ["stormwater drainage and waste collection"], metadata={"domain": "waste"})
+
+    for mode in ("vector", "hybrid"):
+        results = embedder.search_documents("stormwater drainage upgrade", top_k=3, mode=mode,
+                                            filters={"domain": ["waste"]})
+        assert [result["metadata"]["doc_id"] for result in results] == ["waste"]
+    assert embedder.search_documents("stormwater drainage upgrade", filters={"domain": ["parks"]}) == []
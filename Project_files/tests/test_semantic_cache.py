@@ -0,0 +1,49 @@
+import hashlib
+import numpy as np
+import pytest
+from app.config import Settings, settings
+from app.services import granite_llm
+from app.services.semantic_cache import SemanticCache
+
+WINDOW_WORDS = 256
+
+def _truncating_embed(text):
+    # Like MiniLM, only the start of the text contributes to its embedding
+    vector = np.zeros(64, dtype=np.float32)
+    for word in text.lower().split()[:WINDOW_WORDS]:
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % len(vector)] += 1
+    return vector / np.linalg.norm(vector)
+
+@pytest.fixture
+def summaries(monkeypatch):
+    """
+    generate_summary with a semantic cache, the truncating embedding and a
+    fake Watsonx that summarises a text as its last word.
+    """
+    monkeypatch.setattr(granite_llm, "semantic_caches", {"generate_summary": SemanticCache(0.95, 16, 60)})
+    monkeypatch.setattr(granite_llm, "_embed", _truncating_embed)
+    monkeypatch.setattr(settings, "COALESCE_LLM_REQUESTS", False)
+    prompts = []
+    monkeypatch.setattr(granite_llm, "_send_prompt", lambda prompt: prompts.append(prompt) or prompt.split()[-1])
+    return prompts
+
+def test_generate_summary_is_not_semantically_cached_by_default(monkeypatch):
+    monkeypatch.delenv("SEMANTIC_CACHE_FUNCTIONS", raising=False)
+    functions = Settings().SEMANTIC_CACHE_FUNCTIONS.split(",")
+    assert "generate_summary" not in functions
+    assert "ask_city_question" in functions
+
+def test_long_texts_with_the_same_opening_do_not_share_a_summary(summaries):
+    opening = " ".join(f"clause{i}" for i in range(300))
+    first = granite_llm.generate_summary(f"{opening} parks")
+    second = granite_llm.generate_summary(f"{opening} transit")
+
+    assert (first, second) == ("parks", "transit")
+    assert len(summaries) == 2
+
+def test_short_texts_still_share_a_summary(summaries):
+    first = granite_llm.generate_summary("Bike lanes on Main Street reduce traffic.")
+    second = granite_llm.generate_summary("bike lanes on main street reduce traffic.")
+
+    assert first == second
+    assert len(summaries) == 1
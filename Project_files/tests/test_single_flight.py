@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.services import granite_llm
+from app.services.llm_gateway import CircuitBreaker, LLMGateway
+from app.services.single_flight import SingleFlight
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        release.wait(5)
+        return "answer"
+
+    with ThreadPoolExecutor(6) as pool:
+        futures = [pool.submit(flight.do, "key", slow) for _ in range(6)]
+        while flight.stats()["calls"] < 6:
+            time.sleep(0.01)
+        release.set()
+        assert [future.result() for future in futures] == ["answer"] * 6
+    assert len(runs) == 1
+    assert flight.stats()["coalesced"] == 5
+    # Nothing is cached once the call finished
+    assert flight.do("key", lambda: "again") == "again"
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def call_all():
+        return await asyncio.gather(*(flight.do_async("key", failing) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(call_all())
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert flight.stats()["executions"] == 1
+
+def test_cancelled_waiter_leaves_the_call_running_for_others():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do_async("key", slow))
+        second = asyncio.ensure_future(flight.do_async("key", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "answer"
+
+def test_identical_prompts_share_one_watsonx_request(monkeypatch):
+    monkeypatch.setattr(settings, "COALESCE_LLM_REQUESTS", True)
+    monkeypatch.setattr(granite_llm, "llm_gateway", LLMGateway(CircuitBreaker()))
+    monkeypatch.setattr(granite_llm, "llm_requests", SingleFlight())
+    prompts = []
+
+    async def chat(prompt, max_new_tokens):
+        prompts.append(prompt)
+        await asyncio.sleep(0.05)
+        return f"answer to {prompt}"
+
+    monkeypatch.setattr(granite_llm.watsonx_client, "chat", chat)
+
+    async def ask_all():
+        return await asyncio.gather(
+            granite_llm.ask_granite_async("Tips for  green roofs"),
+            granite_llm.ask_granite_async("tips for green roofs"),
+            granite_llm.ask_granite_async("Tips for bike lanes"),
+        )
+
+    answers = asyncio.run(ask_all())
+    assert answers[0] == answers[1]
+    assert len(prompts) == 2
@@ -0,0 +1,63 @@
+import threading
+import numpy as np
+import pytest
+from app.config import settings
+from app.services.persistent_store import PersistentVectorStore
+
+@pytest.fixture
+def stored_directory(embedder, monkeypatch, tmp_path):
+    """
+    A persistent store holding a few documents, and an embedder reset as if just started.
+    """
+    monkeypatch.setattr(embedder, "persistent_store", PersistentVectorStore(str(tmp_path), embedder.EMBEDDING_DIM))
+    embedder.store_chunks("ordinance", ["ordinance 2023-15 limits pm2.5 emissions"])
+    embedder.store_chunks("parks", ["park maintenance and tree planting schedule"])
+    with embedder.store_lock:
+        embedder._install_local_store(None, [], np.zeros(0, dtype=np.int64))
+        embedder.chunk_records.clear()
+        embedder.chunk_ids_by_hash.clear()
+        embedder.document_chunks.clear()
+    monkeypatch.setattr(embedder, "persistent_store", None)
+    monkeypatch.setattr(embedder, "near_duplicate_index", embedder._new_near_duplicate_index())
+    monkeypatch.setattr(settings, "VECTOR_STORE_DIR", str(tmp_path))
+    return tmp_path
+
+def test_signatures_are_loaded_instead_of_recomputed(embedder, stored_directory, monkeypatch):
+    documents = PersistentVectorStore(str(stored_directory), embedder.EMBEDDING_DIM).load()[1]
+    assert all(len(doc["signature"]) == settings.MINHASH_PERMUTATIONS for doc in documents)
+
+    def recompute(text):
+        raise AssertionError("signature recomputed at startup")
+
+    monkeypatch.setattr(embedder.near_duplicate_index.hasher, "signature", recompute)
+    embedder.load_persistent_store()
+    embedder._lexical_build_thread.join()
+    assert len(embedder.near_duplicate_index) == 2
+    assert all("signature" not in doc for doc in embedder.in_memory_documents)
+
+def test_hybrid_search_degrades_to_vector_until_bm25_is_built(embedder, stored_directory, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    build = embedder._build_lexical_index
+
+    def slow_build(documents):
+        started.set()
+        release.wait(5)
+        build(documents)
+
+    monkeypatch.setattr(embedder, "_build_lexical_index", slow_build)
+    embedder.load_persistent_store()
+    started.wait(5)
+    query = "pm2.5 ordinance"
+    embedding = embedder.encode_queries([query])[0].tolist()
+    assert not embedder.lexical_index.ready
+    results = embedder.search_in_memory_hybrid(query, embedding, 2)
+    assert results and "bm25_score" not in results[0]
+
+    # Chunks stored while the index is built are indexed by the build
+    embedder.store_chunks("late", ["late ordinance about pm2.5 monitors"])
+    release.set()
+    embedder._lexical_build_thread.join()
+    assert embedder.lexical_index.ready and len(embedder.lexical_index) == 3
+    results = embedder.search_in_memory_hybrid(query, embedding, 3)
+    assert {result["metadata"]["doc_id"] for result in results if result["bm25_score"] > 0} == {"ordinance", "late"}
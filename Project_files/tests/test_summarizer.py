@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from app.config import settings
+from app.services import summarizer
+from app.services.embedding_cache import content_hash
+from app.services.summary_cache import SummaryCache
+
+@pytest.fixture
+def granite(monkeypatch, tmp_path):
+    """
+    A summary cache in tmp_path and a fake generate_summary_async recording
+    its calls; a text's delay (default none) is looked up in granite.delays.
+    """
+    class Granite:
+        calls = []
+        delays = {}
+        active = 0
+        peak = 0
+
+    async def generate_summary_async(text):
+        Granite.calls.append(text)
+        Granite.active += 1
+        Granite.peak = max(Granite.peak, Granite.active)
+        await asyncio.sleep(Granite.delays.get(text, 0.01))
+        Granite.active -= 1
+        return "" if text == "empty" else f"Summary of {text}"
+
+    monkeypatch.setattr(summarizer, "generate_summary_async", generate_summary_async)
+    monkeypatch.setattr(summarizer, "summary_cache", SummaryCache(str(tmp_path / "summaries.sqlite"), "granite"))
+    monkeypatch.setattr(summarizer, "recent_summaries", summarizer.LRUCache(64))
+    monkeypatch.setattr(summarizer, "_pending", {})
+    return Granite
+
+def _results(*texts):
+    return [{"id": text, "metadata": {"text": text}} for text in texts]
+
+def test_results_are_summarised_concurrently_and_cached(granite, monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_CONCURRENCY", 3)
+    texts = [f"chunk {i}" for i in range(8)]
+
+    results = asyncio.run(summarizer.summarize_results(_results(*texts), deadline=5))
+    assert [result["summary"] for result in results] == [f"Summary of {text}" for text in texts]
+    assert {result["summary_status"] for result in results} == {"ready"}
+    assert granite.peak == 3
+
+    asyncio.run(summarizer.summarize_results(_results(*texts), deadline=5))
+    assert len(granite.calls) == 8
+
+def test_precomputed_summaries_are_used_as_is(granite):
+    results = [{"id": "c1", "metadata": {"text": "chunk", "summary": "Stored at ingest."}}]
+    asyncio.run(summarizer.summarize_results(results))
+    assert results[0]["summary"] == "Stored at ingest."
+    assert "summary" not in results[0]["metadata"]
+    assert granite.calls == []
+
+def test_slow_summaries_are_pending_and_can_be_polled(granite):
+    granite.delays["slow chunk"] = 0.2
+
+    async def search_then_poll():
+        results = await summarizer.summarize_results(_results("fast chunk", "slow chunk"), deadline=0.05)
+        pending = await summarizer.get_summary(content_hash("slow chunk"))
+        await asyncio.sleep(0.3)
+        return results, pending, await summarizer.get_summary(content_hash("slow chunk"))
+
+    results, pending, ready = asyncio.run(search_then_poll())
+    assert [result["summary_status"] for result in results] == ["ready", "pending"]
+    assert results[1]["summary"] is None
+    assert pending["summary_status"] == "pending"
+    assert ready == {"summary_id": content_hash("slow chunk"), "summary_status": "ready",
+                     "summary": "Summary of slow chunk"}
+
+def test_failed_summaries_are_not_persisted(granite):
+    results = asyncio.run(summarizer.summarize_results(_results("empty"), deadline=5))
+    assert summarizer.is_failed_summary(results[0]["summary"])
+    assert summarizer.summary_cache.get_many([content_hash("empty")]) == {}
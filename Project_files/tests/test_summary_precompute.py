@@ -0,0 +1,80 @@
+import threading
+import time
+import pytest
+from app.config import Settings
+from app.services import granite_llm, summary_precompute
+from app.services.llm_gateway import CircuitBreaker, LLMGateway
+from app.services.summarizer import is_failed_summary
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+@pytest.fixture
+def gateways(monkeypatch):
+    """
+    Fresh interactive and background gateways whose breakers open after a single failure.
+    """
+    interactive = LLMGateway(CircuitBreaker(min_calls=1, open_seconds=60))
+    background = LLMGateway(CircuitBreaker(min_calls=1, open_seconds=60))
+    monkeypatch.setattr(granite_llm, "llm_gateway", interactive)
+    monkeypatch.setattr(granite_llm, "background_gateway", background)
+    monkeypatch.setattr(summary_precompute, "llm_gateway", interactive)
+    return interactive, background
+
+@pytest.fixture
+def stored_summaries(monkeypatch):
+    stored = {}
+    monkeypatch.setattr(summary_precompute.document_embedder, "store_chunk_summaries", stored.update)
+    return stored
+
+def _chunk(chunk_id, text):
+    return {"id": chunk_id, "text": text, "metadata": {"content_hash": chunk_id}}
+
+def test_precompute_is_opt_in(monkeypatch):
+    monkeypatch.delenv("PRECOMPUTE_SUMMARIES", raising=False)
+    assert Settings().PRECOMPUTE_SUMMARIES is False
+
+def test_background_failures_do_not_open_the_interactive_circuit(gateways, monkeypatch):
+    interactive, background = gateways
+    monkeypatch.setattr(granite_llm, "_send_prompt", lambda prompt: "Error contacting Watsonx: 503")
+
+    assert is_failed_summary(granite_llm.generate_summary("bus lane policy", background=True))
+    assert background.admitted == 1 and interactive.admitted == 0
+    assert background.breaker.state == CircuitBreaker.OPEN
+    assert interactive.breaker.state == CircuitBreaker.CLOSED
+
+def test_workers_wait_while_interactive_calls_are_queued(gateways, stored_summaries, monkeypatch):
+    interactive, background = gateways
+    calls = []
+    monkeypatch.setattr(granite_llm, "_send_prompt", lambda prompt: calls.append(prompt) or "A summary.")
+    queue = summary_precompute.SummaryQueue(workers=1, max_queued=4, backoff=0.01)
+    interactive.waiting = 1
+    try:
+        queue.submit([_chunk("c1", "cycle lanes on main street")])
+        _wait_until(lambda: queue.deferred == 1)
+        time.sleep(0.05)
+        assert calls == [] and stored_summaries == {}
+
+        interactive.waiting = 0
+        _wait_until(lambda: stored_summaries)
+        assert stored_summaries == {"c1": "A summary."}
+        assert background.admitted == 1 and interactive.admitted == 0
+    finally:
+        queue.shutdown()
+
+def test_shutdown_stops_workers_waiting_for_the_interactive_gateway(gateways, stored_summaries, monkeypatch):
+    interactive, _ = gateways
+    monkeypatch.setattr(granite_llm, "_send_prompt", lambda prompt: "A summary.")
+    queue = summary_precompute.SummaryQueue(workers=1, max_queued=4, backoff=60)
+    interactive.breaker._open()
+    queue.submit([_chunk("c1", "district heating network")])
+    _wait_until(lambda: queue.deferred == 1)
+
+    stopper = threading.Thread(target=queue.shutdown)
+    stopper.start()
+    stopper.join(timeout=5)
+    assert not stopper.is_alive()
+    assert stored_summaries == {}
@@ -0,0 +1,56 @@
+import pytest
+from app.services.text_chunker import StreamingChunker, estimate_tokens, iter_chunks
+
+SENTENCES = [f"Sentence number {i} talks about district heating." for i in range(20)]
+TEXT = " ".join(SENTENCES)
+
+def test_chunks_end_on_sentence_boundaries_within_the_budget():
+    chunks = list(iter_chunks([TEXT], max_tokens=30, overlap_tokens=0))
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(chunks) == TEXT
+
+def test_consecutive_chunks_share_overlap():
+    chunks = list(iter_chunks([TEXT], max_tokens=30, overlap_tokens=10))
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        last_sentence = previous.rsplit(". ", 1)[-1]
+        assert current.startswith(last_sentence.rstrip(".") + ".")
+
+def test_feeding_in_small_blocks_gives_the_same_chunks():
+    whole = list(iter_chunks([TEXT], max_tokens=30, overlap_tokens=10))
+    blocks = [TEXT[i:i + 7] for i in range(0, len(TEXT), 7)]
+    assert list(iter_chunks(blocks, max_tokens=30, overlap_tokens=10)) == whole
+
+def test_paragraph_breaks_close_chunks_once_min_tokens_is_reached():
+    text = "First paragraph about parks and trees.\n\nSecond paragraph about buses."
+    assert list(iter_chunks([text], max_tokens=50, overlap_tokens=0, min_tokens=5)) == [
+        "First paragraph about parks and trees.",
+        "Second paragraph about buses.",
+    ]
+
+def test_overlap_is_carried_across_paragraph_breaks():
+    text = ("Parks get more trees. Benches are repaired.\n\n"
+            "Buses run every ten minutes. Night lines are added.\n\n"
+            "Bike lanes are widened.")
+    assert list(iter_chunks([text], max_tokens=50, overlap_tokens=6, min_tokens=5)) == [
+        "Parks get more trees. Benches are repaired.",
+        "Benches are repaired.\n\nBuses run every ten minutes. Night lines are added.",
+        "Night lines are added.\n\nBike lanes are widened.",
+    ]
+
+def test_overlong_sentences_are_split_on_words():
+    sentence = " ".join(f"word{i}" for i in range(50))
+    chunks = list(iter_chunks([sentence], max_tokens=20, overlap_tokens=0))
+    assert all(estimate_tokens(chunk) <= 20 for chunk in chunks)
+    assert " ".join(chunks) == sentence
+
+def test_max_chars_caps_chunk_length():
+    chunks = list(iter_chunks([TEXT], max_tokens=200, overlap_tokens=0, max_chars=120))
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 120 for chunk in chunks)
+
+def test_overlap_must_be_smaller_than_the_budget():
+    with pytest.raises(ValueError):
+        StreamingChunker(max_tokens=10, overlap_tokens=10)
@@ -0,0 +1,68 @@
+import asyncio
+import io
+import time
+from starlette.datastructures import Headers, UploadFile
+from app.api import vector_router
+from app.config import settings
+from conftest import HashingModel
+
+class CountingModel(HashingModel):
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(texts)
+        return super().encode(texts, **kwargs)
+
+def test_store_in_memory_encodes_all_chunks_in_one_call(embedder, monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(embedder, "_model", model)
+    monkeypatch.setattr(settings, "CHUNK_MAX_TOKENS", 8)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP_TOKENS", 2)
+    text = "Bus lanes speed up buses. Trees cool the streets. Solar roofs cut bills. Sensors track air quality."
+
+    embedder.store_in_memory("plan", text)
+
+    assert len(model.calls) == 1
+    chunks = model.calls[0]
+    assert len(chunks) > 1
+    assert len(embedder.in_memory_documents) == len(chunks)
+    hit = embedder.search_in_memory(model.encode("solar roofs"), top_k=1)[0]
+    assert "Solar roofs" in hit["metadata"]["text"]
+
+def test_store_chunks_skips_chunks_already_stored(embedder, monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(embedder, "_model", model)
+    assert embedder.store_chunks("plan", ["bike lanes", "tree planting"]) == 2
+
+    assert embedder.store_chunks("plan-v2", ["bike lanes", "green roofs"]) == 1
+    assert model.calls[-1] == ["green roofs"]
+
+def test_synchronous_upload_does_not_block_the_event_loop(embedder, monkeypatch):
+    class SlowModel(HashingModel):
+        def encode(self, texts, **kwargs):
+            time.sleep(0.2)
+            return super().encode(texts, **kwargs)
+
+    monkeypatch.setattr(embedder, "_model", SlowModel())
+    upload = UploadFile(io.BytesIO(b"Solar roofs cut bills."), filename="energy_policy.txt",
+                        headers=Headers({"content-type": "text/plain"}))
+
+    async def upload_while_ticking():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        response = await vector_router.upload_document(upload, stream=False)
+        ticker.cancel()
+        return response, ticks
+
+    response, ticks = asyncio.run(upload_while_ticking())
+    assert response["status"] == "embedding_successful"
+    assert embedder.document_chunks[response["doc_id"]]
+    assert ticks >= 5
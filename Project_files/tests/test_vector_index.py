@@ -0,0 +1,47 @@
+import numpy as np
+from app.services.vector_index import VectorIndex, top_k_scores
+
+def _vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+def test_search_matches_brute_force_cosine_similarity():
+    index = VectorIndex(16, initial_capacity=2)
+    vectors = _vectors(100)
+    for start in range(0, 100, 30):
+        index.add(vectors[start:start + 30])
+    query = _vectors(1, seed=1)[0]
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+    hits = index.search(query, 5)
+    assert len(index) == 100
+    assert [row for row, _ in hits] == list(expected)
+    assert hits[0][1] >= hits[-1][1]
+
+def test_search_honours_rows_and_exclude():
+    index = VectorIndex(16)
+    vectors = _vectors(10)
+    index.add(vectors)
+    exclude = np.zeros(10, dtype=bool)
+    exclude[3] = True
+
+    assert 3 not in [row for row, _ in index.search(vectors[3], 10, exclude=exclude)]
+    assert [row for row, _ in index.search(vectors[3], 10, rows=np.array([3, 7]), exclude=exclude)] == [7]
+    assert index.search(vectors[3], 10, rows=np.array([3]), exclude=exclude) == []
+
+def test_attached_matrix_is_copied_on_first_append():
+    matrix = np.eye(4, dtype=np.float32)
+    matrix.flags.writeable = False
+    index = VectorIndex(4)
+    index.attach(matrix)
+    assert index.search(matrix[2], 1)[0][0] == 2
+
+    assert list(index.add(np.ones(4))) == [4]
+    assert index.search(np.ones(4), 1)[0][0] == 4
+    assert np.array_equal(matrix, np.eye(4))
+
+def test_top_k_scores_skips_excluded_positions():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+    exclude = np.array([False, True, False, False])
+    assert [row for row, _ in top_k_scores(scores, 2, exclude)] == [3, 2]
+    assert top_k_scores(scores, 5, np.ones(4, dtype=bool)) == []
@@ -0,0 +1,54 @@
+import threading
+import time
+import pytest
+from app.services.vector_store import RemoteVectorStore
+
+class RecordingStore(RemoteVectorStore):
+    def __init__(self, fail_on=None, **options):
+        super().__init__(**options)
+        self.batches = []
+        self.fail_on = fail_on
+        self.active = 0
+        self.max_active = 0
+        self._active_lock = threading.Lock()
+
+    def _upsert_batch(self, batch):
+        with self._active_lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self._active_lock:
+            self.active -= 1
+        if self.fail_on is not None and any(vector_id == self.fail_on for vector_id, _, _ in batch):
+            raise RuntimeError("upsert failed")
+        self.batches.append([vector_id for vector_id, _, _ in batch])
+
+def _records(n):
+    return [(f"chunk-{i}", [float(i), 1.0], {"doc_id": "plan"}) for i in range(n)]
+
+def test_upsert_sends_parallel_batches():
+    store = RecordingStore(batch_size=10, max_in_flight=3)
+    store.upsert(_records(45))
+
+    assert sorted(len(batch) for batch in store.batches) == [5, 10, 10, 10, 10]
+    assert sorted(vector_id for batch in store.batches for vector_id in batch) == sorted(f"chunk-{i}" for i in range(45))
+    assert 1 < store.max_active <= 3
+    stats = store.stats()
+    assert (stats["upserted_vectors"], stats["upserted_batches"]) == (45, 5)
+    assert "upsert_latency_p95_ms" in stats
+
+def test_failed_batch_fails_the_upsert():
+    store = RecordingStore(fail_on="chunk-25", batch_size=10, max_in_flight=2)
+    with pytest.raises(RuntimeError, match="upsert failed"):
+        store.upsert(_records(40))
+
+def test_stub_store_round_trip(remote_embedder):
+    store = remote_embedder.remote_store
+    store.upsert([("a", [1.0] + [0.0] * (remote_embedder.EMBEDDING_DIM - 1), {"domain": "water"}),
+                  ("b", [0.0, 1.0] + [0.0] * (remote_embedder.EMBEDDING_DIM - 2), {"domain": "waste"})])
+    query = [1.0] + [0.0] * (remote_embedder.EMBEDDING_DIM - 1)
+
+    assert [match["id"] for match in store.query(query, 2)] == ["a", "b"]
+    assert [match["id"] for match in store.query(query, 2, filter={"domain": {"$in": ["waste"]}})] == ["b"]
+    store.delete(["a"])
+    assert [match["id"] for match in store.query(query, 2)] == ["b"]
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import httpx
+from app.services.watsonx_client import AsyncWatsonxClient
+
+def _reply(text):
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+def _client(handler, tokens=None, **options):
+    tokens = tokens if tokens is not None else ["token-1"]
+    invalidated = []
+
+    def get_token():
+        return tokens[0]
+
+    def invalidate(token):
+        invalidated.append(token)
+        tokens.pop(0)
+
+    client = AsyncWatsonxClient("https://watsonx.test", "project", "granite", get_token=get_token,
+                                invalidate_token=invalidate, transport=httpx.MockTransport(handler), **options)
+    return client, invalidated
+
+def test_chat_sends_the_prompt_and_returns_the_answer():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return _reply("Plant more trees.")
+
+    client, _ = _client(handler)
+    assert asyncio.run(client.chat("How do we cool streets?", 64)) == "Plant more trees."
+    body = json.loads(requests[0].content)
+    assert requests[0].url.path == "/ml/v1/text/chat"
+    assert requests[0].headers["Authorization"] == "Bearer token-1"
+    assert body["messages"] == [{"role": "user", "content": "How do we cool streets?"}]
+    assert body["parameters"] == {"max_new_tokens": 64}
+
+def test_rejected_token_is_refreshed_and_the_request_retried():
+    def handler(request):
+        if request.headers["Authorization"] == "Bearer stale":
+            return httpx.Response(401)
+        return _reply("ok")
+
+    client, invalidated = _client(handler, tokens=["stale", "fresh"])
+    assert asyncio.run(client.chat("prompt")) == "ok"
+    assert invalidated == ["stale"]
+
+def test_upstream_errors_are_returned_as_messages():
+    client, _ = _client(lambda request: httpx.Response(503, text="overloaded"))
+    response = asyncio.run(client.chat("prompt"))
+    assert response.startswith("Error contacting Watsonx")
+    assert client.stats()["errors"] == 1
+
+def test_requests_beyond_max_concurrency_wait_for_a_slot():
+    active = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return _reply("ok")
+
+    client, _ = _client(handler, max_concurrency=3)
+
+    async def ask_all():
+        return await asyncio.gather(*(client.chat(f"prompt {i}") for i in range(10)))
+
+    assert asyncio.run(ask_all()) == ["ok"] * 10
+    assert peak == 3
+    assert client.stats()["requests"] == 10
@@ -0,0 +1,57 @@
+"""
+Local stand-in for the IBM Cloud IAM token endpoint.
+
+Implements POST /identity/token for the API-key grant, so the Watsonx
+token cache can be exercised offline, and GET /stats with the number of
+tokens issued. Start it from Project_files/ with:
+
+    uvicorn tools.iam_stub:app --port 8101
+
+and point the API at it with IAM_URL=http://127.0.0.1:8101/identity/token.
+STUB_TOKEN_TTL_SECONDS sets the lifetime of issued tokens (default 3600),
+STUB_LATENCY_MS adds a fixed delay per request, and STUB_API_KEY, if set,
+is the only API key accepted.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs
+from fastapi import FastAPI, HTTPException, Request
+
+LATENCY_SECONDS = float(os.environ.get("STUB_LATENCY_MS", "0")) / 1000.0
+TOKEN_TTL_SECONDS = int(os.environ.get("STUB_TOKEN_TTL_SECONDS", "3600"))
+API_KEY = os.environ.get("STUB_API_KEY", "")
+
+app = FastAPI(title="IBM Cloud IAM stand-in")
+
+_lock = threading.Lock()
+_issued = 0
+
+@app.post("/identity/token")
+async def issue_token(request: Request):
+    global _issued
+    # Parsed by hand so the stub does not need python-multipart for form bodies
+    form = {key: values[0] for key, values in parse_qs((await request.body()).decode("utf-8")).items()}
+    if form.get("grant_type") != "urn:ibm:params:oauth:grant-type:apikey" or not form.get("apikey"):
+        raise HTTPException(status_code=400, detail="Expected grant_type=urn:ibm:params:oauth:grant-type:apikey and an apikey")
+    if API_KEY and form["apikey"] != API_KEY:
+        raise HTTPException(status_code=400, detail="Provided API key could not be found.")
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    with _lock:
+        _issued += 1
+    now = int(time.time())
+    return {
+        "access_token": uuid.uuid4().hex,
+        "refresh_token": "not_supported",
+        "token_type": "Bearer",
+        "expires_in": TOKEN_TTL_SECONDS,
+        "expiration": now + TOKEN_TTL_SECONDS,
+        "scope": "ibm openid",
+    }
+
+@app.get("/stats")
+def stats():
+    return {"tokens_issued": _issued}
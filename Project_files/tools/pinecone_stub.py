@@ -0,0 +1,143 @@
+"""
+Local stand-in for a Pinecone index's data-plane REST API.
+
+Implements POST /vectors/upsert, POST /vectors/delete, POST /vectors/update,
+POST /query and GET /describe_index_stats over an in-memory cosine index,
+so bulk-ingest throughput and tail latency can be measured offline. Start
+it from Project_files/ with:
+
+    uvicorn tools.pinecone_stub:app --port 8100
+
+and point the API at it with PINECONE_HOST=http://127.0.0.1:8100.
+STUB_LATENCY_MS adds a fixed delay per request to mimic network round trips.
+"""
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+import numpy as np
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.vector_index import VectorIndex
+
+LATENCY_SECONDS = float(os.environ.get("STUB_LATENCY_MS", "0")) / 1000.0
+
+app = FastAPI(title="Pinecone stand-in")
+
+class Vector(BaseModel):
+    id: str
+    values: List[float]
+    metadata: Optional[Dict[str, Any]] = None
+
+class UpsertRequest(BaseModel):
+    vectors: List[Vector]
+    namespace: str = ""
+
+class DeleteRequest(BaseModel):
+    ids: List[str]
+    namespace: str = ""
+
+class UpdateRequest(BaseModel):
+    id: str
+    setMetadata: Optional[Dict[str, Any]] = None
+    namespace: str = ""
+
+class QueryRequest(BaseModel):
+    vector: List[float]
+    topK: int = 10
+    includeMetadata: bool = False
+    # Supports $eq, $in and $exists conditions, combined with $and / $or; like Pinecone,
+    # a list-valued field matches $eq / $in when any of its elements does
+    filter: Optional[Dict[str, Any]] = None
+    namespace: str = ""
+
+def _matches(metadata: Dict[str, Any], conditions: Dict[str, Any]) -> bool:
+    for field, condition in conditions.items():
+        if field == "$and":
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+        elif field == "$or":
+            if not any(_matches(metadata, clause) for clause in condition):
+                return False
+        elif "$exists" in condition:
+            if (field in metadata) != condition["$exists"]:
+                return False
+        else:
+            allowed = condition.get("$in", [condition.get("$eq")])
+            value = metadata.get(field)
+            if not any(item in allowed for item in (value if isinstance(value, list) else [value])):
+                return False
+    return True
+
+_lock = threading.Lock()
+_index: Optional[VectorIndex] = None
+_ids: List[str] = []
+_rows: Dict[str, int] = {}
+_metadata: List[Dict[str, Any]] = []
+_stale: Set[int] = set()
+
+@app.post("/vectors/upsert")
+def upsert(request: UpsertRequest):
+    global _index
+    time.sleep(LATENCY_SECONDS)
+    with _lock:
+        for vector in request.vectors:
+            if _index is None:
+                _index = VectorIndex(len(vector.values))
+            if vector.id in _rows:
+                # Re-upserting an id replaces it: the old row is hidden from queries
+                _stale.add(_rows[vector.id])
+            _rows[vector.id] = len(_ids)
+            _ids.append(vector.id)
+            _metadata.append(vector.metadata or {})
+            _index.add(vector.values)
+    return {"upsertedCount": len(request.vectors)}
+
+@app.post("/vectors/delete")
+def delete(request: DeleteRequest):
+    time.sleep(LATENCY_SECONDS)
+    with _lock:
+        for vector_id in request.ids:
+            if vector_id in _rows:
+                _stale.add(_rows.pop(vector_id))
+    return {}
+
+@app.post("/vectors/update")
+def update(request: UpdateRequest):
+    time.sleep(LATENCY_SECONDS)
+    with _lock:
+        if request.id in _rows and request.setMetadata:
+            _metadata[_rows[request.id]].update(request.setMetadata)
+    return {}
+
+@app.post("/query")
+def query(request: QueryRequest):
+    time.sleep(LATENCY_SECONDS)
+    with _lock:
+        if _index is None:
+            return {"matches": [], "namespace": request.namespace}
+        if request.filter:
+            rows = np.array([row for row in _rows.values() if _matches(_metadata[row], request.filter)],
+                            dtype=np.int64)
+            hits = _index.search(request.vector, request.topK, rows=rows)
+        else:
+            hits = _index.search(request.vector, request.topK + len(_stale))
+        matches = []
+        for row, score in [(row, score) for row, score in hits if row not in _stale][:request.topK]:
+            match = {"id": _ids[row], "score": score}
+            if request.includeMetadata:
+                match["metadata"] = _metadata[row]
+            matches.append(match)
+    return {"matches": matches, "namespace": request.namespace}
+
+@app.get("/describe_index_stats")
+def describe_index_stats():
+    return {
+        "dimension": _index.dim if _index is not None else 0,
+        "totalVectorCount": len(_rows),
+        "namespaces": {"": {"vectorCount": len(_rows)}},
+    }
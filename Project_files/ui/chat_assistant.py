@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 
 API_URL = "http://127.0.0.1:8000" # This should be in a config file ideally
 
@@ -37,14 +38,24 @@ def render_chat_assistant():
             
             payload = {"prompt": prompt}
             try:
-                # Call the backend API
-                response = requests.post(f"{API_URL}/chat/ask", json=payload)
-                response.raise_for_status()
-                api_response = response.json().get("response", "Sorry, I couldn't get a response.")
-                
-                # For a streaming effect, you would iterate over the response here.
-                # For now, we just display the full response.
-                full_response = api_response
+                # Call the streaming endpoint and render the answer as it arrives
+                with requests.post(f"{API_URL}/chat/ask-stream", json=payload, stream=True, timeout=(5, 120)) as response:
+                    response.raise_for_status()
+                    event = "message"
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line.startswith("event:"):
+                            event = line[len("event:"):].strip()
+                        elif line.startswith("data:"):
+                            data = json.loads(line[len("data:"):].strip())
+                            if event == "error":
+                                full_response += f"\n\n{data.get('detail', 'Error: the chat service failed.')}"
+                            elif event == "message":
+                                full_response += data.get("delta", "")
+                                message_placeholder.markdown(f'<div style="color: white;">{full_response}▌</div>', unsafe_allow_html=True)
+                        elif not line:
+                            event = "message"
+                if not full_response:
+                    full_response = "Sorry, I couldn't get a response."
 
             except requests.exceptions.RequestException as e:
                 full_response = f"Error: Unable to reach the chat service. Please ensure the backend is running."
@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import time
 
 API_URL = "http://127.0.0.1:8000" # This should be in a config file ideally
 
@@ -18,8 +19,33 @@ def render_document_uploader():
                 files = {'file': (uploaded_file.name, uploaded_file.getvalue(), 'text/plain')}
                 try:
                     response = requests.post(f"{API_URL}/vectors/upload-doc", files=files)
+                    if response.status_code == 429:
+                        st.warning("The server is busy processing other documents. Please try again in a few seconds.")
+                        return
                     response.raise_for_status()
                     data = response.json()
-                    st.success(f"File '{data['filename']}' uploaded successfully! (Doc ID: {data['doc_id']})")
                 except requests.exceptions.RequestException as e:
-                    st.error(f"An error occurred during upload: {e}") 
\ No newline at end of file
+                    st.error(f"An error occurred during upload: {e}")
+                    return
+
+            if "job_id" not in data:
+                st.success(f"File '{data['filename']}' uploaded successfully! (Doc ID: {data['doc_id']})")
+                return
+
+            # Embedding runs in the background; poll the job until it finishes
+            progress = st.progress(0.0, text="Embedding document...")
+            try:
+                while True:
+                    job = requests.get(f"{API_URL}/vectors/jobs/{data['job_id']}").json()
+                    progress.progress(min(job.get("progress", 0.0), 1.0), text=f"Embedding document... ({job.get('chunks_stored', 0)} chunks)")
+                    if job.get("status") in ("completed", "failed", "rejected"):
+                        break
+                    time.sleep(1)
+            except requests.exceptions.RequestException as e:
+                st.error(f"Lost track of the upload job: {e}")
+                return
+
+            if job.get("status") == "completed":
+                st.success(f"File '{data['filename']}' uploaded successfully! (Doc ID: {data['doc_id']})")
+            else:
+                st.error(f"Embedding failed: {job.get('error')}") 
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import time
 
 API_URL = "http://127.0.0.1:8000" # This should be in a config file ideally
 
@@ -13,12 +14,18 @@ def render_policy_search():
         "Search Query:",
         placeholder="e.g., 'What are the city's policies on renewable energy?'"
     )
+    domain = st.selectbox(
+        "Policy Domain:",
+        ["All", "renewable", "transportation", "urban", "waste", "water"]
+    )
 
     if st.button("Search Policies"):
         if search_query:
             with st.spinner("Searching for relevant documents..."):
                 try:
                     params = {"query": search_query, "top_k": 5}
+                    if domain != "All":
+                        params["filter"] = f"domain:{domain}"
                     response = requests.get(f"{API_URL}/policy/search-docs", params=params)
                     response.raise_for_status()
                     data = response.json()
@@ -29,15 +36,28 @@ def render_policy_search():
                     if not results:
                         st.info("No matching documents found.")
                     else:
+                        pending = {}
                         for result in results:
                             with st.expander(f"**Score: {result['score']:.2f}** - Document ID: `{result['id']}`"):
                                 st.markdown(result.get('metadata', {}).get('text', 'No text available.'))
                                 summary = result.get('summary', None)
-                                if summary:
+                                if result.get('summary_status') == 'pending':
+                                    st.markdown("**Summary:**")
+                                    pending[result['summary_id']] = st.empty()
+                                    pending[result['summary_id']].info("Summary is still being generated...")
+                                elif summary:
                                     st.markdown("**Summary:**")
                                     st.success(summary)
                                 else:
                                     st.info("No summary generated.")
+                        # Fill in summaries that missed the search deadline as they finish
+                        deadline = time.time() + 60
+                        while pending and time.time() < deadline:
+                            time.sleep(1)
+                            for summary_id in list(pending):
+                                status = requests.get(f"{API_URL}/policy/summaries/{summary_id}", timeout=10)
+                                if status.ok and status.json().get('summary_status') == 'ready':
+                                    pending.pop(summary_id).success(status.json()['summary'])
 
                 except requests.exceptions.RequestException as e:
                     st.error(f"Failed to perform search. Could not connect to the API.")